@@ -0,0 +1,52 @@
+# Standard Library
+import argparse
+import random
+import re
+import string
+import timeit
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Pattern
+
+# First Party Library
+from pollenjp_times.types import FilterRulesModel
+from pollenjp_times.utils.filter import MessageFilter
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+
+
+def match_per_rule(patterns: List[Pattern[str]], content_list: List[str]) -> bool:
+    """one regex pass per fragment per rule"""
+    return any(pattern.search(txt) is not None for txt in content_list for pattern in patterns)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="compiled filter vs one regex per keyword")
+    parser.add_argument("--number", type=int, default=200, help="calls per measurement")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    content_list: List[str] = [" ".join(random_word(rng) for _ in range(60)) for _ in range(3)]
+    message: Dict[str, Any] = {"text": content_list[0]}
+
+    rows: List[str] = [f"{'keywords':>8} {'compiled[us]':>13} {'per_rule[us]':>13}"]
+    for n_keywords in (1, 10, 100, 1000):
+        keywords: List[str] = [random_word(rng) for _ in range(n_keywords)]
+        message_filter = MessageFilter(FilterRulesModel(include_keywords=keywords, exclude_keywords=["zzzzzz"]))
+        patterns: List[Pattern[str]] = [re.compile(re.escape(keyword), flags=re.IGNORECASE) for keyword in keywords]
+        content: str = "\n".join(content_list)
+        compiled: float = min(
+            timeit.repeat(lambda: message_filter.match(content, message, []), number=args.number, repeat=3)
+        )
+        per_rule: float = min(
+            timeit.repeat(lambda: match_per_rule(patterns, content_list), number=args.number, repeat=3)
+        )
+        rows.append(f"{n_keywords:>8} {compiled / args.number * 1e6:>13.1f} {per_rule / args.number * 1e6:>13.1f}")
+    print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Standard Library
+import argparse
+import logging
+import tempfile
+import time
+from logging import Logger
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+
+# First Party Library
+from pollenjp_times.utils.logs import enable_queue_logging
+from pollenjp_times.utils.logs import log_payload
+from pollenjp_times.utils.logs import payload_settings
+from pollenjp_times.utils.logs import summarize
+
+FILE_FORMAT: str = (
+    "[%(asctime)s][%(name)20s][%(levelname)10s][%(threadName)10s][%(processName)10s][%(filename)20s:%(lineno)4d]"
+    " - %(message)s"
+)
+
+
+def build_event(n_blocks: int) -> Dict[str, Any]:
+    """a message event with rich text blocks, about the size of a long Slack message"""
+    element: Dict[str, Any] = {"type": "text", "text": "lorem ipsum dolor sit amet " * 4}
+    return {
+        "type": "message",
+        "channel": "C0123456789",
+        "user": "U0123456789",
+        "ts": "1700000000.000100",
+        "text": "lorem ipsum dolor sit amet " * 20,
+        "blocks": [{"type": "rich_text", "elements": [{"type": "rich_text_section", "elements": [element] * 5}]}]
+        * n_blocks,
+    }
+
+
+def setup_logger(name: str, path: Path, level: int) -> Logger:
+    handler = RotatingFileHandler(path, maxBytes=1024 * 1024, backupCount=2, encoding="utf-8")
+    handler.setFormatter(logging.Formatter(FILE_FORMAT))
+    handler.setLevel(logging.DEBUG)
+    log: Logger = logging.getLogger(name)
+    log.setLevel(level)
+    log.propagate = False
+    log.addHandler(handler)
+    return log
+
+
+def eager(log: Logger, event: Dict[str, Any]) -> None:
+    """what the handlers and the callbacks did: the payload is formatted (and written) three times"""
+    log.info(f"{event=}")
+    log.info(f"{event=}")
+    log.info(f"{event=}")
+
+
+def lazy(log: Logger, event: Dict[str, Any]) -> None:
+    log.info("%s", summarize("event_message", event))
+    log_payload(log, event=event)
+    log_payload(log, event=event, message=event)
+
+
+def measure(func: Callable[[Logger, Dict[str, Any]], None], log: Logger, event: Dict[str, Any], number: int) -> float:
+    """microseconds per event spent by the calling thread"""
+    start: float = time.perf_counter()
+    for _ in range(number):
+        func(log, event)
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="time spent by a listener thread logging one event")
+    parser.add_argument("--number", type=int, default=2000, help="events per measurement")
+    parser.add_argument("--blocks", type=int, default=20, help="rich text blocks of the event")
+    args = parser.parse_args()
+
+    event: Dict[str, Any] = build_event(args.blocks)
+    rows: List[str] = [f"event: {len(repr(event))} chars", f"{'mode':<36} {'us/event':>9}"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for level_name, level in (("DEBUG", logging.DEBUG), ("INFO", logging.INFO)):
+            log: Logger = setup_logger(f"bench.sync.{level_name}", Path(tmp_dir) / f"sync-{level_name}.log", level)
+            rows.append(f"{f'f-string, sync file, {level_name}':<36} {measure(eager, log, event, args.number):>9.1f}")
+            log = setup_logger(f"bench.lazy.{level_name}", Path(tmp_dir) / f"lazy-{level_name}.log", level)
+            rows.append(f"{f'lazy, sync file, {level_name}':<36} {measure(lazy, log, event, args.number):>9.1f}")
+
+        listeners = enable_queue_logging(maxsize=args.number * 4)
+        for level_name in ("DEBUG", "INFO"):
+            log = logging.getLogger(f"bench.lazy.{level_name}")
+            rows.append(f"{f'lazy, queued file, {level_name}':<36} {measure(lazy, log, event, args.number):>9.1f}")
+        payload_settings.configure(max_chars=2000, sample_rate=0.1)
+        log = logging.getLogger("bench.lazy.DEBUG")
+        rows.append(f"{'lazy, queued, DEBUG, 10% sampled':<36} {measure(lazy, log, event, args.number):>9.1f}")
+        for listener in listeners:
+            listener.stop()
+    print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    main()
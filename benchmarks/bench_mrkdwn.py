@@ -0,0 +1,52 @@
+# Standard Library
+import argparse
+import timeit
+from typing import Callable
+from typing import Dict
+from typing import List
+
+# First Party Library
+from pollenjp_times.utils.slack import convert_text_slack2discord
+from pollenjp_times.utils.slack import convert_text_slack2discord_regex
+from pollenjp_times.utils.slack import extract_slack_urls
+from pollenjp_times.utils.slack import extract_slack_urls_regex
+
+
+def build_messages(scale: int) -> Dict[str, str]:
+    paragraph: str = "今日は <@U0123ABCD> と <#C0123ABCD|general> で話した &amp; メモ &lt;draft&gt;\n"
+    link: str = "<https://example.com/articles/{i}?utm_source=slack|記事 {i}> "
+    return {
+        "short": "へー\n<https://example.com>\n<https://example.com|https://example.com>",
+        "long": paragraph * scale,
+        "link_heavy": "".join(link.format(i=i) for i in range(scale)),
+        "code_block": ("```def function():\n    return '&lt;x&gt;'```\n" + paragraph) * (scale // 4 or 1),
+        "unclosed": "<" + "a" * (scale * 10) + "<" * scale,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="tokenizer vs regex reference of the slack text converters")
+    parser.add_argument("--scale", type=int, default=200, help="size of the generated messages")
+    parser.add_argument("--number", type=int, default=200, help="calls per measurement")
+    args = parser.parse_args()
+
+    functions: Dict[str, Dict[str, Callable[[str], object]]] = {
+        "slack2discord": {"tokenizer": convert_text_slack2discord, "regex": convert_text_slack2discord_regex},
+        "extract_urls": {"tokenizer": extract_slack_urls, "regex": extract_slack_urls_regex},
+    }
+    rows: List[str] = [f"{'function':<14} {'message':<11} {'chars':>7} {'tokenizer[us]':>14} {'regex[us]':>10}"]
+    for message_name, message in build_messages(args.scale).items():
+        for function_name, impls in functions.items():
+            times: Dict[str, float] = {
+                impl_name: min(timeit.repeat(lambda: func(message), number=args.number, repeat=3)) / args.number * 1e6
+                for impl_name, func in impls.items()
+            }
+            rows.append(
+                f"{function_name:<14} {message_name:<11} {len(message):>7}"
+                f" {times['tokenizer']:>14.1f} {times['regex']:>10.1f}"
+            )
+    print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Local stand-in of the Slack Web API, Slack incoming webhooks and Discord webhooks for the benchmarks
+
+* ``{url}/api/<method>``: Slack Web API (use it as the ``base_url`` of ``WebClient``)
+* ``{url}/slack-webhook/<name>``: Slack incoming webhook
+* ``{url}/api/v10/webhooks/<id>/<token>``: Discord webhook (requests to discord.com are redirected here by
+  ``mount_discord(session)``). ``?wait=true`` (or ``1``) posts are answered with the message, whose id can be used by
+  ``PATCH`` / ``DELETE`` ``.../messages/<id>``. A ``multipart/form-data`` post (files) records the size of every
+  file in ``uploads``, and the body (``payload_json``) of every edit is kept in ``edits``
+* ``{url}/files/<name>?size=<n>``: a file of ``n`` bytes (the ``url_private_download`` of a Slack file)
+
+Every request sleeps ``latency`` seconds, and deliveries (chat.postMessage and webhooks) are answered with
+429 Too Many Requests with probability ``rate_429``.
+"""
+# Standard Library
+import json
+import random
+import re
+import threading
+import time
+from email.message import Message
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Pattern
+from typing import Tuple
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+# Third Party Library
+import requests
+from requests.adapters import HTTPAdapter
+
+BENCH_ID_PATTERN: Pattern[str] = re.compile(r"bench-(\d+)")
+DELIVERY_METHODS: Tuple[str, ...] = ("chat.postMessage",)
+DISCORD_MESSAGE_PATTERN: Pattern[str] = re.compile(r"/webhooks/(\d+)/[^/]+/messages/\d+$")
+
+
+class Arrival:
+    __slots__ = ("path", "bench_id", "at")
+
+    def __init__(self, path: str, bench_id: Optional[int], at: float) -> None:
+        self.path: str = path
+        self.bench_id: Optional[int] = bench_id
+        self.at: float = at
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, rate_429: float = 0.0, retry_after: float = 0.05) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency: float = latency
+        self.rate_429: float = rate_429
+        self.retry_after: float = retry_after
+        self.arrivals: List[Arrival] = []  # accepted deliveries
+        self.rejected: int = 0  # deliveries answered with 429
+        self.uploads: List[Tuple[str, int]] = []  # (filename, size) of the files posted to the Discord webhooks
+        self.edits: List[Dict[str, Any]] = []  # bodies of the Discord webhook message edits
+        self.downloads: int = 0  # requests of /files/
+        self._lock: threading.Lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.arrivals = []
+            self.rejected = 0
+            self.uploads = []
+            self.edits = []
+            self.downloads = 0
+
+    def record(self, path: str, body: str) -> bool:
+        """Record a delivery. Returns False if it has to be rejected with 429."""
+        with self._lock:
+            if self.rate_429 > 0 and random.random() < self.rate_429:
+                self.rejected += 1
+                return False
+            match = BENCH_ID_PATTERN.search(body)
+            self.arrivals.append(Arrival(path, int(match.group(1)) if match else None, time.monotonic()))
+            return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StandinServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._handle()
+
+    def do_POST(self) -> None:
+        self._handle()
+
+    def do_PATCH(self) -> None:
+        self._handle()
+
+    def do_DELETE(self) -> None:
+        self._handle()
+
+    def _handle(self) -> None:
+        url = urlparse(self.path)
+        raw: bytes = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body: str = ""
+        if self.headers.get("Content-Type", "").startswith("multipart/form-data"):
+            body = self._read_multipart(raw)
+        else:
+            body = raw.decode("utf-8")
+        time.sleep(self.server.latency)
+
+        if url.path.startswith("/files/"):
+            with self.server._lock:
+                self.server.downloads += 1
+            self._reply_file(int(parse_qs(url.query).get("size", ["0"])[0]))
+        elif DISCORD_MESSAGE_PATTERN.search(url.path):
+            # edit / deletion of a webhook message: not a delivery
+            if self.command == "DELETE":
+                self._reply(204, None)
+                return
+            if self.command == "PATCH":
+                with self.server._lock:
+                    self.server.edits.append(json.loads(body or "{}"))
+            self._reply(200, discord_message(url.path.split("/")[4], json.loads(body or "{}")))
+        elif url.path.startswith("/api/v10/webhooks/"):
+            if not self.server.record(url.path, body):
+                retry_after: float = self.server.retry_after
+                # py-cord retries a 429 by itself if it comes through the proxy (``Via``)
+                self._reply(429, {"retry_after": retry_after, "global": False}, {"Via": "1.1 standin"})
+                return
+            if parse_qs(url.query).get("wait") in (["true"], ["1"]):
+                self._reply(200, discord_message(url.path.split("/")[4], json.loads(body or "{}")))
+            else:
+                self._reply(204, None)
+        elif url.path.startswith("/slack-webhook/"):
+            if not self.server.record(url.path, body):
+                self._reply(429, None, {"Retry-After": f"{self.server.retry_after}"})
+                return
+            self._reply(200, None)
+        elif url.path.startswith("/api/"):
+            method: str = url.path[len("/api/") :]
+            params: Dict[str, Any] = {key: val[0] for key, val in parse_qs(url.query).items()}
+            if body and self.headers.get("Content-Type", "").startswith("application/json"):
+                params.update(json.loads(body))
+            elif body:
+                params.update({key: val[0] for key, val in parse_qs(body).items()})
+            if method in DELIVERY_METHODS and not self.server.record(url.path, body):
+                self._reply(429, {"ok": False, "error": "ratelimited"}, {"Retry-After": f"{self.server.retry_after}"})
+                return
+            self._reply(200, slack_api(method, params))
+        else:
+            self._reply(404, None)
+
+    def _read_multipart(self, raw: bytes) -> str:
+        """Record the files of a multipart body. Returns its ``payload_json``."""
+        message: Message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + raw
+        )
+        payload_json: str = ""
+        for part in message.iter_parts():  # type: ignore
+            content: bytes = part.get_payload(decode=True) or b""
+            if part.get_param("name", header="content-disposition") == "payload_json":
+                payload_json = content.decode("utf-8")
+            else:
+                with self.server._lock:
+                    self.server.uploads.append((part.get_filename() or "", len(content)))
+        return payload_json
+
+    def _reply_file(self, size: int) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", f"{size}")
+        self.end_headers()
+        for offset in range(0, size, 64 * 1024):
+            self.wfile.write(b"x" * min(64 * 1024, size - offset))
+
+    def _reply(self, status: int, data: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]] = None) -> None:
+        payload: bytes = json.dumps(data).encode("utf-8") if data is not None else b""
+        self.send_response(status)
+        for key, val in (headers or {}).items():
+            self.send_header(key, val)
+        if data is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", f"{len(payload)}")
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def slack_api(method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Responses of the Slack Web API methods used by the callbacks"""
+    if method == "auth.test":
+        return {"ok": True, "user_id": "UBENCHBOT", "bot_id": "BBENCHBOT", "team_id": "TBENCH"}
+    if method == "users.info":
+        user_id: str = params.get("user", "U0")
+        return {
+            "ok": True,
+            "user": {"id": user_id, "name": f"user-{user_id}", "profile": {"display_name": user_id, "image_48": ""}},
+        }
+    if method == "conversations.info":
+        channel_id: str = params.get("channel", "C0")
+        return {"ok": True, "channel": {"id": channel_id, "name": f"channel-{channel_id}"}}
+    if method in ("conversations.history", "conversations.replies"):
+        # the message text carries the id of the benchmark event, which is the integer part of ts
+        ts: str = params.get("oldest") or params.get("ts") or "0.000000"
+        bench_id: int = int(float(ts))
+        return {
+            "ok": True,
+            "messages": [
+                {"type": "message", "user": "UBENCHUSER", "ts": ts, "text": f"bench-{bench_id} <https://example.com>"}
+            ],
+        }
+    return {"ok": True, "ts": f"{time.time():.6f}"}
+
+
+def discord_message(webhook_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Message object of a Discord webhook post or edit"""
+    return {
+        "id": f"{time.time_ns() // 1000}",
+        "type": 0,
+        "channel_id": "1",
+        "webhook_id": webhook_id,
+        "content": params.get("content") or "",
+        "author": {"id": webhook_id, "username": params.get("username") or "bench", "discriminator": "0000"},
+        "embeds": params.get("embeds") or [],
+        "attachments": [],
+        "mentions": [],
+        "mention_roles": [],
+        "pinned": False,
+        "mention_everyone": False,
+        "tts": False,
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "flags": 0,
+    }
+
+
+class _RedirectAdapter(HTTPAdapter):
+    def __init__(self, base_url: str) -> None:
+        super().__init__()
+        self.base_url: str = base_url
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        request.url = f"{request.url}".replace("https://discord.com", self.base_url, 1)
+        return super().send(request, *args, **kwargs)
+
+
+def mount_discord(session: requests.Session, server: StandinServer) -> None:
+    """Send the Discord webhook requests of ``session`` to the stand-in"""
+    session.mount("https://discord.com/", _RedirectAdapter(server.url))
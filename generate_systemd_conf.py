@@ -15,6 +15,12 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--name", type=str, default="pollenjp_times_bot", help="systemd service name 'args.name'.service"
     )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="number of worker processes. > 1: generate a template unit 'args.name'@.service (instance = shard index)",
+    )
     return parser.parse_args()
 
 
@@ -22,7 +28,9 @@ def main():
     args = parse_args()
 
     python_path: Path = Path(__file__).parent / "src" / "main.py"
-    target_systemd_conf_path: Path = Path("~").expanduser() / ".config" / "systemd" / "user" / f"{args.name}.service"
+    sharded: bool = args.shards > 1
+    unit_name: str = f"{args.name}@" if sharded else args.name
+    target_systemd_conf_path: Path = Path("~").expanduser() / ".config" / "systemd" / "user" / f"{unit_name}.service"
     systemd_env_file_path: Path = target_systemd_conf_path.parent / f"{args.name}.env"
 
     proj_root_dir: Path = Path(__file__).parent
@@ -34,21 +42,25 @@ def main():
     with open(systemd_env_file_path, "wt") as f:
         f.write(f"PYTHON_FILEPATH={python_path}\n")
         f.write(f"PYTHON_ARGS=--config {args.config}\n")
+        if sharded:
+            f.write(f"SHARD_COUNT={args.shards}\n")
 
     # systemd
 
     target_systemd_conf_path.parent.mkdir(parents=True, exist_ok=True)
 
-    config = configparser.ConfigParser()
+    config = configparser.ConfigParser(interpolation=None)  # keep the systemd specifiers (%i)
     config.optionxform = str
 
     config["Unit"] = {}
     config["Service"] = {}
     config["Install"] = {}
 
-    config["Unit"]["Description"] = "pollenJP Times Job"
+    config["Unit"]["Description"] = "pollenJP Times Job" + (" (shard %i)" if sharded else "")
     config["Service"]["WorkingDirectory"] = f"{proj_root_dir}"
     config["Service"]["EnvironmentFile"] = f"{systemd_env_file_path}"
+    if sharded:
+        config["Service"]["Environment"] = "SHARD_INDEX=%i"
     config["Service"]["ExecStart"] = f"{sys.executable} $PYTHON_FILEPATH $PYTHON_ARGS"
     config["Service"]["Restart"] = "always"
     config["Install"]["WantedBy"] = "default.target"
@@ -56,6 +68,10 @@ def main():
     with open(target_systemd_conf_path, "wt") as f:
         config.write(f)
 
+    if sharded:
+        instances: str = " ".join(f"{args.name}@{i}.service" for i in range(args.shards))
+        print(f"systemctl --user daemon-reload && systemctl --user enable --now {instances}")
+
 
 if __name__ == "__main__":
     main()
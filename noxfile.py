@@ -10,8 +10,12 @@ import nox
 from nox.sessions import Session
 
 src_dir: Path = Path(__file__).parent / "src"
+benchmarks_dir: Path = Path(__file__).parent / "benchmarks"
+tests_dir: Path = Path(__file__).parent / "tests"
 python_code_path_list: List[str] = [
     f"{src_dir}",
+    f"{benchmarks_dir}",
+    f"{tests_dir}",
     "noxfile.py",
 ]
 assert all(isinstance(path, str) for path in python_code_path_list)
@@ -59,6 +63,17 @@ def test(session: Session) -> None:
     session.run("pytest", **kwargs)
 
 
+@nox.session(python=python_version_list)
+def bench(session: Session) -> None:
+    env: Dict[str, str] = {}
+    env.update(env_common)
+    kwargs: SessionKwargs = {"env": env}
+
+    install_package(session, dev=False)
+    for bench_path in sorted(benchmarks_dir.glob("bench_*.py")):
+        session.run("python", f"{bench_path}", *session.posargs, **kwargs)
+
+
 @nox.session(python=python_version_list)
 def lint(session: Session) -> None:
     env: Dict[str, str] = {}
@@ -0,0 +1,161 @@
+"""Mirror the history of a host channel (e.g. into a destination added to the config later)
+
+    APP_CONFIG=config.yml python src/backfill.py --channel C0123 --to 1000000000000000000 --since 2024-01-01
+
+The channel is the ``host_channel_id`` of a times / twitter callback of the config, and ``--to`` the destinations of
+that callback to deliver to (channel id of a slack client, id of a discord webhook, ...): every one by default. The
+messages are rendered as the callback renders the live ones.
+
+The progress is saved in ``--checkpoint`` after each message: run the same command again to resume an interrupted
+backfill, or pass ``--restart`` to start over.
+"""
+# Standard Library
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+import typing as t
+from logging import NullHandler
+from logging import getLogger
+from logging.config import dictConfig
+from pathlib import Path
+
+# Third Party Library
+from slack_bolt.app.app import App
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+
+# First Party Library
+from main import ConfigModel
+from main import build_media
+from main import build_message_index
+from main import build_times_callback
+from main import build_twitter_callback
+from main import configure_caches
+from main import configure_rate_limiter
+from main import load_config
+from pollenjp_times.backfill import Backfill
+from pollenjp_times.backfill import Checkpoint
+from pollenjp_times.callbacks.base import SlackCallbackBase
+from pollenjp_times.media import MediaForwarder
+from pollenjp_times.message_index import MessageIndex
+from pollenjp_times.utils.fanout import FanoutExecutor
+from pollenjp_times.utils.http import MeteredWebClient
+from pollenjp_times.utils.http import connection_pool
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+def parse_time(value: str) -> str:
+    """Slack ts of a unix time or an ISO 8601 date / time (local time if it has no offset)"""
+    try:
+        return f"{float(value):.6f}"
+    except ValueError:
+        return f"{datetime.datetime.fromisoformat(value).timestamp():.6f}"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="mirror the history of a host channel")
+    parser.add_argument("--channel", required=True, help="host_channel_id of a times / twitter callback")
+    parser.add_argument(
+        "--to", action="append", dest="targets", help="destination to deliver to (repeatable). default: all of them"
+    )
+    parser.add_argument("--since", type=parse_time, help="unix time or ISO 8601. default: the first message")
+    parser.add_argument("--days", type=float, help="the last DAYS days (instead of --since)")
+    parser.add_argument("--until", type=parse_time, help="unix time or ISO 8601. default: now")
+    parser.add_argument(
+        "--checkpoint", type=Path, help="progress file. default: backfill-<channel>.json in the working directory"
+    )
+    parser.add_argument("--restart", action="store_true", help="ignore the progress saved in the checkpoint")
+    parser.add_argument("--workers", type=int, default=1, help="messages delivered at once (> 1: may reorder)")
+    parser.add_argument("--page-size", type=int, default=200, help="messages per conversations.history call")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="seconds per destination. default: none (a timed out send may still arrive, and is posted again on"
+        " resume: the fanout timeout of the config is not used)",
+    )
+    return parser.parse_args()
+
+
+def build_callback(
+    conf: ConfigModel,
+    channel_id: str,
+    message_index: t.Optional[MessageIndex],
+    media: t.Optional[MediaForwarder] = None,
+    timeout: t.Optional[float] = None,
+) -> SlackCallbackBase:
+    slack_app = App(
+        client=MeteredWebClient(token=conf.times_app.host.bot_user_oauth_token), token_verification_enabled=False
+    )
+    # conversations.history is rate limited (tier 3): wait and retry instead of failing the backfill
+    slack_app.client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=5))
+    # the checkpoint moves past a message once its sends completed: a timeout would leave a send running (and
+    # arriving) after the backfill stopped before its message
+    fanout_executor = FanoutExecutor(max_workers=conf.times_app.fanout.max_workers, timeout=timeout)
+    for times_conf in conf.times_app.times_callback:
+        if times_conf.host_channel_id == channel_id:
+            return build_times_callback(times_conf, slack_app=slack_app, fanout_executor=fanout_executor, media=media)
+    for twitter_conf in conf.times_app.twitter_callback:
+        if twitter_conf.host_channel_id == channel_id:
+            return build_twitter_callback(
+                twitter_conf,
+                slack_app=slack_app,
+                fanout_executor=fanout_executor,
+                message_index=message_index,
+                media=media,
+            )
+    raise ValueError(f"No callback has the host channel {channel_id}")
+
+
+def main() -> None:
+    args = parse_args()
+    if (conf_str := os.environ.get("LOGGING_CONF")) is not None:
+        dictConfig(json.loads(conf_str))
+    else:
+        logging.basicConfig(level=logging.INFO, format="[%(asctime)s][%(name)s][%(levelname)s] - %(message)s")
+
+    conf, _ = load_config()
+    configure_caches(conf)
+    configure_rate_limiter(conf)
+    connection_pool.configure(
+        pool_connections=conf.times_app.http.pool_connections, pool_maxsize=conf.times_app.http.pool_maxsize
+    )
+    # the posts are recorded as the live ones, so the running app can edit / delete them (if the index is a file)
+    message_index: t.Optional[MessageIndex] = build_message_index(
+        conf, index=conf.times_app.shard.index, num_shards=conf.times_app.shard.count
+    )
+    media: t.Optional[MediaForwarder] = build_media(conf)
+    checkpoint = Checkpoint(args.checkpoint or Path(f"backfill-{args.channel}.json"))
+    if args.restart and checkpoint.path.exists():
+        checkpoint.path.unlink()
+
+    oldest: str = args.since or "0"
+    if args.days is not None:
+        oldest = f"{time.time() - args.days * 86400:.6f}"
+    backfill = Backfill(
+        build_callback(conf, args.channel, message_index, media, timeout=args.timeout),
+        targets=args.targets,
+        checkpoint=checkpoint,
+        workers=args.workers,
+        page_size=args.page_size,
+    )
+    try:
+        progress = backfill.run(oldest=oldest, latest=args.until or f"{time.time():.6f}")
+    except RuntimeError as e:
+        logger.error(f"{e} (checkpoint: {checkpoint.path})")
+        sys.exit(1)
+    finally:
+        if message_index is not None:
+            message_index.close()
+        if media is not None:
+            media.close()
+        connection_pool.close()
+    logger.info(f"{progress.delivered} messages mirrored, {progress.skipped} skipped")
+
+
+if __name__ == "__main__":
+    main()
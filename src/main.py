@@ -1,36 +1,59 @@
 # Standard Library
+import asyncio
 import json
 import os
+import threading
 import typing as t
 from dataclasses import dataclass
 from dataclasses import field
+from functools import partial
 from logging import NullHandler
 from logging import getLogger
 from logging.config import dictConfig
 from pathlib import Path
 
-# Third Party Library
-import discord
-import yaml
-from omegaconf import OmegaConf
-from slack_bolt.adapter.socket_mode.builtin import SocketModeHandler
-from slack_bolt.app.app import App
-from slack_bolt.context.say.say import Say
-from slack_sdk import WebhookClient
-
 # First Party Library
-from pollenjp_times.callbacks import TimesCallback
-from pollenjp_times.callbacks import TwitterCallback
-from pollenjp_times.callbacks.base import Callbacks
-from pollenjp_times.callbacks.base import DiscordWebhookSender
-from pollenjp_times.callbacks.base import SlackCallbackBase
-from pollenjp_times.types import SlackClientAppModel
+from pollenjp_times.dedup import DedupStore
+from pollenjp_times.dedup import action_keys
+from pollenjp_times.dedup import event_keys
+from pollenjp_times.jobs import AsyncJobQueue
+from pollenjp_times.jobs import JobQueue
+from pollenjp_times.message_index import MessageIndex
+from pollenjp_times.utils.config_watch import ConfigWatcher
+from pollenjp_times.utils.logs import enable_queue_logging
+from pollenjp_times.utils.logs import log_payload
+from pollenjp_times.utils.logs import payload_settings
+from pollenjp_times.utils.logs import summarize
+from pollenjp_times.utils.metrics import MetricsServer
+from pollenjp_times.utils.metrics import metrics
+from pollenjp_times.utils.timing import StartupTimer
+from pollenjp_times.utils.tracing import load_exporter
+from pollenjp_times.utils.tracing import tracer
+
+# omegaconf, the Slack SDK / Bolt, discord (and the modules of this package which use them) and yaml are imported
+# only when they are used: importing main (backfill.py, the benchmarks) and reading the config stay fast, and a
+# runtime only loads its own socket mode adapter and clients
+if t.TYPE_CHECKING:
+    # Third Party Library
+    from slack_bolt.app.app import App
+    from slack_bolt.context.say.say import Say
+
+    # First Party Library
+    from pollenjp_times.callbacks.base import CallbackT
+    from pollenjp_times.callbacks.base import SlackCallbackBase
+    from pollenjp_times.media import MediaForwarder
+    from pollenjp_times.outbox import Outbox
+    from pollenjp_times.types import FilterRulesModel
+    from pollenjp_times.utils.fanout import FanoutExecutor
 
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
 
 def load_logging_conf(filepath: Path) -> None:
+    # Third Party Library
+    import yaml
+
     with open(filepath, mode="rt") as f:
         dictConfig(yaml.safe_load(f))
 
@@ -61,11 +84,181 @@ class TimesCallbackConfig:
     clients: CallbackClientsConfig
 
 
+@dataclass
+class FilterConfig:
+    # see FilterRulesModel
+    include_keywords: t.List[str] = field(default_factory=list)
+    exclude_keywords: t.List[str] = field(default_factory=list)
+    include_patterns: t.List[str] = field(default_factory=list)
+    exclude_patterns: t.List[str] = field(default_factory=list)
+    authors: t.List[str] = field(default_factory=list)
+    exclude_authors: t.List[str] = field(default_factory=list)
+    domains: t.List[str] = field(default_factory=list)
+    exclude_domains: t.List[str] = field(default_factory=list)
+
+
+@dataclass
+class DestinationFilterConfig:
+    target: str  # channel id of a slack client or id of a discord webhook
+    filter: FilterConfig = field(default_factory=FilterConfig)
+
+
 @dataclass
 class TwitterCallbackConfig:
     host_channel_id: str
     clients: CallbackClientsConfig
-    filter_keyword: t.Optional[str] = None
+    filter_keyword: t.Optional[str] = None  # regular expression searched in the text
+    filter: FilterConfig = field(default_factory=FilterConfig)
+    destination_filters: t.List[DestinationFilterConfig] = field(default_factory=list)
+
+
+@dataclass
+class FanoutConfig:
+    max_workers: int = 8  # max number of destinations sent to at once (a wait for the rate limit takes no slot)
+    timeout: t.Optional[float] = 10.0  # seconds per destination, spent sending (the rate limit waits do not count)
+
+
+@dataclass
+class CacheConfig:
+    user_maxsize: int = 1024
+    user_ttl: float = 3600.0  # seconds
+    channel_maxsize: int = 4096
+    channel_ttl: float = 3600.0  # seconds
+    message_maxsize: int = 1024  # messages waiting for the Send button
+    message_ttl: float = 86400.0  # seconds
+    prefill_channels: bool = True  # fill the channel cache from conversations.list at startup
+    prefill_page_size: int = 200  # channels per conversations.list page (max 1000)
+
+
+@dataclass
+class HttpConfig:
+    pool_connections: int = 10  # number of hosts to keep connections for
+    pool_maxsize: int = 10  # kept-alive connections per host
+
+
+@dataclass
+class RateLimitRuleConfig:
+    rate: float  # requests per second
+    burst: int
+
+
+@dataclass
+class RateLimitConfig:
+    # pace the sends of each destination (webhook, or token + channel) with a token bucket
+    enabled: bool = True
+    slack: RateLimitRuleConfig = field(default_factory=lambda: RateLimitRuleConfig(rate=1.0, burst=3))
+    slack_webhook: RateLimitRuleConfig = field(default_factory=lambda: RateLimitRuleConfig(rate=1.0, burst=3))
+    discord: RateLimitRuleConfig = field(default_factory=lambda: RateLimitRuleConfig(rate=2.5, burst=5))
+    max_retries: int = 3  # retries of a send answered with 429 (after Retry-After)
+
+
+@dataclass
+class OutboxConfig:
+    # queue deliveries in a sqlite database and retry failed ones in the background (runtime "sync" only)
+    enabled: bool = False
+    path: str = "outbox.sqlite3"
+    max_attempts: int = 8  # attempts before a delivery is moved to the dead letters
+    base_delay: float = 1.0  # seconds before the first retry, doubled on every attempt
+    max_delay: float = 300.0  # seconds
+    workers: int = 4  # max number of destinations sent to at once
+
+
+@dataclass
+class ShardConfig:
+    # partition the callbacks across processes by source channel, each with its own socket mode connection
+    # (runtime "sync" only). SHARD_INDEX / SHARD_COUNT environment variables override index / count.
+    count: int = 1  # Slack allows up to 10 socket mode connections per app
+    index: int = 0
+    host: str = "127.0.0.1"  # events received by the wrong shard are forwarded to host:base_port + owner index
+    base_port: int = 47100
+    forward_timeout: float = 30.0  # seconds
+
+
+@dataclass
+class MetricsConfig:
+    # Prometheus text format on http://host:port/metrics (a shard listens on port + its index)
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 9464
+
+
+@dataclass
+class MessageIndexConfig:
+    # ids of the posts each mirrored message produced (twitter_callback), so edits of the source message update them
+    # (chat.update, webhook message edit) and deletions delete them instead of posting again. Not with the outbox.
+    enabled: bool = True
+    path: t.Optional[str] = None  # sqlite file (a shard uses <name>.shard-<index>.sqlite3). None: in memory
+    retention: float = 7 * 86400.0  # seconds: older messages are not edited / deleted anymore
+
+
+@dataclass
+class MediaConfig:
+    # upload the files of the mirrored messages to the Discord destinations (a line with the permalink of a file which
+    # cannot be) and the images of the embeds (runtime "sync" only). Slack destinations are left as they are.
+    enabled: bool = False
+    path: str = "media"  # directory of the downloaded files, shared by the shards of a host
+    max_file_bytes: int = 10 * 1024 * 1024  # larger files are not downloaded
+    max_upload_bytes: int = 10 * 1024 * 1024  # files of a Discord message, in total (the limit of the server)
+    max_cache_bytes: int = 512 * 1024 * 1024  # least recently used files are removed beyond
+    rehost_images: bool = True  # images of the embeds too, instead of letting Discord fetch their url
+
+
+@dataclass
+class DedupConfig:
+    # drop the events Slack delivers again (same event_id, or same channel / ts) and a second click on a button
+    enabled: bool = True
+    maxsize: int = 10000
+    ttl: float = 3600.0  # seconds
+    # keep the keys in this sqlite file too: retries after a restart are dropped, and the shards of a host sharing the
+    # file drop the retries Slack delivers to another shard. None: memory only
+    path: t.Optional[str] = None
+
+
+@dataclass
+class JobsConfig:
+    # the listeners acknowledge the envelope and queue the work (mirroring a message, the Send button) for a pool of
+    # workers, so slow destinations never hold the socket mode listeners. workers 0: run it in the listener
+    workers: int = 8
+    queue_size: int = 1000
+    # when the queue is full: "block" the listener, "shed" the job (logged and counted) or "spill" it to spill_path
+    backpressure: str = "block"
+    spill_path: str = "jobs.sqlite3"  # a shard uses jobs.shard-<index>.sqlite3
+    # seconds the queue is given to run the queued jobs on shutdown (the jobs still in memory then are lost, the
+    # spilled ones run on the next start). None: until it is empty
+    stop_timeout: t.Optional[float] = 60.0
+
+
+@dataclass
+class LoggingConfig:
+    # the handlers of LOGGING_CONF run on a background thread: the listeners never wait for the formatting / the disk
+    queue: bool = True
+    queue_size: int = 10000  # records dropped beyond this
+    # every event is logged on one line at INFO, its full payloads at DEBUG (truncated, for a sample of the events)
+    payload_max_chars: int = 2000  # 0: no limit
+    payload_sample_rate: float = 1.0
+
+
+@dataclass
+class TracingConfig:
+    # a span tree per sampled event: handler -> callbacks -> Slack API calls / sends (outbox retries are not traced)
+    enabled: bool = False
+    sample_rate: float = 1.0
+    sample_rates: t.Dict[str, float] = field(default_factory=dict)  # per handler, e.g. {"event_message": 0.1}
+    # "jsonl" or "package.module:ClassName" of a pollenjp_times.utils.tracing.Exporter (built with exporter_kwargs)
+    exporter: str = "jsonl"
+    exporter_kwargs: t.Dict[str, t.Any] = field(default_factory=dict)
+    # jsonl: rotated at max_bytes, a shard writes to traces.shard-<index>.jsonl
+    path: str = "traces.jsonl"
+    max_bytes: int = 10 * 1024 * 1024
+    backup_count: int = 3
+
+
+@dataclass
+class ReloadConfig:
+    # APP_CONFIG is the path of a config file: reload it when it changes (or on SIGHUP) and rebuild only the added /
+    # modified callbacks. cache and rate_limit are applied too, the other sections need a restart.
+    watch: bool = True
+    interval: float = 2.0  # seconds between two checks of the file (0: SIGHUP only)
 
 
 @dataclass
@@ -73,6 +266,23 @@ class TimesAppConfig:
     host: SlackHost
     times_callback: t.List[TimesCallbackConfig] = field(default_factory=list)
     twitter_callback: t.List[TwitterCallbackConfig] = field(default_factory=list)
+    fanout: FanoutConfig = field(default_factory=FanoutConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    http: HttpConfig = field(default_factory=HttpConfig)
+    rate_limit: RateLimitConfig = field(default_factory=RateLimitConfig)
+    outbox: OutboxConfig = field(default_factory=OutboxConfig)
+    shard: ShardConfig = field(default_factory=ShardConfig)
+    reload: ReloadConfig = field(default_factory=ReloadConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    tracing: TracingConfig = field(default_factory=TracingConfig)
+    logging: LoggingConfig = field(default_factory=LoggingConfig)
+    jobs: JobsConfig = field(default_factory=JobsConfig)
+    dedup: DedupConfig = field(default_factory=DedupConfig)
+    message_index: MessageIndexConfig = field(default_factory=MessageIndexConfig)
+    media: MediaConfig = field(default_factory=MediaConfig)
+    # "sync": slack_bolt.App + builtin SocketModeHandler (thread per listener)
+    # "async": slack_bolt AsyncApp + aiohttp socket mode, every delivery runs on one asyncio event loop
+    runtime: str = "sync"
 
 
 @dataclass
@@ -81,97 +291,869 @@ class ConfigModel:
     discord_webhook_sender: str
 
 
-def main() -> None:
+# sections of the config applied by a reload. A change of the others is logged and needs a restart.
+RELOADABLE_SECTIONS: t.Tuple[str, ...] = (
+    "times_app.times_callback",
+    "times_app.twitter_callback",
+    "times_app.cache",
+    "times_app.rate_limit",
+)
 
-    if (conf_str := os.environ.get("LOGGING_CONF")) is not None:
-        load_logging_conf(Path(__file__).parents[1] / "config" / "logging.conf.yaml")
-        dictConfig(json.loads(conf_str))
+
+def load_config() -> t.Tuple[ConfigModel, t.Optional[Path]]:
+    """Read ``APP_CONFIG``: the config (json) itself or the path of a json / yaml config file
+
+    Returns:
+        t.Tuple[ConfigModel, t.Optional[Path]]: the config and the path of its file (``None``: inline json)
+    """
+    # Third Party Library
+    from omegaconf import OmegaConf
 
     if (conf_str := os.environ.get("APP_CONFIG")) is None:
         raise ValueError("'APP_CONFIG' environment variable is not set")
 
+    conf_path: t.Optional[Path] = None
+    if conf_str.lstrip().startswith("{"):
+        conf_dict: t.Any = json.loads(conf_str)
+    else:
+        # Third Party Library
+        import yaml
+
+        conf_path = Path(conf_str).expanduser().resolve()
+        with open(conf_path, mode="rt") as f:
+            conf_dict = yaml.safe_load(f)  # json is yaml
+
     conf: ConfigModel = t.cast(
         ConfigModel,
         OmegaConf.merge(
             OmegaConf.structured(ConfigModel),
-            OmegaConf.create(json.loads(os.environ["APP_CONFIG"])),
+            OmegaConf.create(conf_dict),
         ),
     )
+    if (shard_index := os.environ.get("SHARD_INDEX")) is not None:
+        conf.times_app.shard.index = int(shard_index)
+    if (shard_count := os.environ.get("SHARD_COUNT")) is not None:
+        conf.times_app.shard.count = int(shard_count)
+    return conf, conf_path
+
+
+def configure_caches(conf: ConfigModel) -> None:
+    # First Party Library
+    from pollenjp_times.utils import slack as slack_utils
+
+    slack_utils.user_cache.configure(maxsize=conf.times_app.cache.user_maxsize, ttl=conf.times_app.cache.user_ttl)
+    slack_utils.channel_cache.configure(
+        maxsize=conf.times_app.cache.channel_maxsize, ttl=conf.times_app.cache.channel_ttl
+    )
+    slack_utils.message_cache.configure(
+        maxsize=conf.times_app.cache.message_maxsize, ttl=conf.times_app.cache.message_ttl
+    )
+
+
+def configure_rate_limiter(conf: ConfigModel) -> None:
+    # First Party Library
+    from pollenjp_times.utils.ratelimit import rate_limiter
+
+    rate_limit_conf: RateLimitConfig = conf.times_app.rate_limit
+    rate_limiter.configure(
+        limits={
+            kind: (rule.rate, rule.burst)
+            for kind, rule in (
+                ("slack", rate_limit_conf.slack),
+                ("slack_webhook", rate_limit_conf.slack_webhook),
+                ("discord", rate_limit_conf.discord),
+            )
+        },
+        max_retries=rate_limit_conf.max_retries,
+        enabled=rate_limit_conf.enabled,
+    )
+
+
+def prefill_channel_cache(token: str, page_size: int = 200) -> None:
+    # Third Party Library
+    from slack_bolt.app.app import App
+
+    # First Party Library
+    from pollenjp_times.utils import slack as slack_utils
+    from pollenjp_times.utils.http import MeteredWebClient
+
+    try:
+        # conversations.list only needs a web client: skip the auth.test of App(token=...)
+        slack_utils.prefill_channel_cache(
+            App(client=MeteredWebClient(token=token), token_verification_enabled=False), page_size=page_size
+        )
+    except Exception:
+        logger.warning("Failed to prefill the channel cache", exc_info=True)
+
+
+def configure_tracer(conf: ConfigModel) -> None:
+    # First Party Library
+    from pollenjp_times.shard import shard_path
+
+    tracing_conf: TracingConfig = conf.times_app.tracing
+    exporter_kwargs: t.Dict[str, t.Any] = dict(tracing_conf.exporter_kwargs)
+    if tracing_conf.exporter == "jsonl":
+        exporter_kwargs.update(
+            path=shard_path(tracing_conf.path, conf.times_app.shard.index, conf.times_app.shard.count),
+            max_bytes=tracing_conf.max_bytes,
+            backup_count=tracing_conf.backup_count,
+        )
+    tracer.configure(
+        load_exporter(tracing_conf.exporter, **exporter_kwargs),
+        sample_rate=tracing_conf.sample_rate,
+        sample_rates=tracing_conf.sample_rates,
+    )
+    logger.info(f"tracing: {tracing_conf=}")
+
+
+def build_dedup_store(conf: ConfigModel) -> t.Optional[DedupStore]:
+    dedup_conf: DedupConfig = conf.times_app.dedup
+    if not dedup_conf.enabled:
+        return None
+    return DedupStore(maxsize=dedup_conf.maxsize, ttl=dedup_conf.ttl, path=dedup_conf.path)
+
+
+def build_message_index(conf: ConfigModel, index: int = 0, num_shards: int = 1) -> t.Optional[MessageIndex]:
+    # First Party Library
+    from pollenjp_times.shard import shard_path
+
+    index_conf: MessageIndexConfig = conf.times_app.message_index
+    if not index_conf.enabled:
+        return None
+    path: str = ":memory:" if index_conf.path is None else shard_path(index_conf.path, index, num_shards)
+    return MessageIndex(path, retention=index_conf.retention)
+
+
+def build_media(conf: ConfigModel) -> t.Optional["MediaForwarder"]:
+    # First Party Library
+    from pollenjp_times.media import MediaCache
+    from pollenjp_times.media import MediaForwarder
+
+    media_conf: MediaConfig = conf.times_app.media
+    if not media_conf.enabled:
+        return None
+    cache = MediaCache(
+        media_conf.path, max_file_bytes=media_conf.max_file_bytes, max_total_bytes=media_conf.max_cache_bytes
+    )
+    return MediaForwarder(cache, max_upload_bytes=media_conf.max_upload_bytes, rehost_images=media_conf.rehost_images)
+
+
+def is_duplicate(dedup: t.Optional[DedupStore], kind: str, keys: t.List[str]) -> bool:
+    return dedup is not None and not dedup.first_seen(kind, keys)
+
+
+JobQueueT = t.TypeVar("JobQueueT", JobQueue, AsyncJobQueue)
+
+
+def build_job_queue(
+    conf: ConfigModel, job_queue_class: t.Type[JobQueueT], index: int = 0, num_shards: int = 1
+) -> JobQueueT:
+    # First Party Library
+    from pollenjp_times.shard import shard_path
+
+    jobs_conf: JobsConfig = conf.times_app.jobs
+    return job_queue_class(
+        workers=jobs_conf.workers,
+        maxsize=jobs_conf.queue_size,
+        backpressure=jobs_conf.backpressure,
+        spill_path=shard_path(jobs_conf.spill_path, index=index, num_shards=num_shards),
+    )
+
+
+def slack_client_tokens(conf: ConfigModel, owns: t.Callable[[str], bool] = lambda channel_id: True) -> t.List[str]:
+    """Distinct tokens of the slack clients of the callbacks"""
+    tokens: t.Dict[str, None] = {}
+    channels_confs: t.List[t.Union[TimesCallbackConfig, TwitterCallbackConfig]] = [
+        *conf.times_app.times_callback,
+        *conf.times_app.twitter_callback,
+    ]
+    for channels_conf in channels_confs:
+        if owns(channels_conf.host_channel_id):
+            tokens.update(
+                (slack_clients_conf.bot_user_oauth_token, None) for slack_clients_conf in channels_conf.clients.slack
+            )
+    return list(tokens)
+
+
+def host_channel_ids(conf: ConfigModel) -> t.Set[str]:
+    """Source channels of the callbacks (of every shard)"""
+    channels_confs: t.List[t.Union[TimesCallbackConfig, TwitterCallbackConfig]] = [
+        *conf.times_app.times_callback,
+        *conf.times_app.twitter_callback,
+    ]
+    return {channels_conf.host_channel_id for channels_conf in channels_confs}
+
+
+def main() -> None:
+    timer = StartupTimer()
+
+    if (conf_str := os.environ.get("LOGGING_CONF")) is not None:
+        load_logging_conf(Path(__file__).parents[1] / "config" / "logging.conf.yaml")
+        dictConfig(json.loads(conf_str))
+
+    conf, conf_path = load_config()
+    if conf.times_app.logging.queue:
+        enable_queue_logging(maxsize=conf.times_app.logging.queue_size)
+    payload_settings.configure(
+        max_chars=conf.times_app.logging.payload_max_chars, sample_rate=conf.times_app.logging.payload_sample_rate
+    )
     logger.info(f"{conf=}")
 
-    times_app_host = App(token=conf.times_app.host.bot_user_oauth_token)
+    configure_caches(conf)
+    configure_rate_limiter(conf)
+    if conf.times_app.metrics.enabled:
+        metrics.enabled = True
+        metrics_port: int = conf.times_app.metrics.port + conf.times_app.shard.index
+        MetricsServer(metrics, host=conf.times_app.metrics.host, port=metrics_port).start()
+        logger.info(f"metrics: http://{conf.times_app.metrics.host}:{metrics_port}/metrics")
+    if conf.times_app.tracing.enabled:
+        configure_tracer(conf)
+    timer.mark("config")
+    if conf.times_app.cache.prefill_channels:
+        # conversations.list can take many pages: fill the cache in the background (a miss calls conversations.info)
+        threading.Thread(
+            target=prefill_channel_cache,
+            args=(conf.times_app.host.bot_user_oauth_token, conf.times_app.cache.prefill_page_size),
+            name="prefill-channels",
+            daemon=True,
+        ).start()
 
-    callback_list: t.List[SlackCallbackBase] = []
-    callback_list += [
-        TimesCallback(
+    if conf.times_app.runtime == "sync":
+        run(conf, conf_path, timer=timer)
+    elif conf.times_app.runtime == "async":
+        if conf.times_app.outbox.enabled:
+            raise ValueError("The outbox is not supported by the async runtime")
+        if conf.times_app.media.enabled:
+            raise ValueError("Media uploads are not supported by the async runtime")
+        if conf.times_app.shard.count > 1:
+            raise ValueError("Sharding is not supported by the async runtime")
+        asyncio.run(run_async(conf, conf_path, timer=timer))
+    else:
+        raise ValueError(f"Unknown runtime: {conf.times_app.runtime}")
+
+
+def changed_sections(old: ConfigModel, new: ConfigModel) -> t.List[str]:
+    """Dotted names of the top level and ``times_app`` sections which differ"""
+    # Third Party Library
+    from omegaconf import OmegaConf
+
+    old_dict: t.Dict[str, t.Any] = t.cast(t.Dict[str, t.Any], OmegaConf.to_container(t.cast(t.Any, old)))
+    new_dict: t.Dict[str, t.Any] = t.cast(t.Dict[str, t.Any], OmegaConf.to_container(t.cast(t.Any, new)))
+    changed: t.List[str] = [
+        key
+        for key in sorted(old_dict.keys() | new_dict.keys())
+        if key != "times_app" and old_dict.get(key) != new_dict.get(key)
+    ]
+    old_app: t.Dict[str, t.Any] = old_dict["times_app"]
+    new_app: t.Dict[str, t.Any] = new_dict["times_app"]
+    changed += [
+        f"times_app.{key}" for key in sorted(old_app.keys() | new_app.keys()) if old_app.get(key) != new_app.get(key)
+    ]
+    return changed
+
+
+def apply_reloaded_settings(old: ConfigModel, new: ConfigModel) -> None:
+    """Apply the process wide settings of a reloaded config"""
+    changed: t.List[str] = changed_sections(old, new)
+    logger.info(f"config reloaded: {changed=}")
+    if "times_app.cache" in changed:
+        configure_caches(new)
+    if "times_app.rate_limit" in changed:
+        configure_rate_limiter(new)
+    if ignored := [section for section in changed if section not in RELOADABLE_SECTIONS]:
+        logger.warning(f"restart to apply the changes of {ignored}")
+
+
+def rebuild_callbacks(
+    conf: ConfigModel,
+    current: t.Dict[str, "CallbackT"],
+    build_times_callback: t.Callable[[TimesCallbackConfig], "CallbackT"],
+    build_twitter_callback: t.Callable[[TwitterCallbackConfig], "CallbackT"],
+    owns: t.Callable[[str], bool] = lambda channel_id: True,
+) -> t.Dict[str, "CallbackT"]:
+    """Callbacks of ``conf`` keyed by their config. Those already in ``current`` (same config) are reused.
+
+    Args:
+        conf (ConfigModel): config
+        current (t.Dict[str, CallbackT]): running callbacks (the return value of the previous call)
+        build_times_callback (t.Callable[[TimesCallbackConfig], CallbackT]): builds a times callback
+        build_twitter_callback (t.Callable[[TwitterCallbackConfig], CallbackT]): builds a twitter callback
+        owns (t.Callable[[str], bool]): whether this process handles the source channel (see ``ShardRouter``)
+    """
+    # Third Party Library
+    from omegaconf import OmegaConf
+
+    callbacks: t.Dict[str, CallbackT] = {}
+
+    def add(section: str, channels_conf: t.Any, build: t.Callable[[t.Any], "CallbackT"]) -> None:
+        if not owns(channels_conf.host_channel_id):
+            return
+        key: str = f"{section}:{json.dumps(OmegaConf.to_container(channels_conf), sort_keys=True)}"
+        n: int = sum(1 for k in callbacks if k.startswith(key))  # identical entries are distinct callbacks
+        key = f"{key}#{n}"
+        callbacks[key] = current[key] if key in current else build(channels_conf)
+
+    for times_conf in conf.times_app.times_callback:
+        add("times_callback", times_conf, build_times_callback)
+    for twitter_conf in conf.times_app.twitter_callback:
+        add("twitter_callback", twitter_conf, build_twitter_callback)
+    return callbacks
+
+
+def to_filter_rules(filter_conf: FilterConfig) -> "FilterRulesModel":
+    # Third Party Library
+    from omegaconf import OmegaConf
+
+    # First Party Library
+    from pollenjp_times.types import FilterRulesModel
+
+    return FilterRulesModel(**t.cast(t.Dict[str, t.Any], OmegaConf.to_container(t.cast(t.Any, filter_conf))))
+
+
+def to_destination_filter_rules(
+    destination_filters_conf: t.List[DestinationFilterConfig],
+) -> t.Dict[str, "FilterRulesModel"]:
+    return {conf.target: to_filter_rules(conf.filter) for conf in destination_filters_conf}
+
+
+def delete_original(response_url: str) -> None:
+    # First Party Library
+    from pollenjp_times.utils.http import connection_pool
+
+    response = connection_pool.session.post(response_url, json={"delete_original": True}, timeout=10)
+    response.raise_for_status()
+
+
+def build_times_callback(
+    channels_conf: TimesCallbackConfig,
+    *,
+    slack_app: "App",
+    fanout_executor: "FanoutExecutor",
+    outbox: t.Optional["Outbox"] = None,
+    media: t.Optional["MediaForwarder"] = None,
+) -> "SlackCallbackBase":
+    # First Party Library
+    from pollenjp_times.callbacks import TimesCallback
+    from pollenjp_times.types import SlackClientAppModel
+    from pollenjp_times.utils.http import connection_pool
+
+    return TimesCallback(
+        src_channel_id=channels_conf.host_channel_id,
+        src_user_id=channels_conf.host_user_id,
+        tgt_clients=[
+            SlackClientAppModel(
+                app=connection_pool.get_app(slack_clients_conf.bot_user_oauth_token),
+                tgt_channel_id=slack_clients_conf.channel_id,
+            )
+            for slack_clients_conf in channels_conf.clients.slack
+        ],
+        slack_webhook_clients=channels_conf.clients.slack_webhooks,
+        discord_webhook_clients=[
+            connection_pool.get_discord_webhook(discord_webhook_url)
+            for discord_webhook_url in channels_conf.clients.discord
+        ],
+        slack_app=slack_app,
+        fanout_executor=fanout_executor,
+        outbox=outbox,
+        media=media,
+    )
+
+
+def build_twitter_callback(
+    channels_conf: TwitterCallbackConfig,
+    *,
+    slack_app: "App",
+    fanout_executor: "FanoutExecutor",
+    outbox: t.Optional["Outbox"] = None,
+    message_index: t.Optional[MessageIndex] = None,
+    media: t.Optional["MediaForwarder"] = None,
+) -> "SlackCallbackBase":
+    # First Party Library
+    from pollenjp_times.callbacks import TwitterCallback
+    from pollenjp_times.types import SlackClientAppModel
+    from pollenjp_times.utils.http import connection_pool
+
+    return TwitterCallback(
+        src_channel_id=channels_conf.host_channel_id,
+        filter_keyword=channels_conf.filter_keyword,
+        filter_rules=to_filter_rules(channels_conf.filter),
+        destination_filter_rules=to_destination_filter_rules(channels_conf.destination_filters),
+        tgt_clients=[
+            SlackClientAppModel(
+                app=connection_pool.get_app(slack_clients_conf.bot_user_oauth_token),
+                tgt_channel_id=slack_clients_conf.channel_id,
+            )
+            for slack_clients_conf in channels_conf.clients.slack
+        ],
+        discord_webhook_clients=[
+            connection_pool.get_discord_webhook(discord_webhook_url)
+            for discord_webhook_url in channels_conf.clients.discord
+        ],
+        slack_app=slack_app,
+        fanout_executor=fanout_executor,
+        outbox=outbox,
+        message_index=message_index,
+        media=media,
+    )
+
+
+def run(conf: ConfigModel, conf_path: t.Optional[Path] = None, timer: t.Optional[StartupTimer] = None) -> None:
+    # Third Party Library
+    from slack_bolt.adapter.socket_mode.builtin import SocketModeHandler
+    from slack_bolt.app.app import App
+
+    # First Party Library
+    from pollenjp_times.callbacks.base import Callbacks
+    from pollenjp_times.callbacks.base import DiscordWebhookSender
+    from pollenjp_times.callbacks.base import SlackCallbackBase
+    from pollenjp_times.outbox import Outbox
+    from pollenjp_times.shard import ShardedCallbacks
+    from pollenjp_times.shard import ShardRouter
+    from pollenjp_times.shard import ShardServer
+    from pollenjp_times.shard import shard_path
+    from pollenjp_times.utils import slack as slack_utils
+    from pollenjp_times.utils.fanout import FanoutExecutor
+    from pollenjp_times.utils.http import MeteredWebClient
+    from pollenjp_times.utils.http import connection_pool
+
+    timer = timer or StartupTimer()
+    timer.mark("imports")
+
+    shard_conf: ShardConfig = conf.times_app.shard
+    router = ShardRouter(
+        index=shard_conf.index,
+        num_shards=shard_conf.count,
+        # the app token: the same for every shard, and only known to them
+        secret=conf.times_app.host.app_level_token,
+        host=shard_conf.host,
+        base_port=shard_conf.base_port,
+        timeout=shard_conf.forward_timeout,
+        channel_ids=host_channel_ids(conf),
+    )
+    connection_pool.configure(
+        pool_connections=conf.times_app.http.pool_connections, pool_maxsize=conf.times_app.http.pool_maxsize
+    )
+    # every token is verified below (the host is verified by Bolt again on the first request)
+    times_app_host = App(
+        client=MeteredWebClient(token=conf.times_app.host.bot_user_oauth_token), token_verification_enabled=False
+    )
+    # one auth.test per distinct token, all at once: every callback reads the bot user id of the host
+    slack_utils.auth_test_all(
+        [times_app_host.client]
+        + [connection_pool.get_app(token).client for token in slack_client_tokens(conf, owns=router.owns)]
+    )
+    timer.mark("auth_test")
+    fanout_executor = FanoutExecutor(
+        max_workers=conf.times_app.fanout.max_workers,
+        timeout=conf.times_app.fanout.timeout,
+    )
+    message_index: t.Optional[MessageIndex] = build_message_index(
+        conf, index=router.index, num_shards=router.num_shards
+    )
+    outbox: t.Optional[Outbox] = None
+    if conf.times_app.outbox.enabled:
+        outbox = Outbox(
+            shard_path(conf.times_app.outbox.path, index=router.index, num_shards=router.num_shards),
+            max_attempts=conf.times_app.outbox.max_attempts,
+            base_delay=conf.times_app.outbox.base_delay,
+            max_delay=conf.times_app.outbox.max_delay,
+            workers=conf.times_app.outbox.workers,
+        )
+
+    media: t.Optional[MediaForwarder] = build_media(conf)
+
+    build_times = partial(
+        build_times_callback, slack_app=times_app_host, fanout_executor=fanout_executor, outbox=outbox, media=media
+    )
+    build_twitter = partial(
+        build_twitter_callback,
+        slack_app=times_app_host,
+        fanout_executor=fanout_executor,
+        outbox=outbox,
+        message_index=message_index,
+        media=media,
+    )
+
+    def register_destinations(callback_list: t.List[SlackCallbackBase]) -> None:
+        if outbox is not None:
+            for callback in callback_list:
+                for destination in getattr(callback, "destinations", []):
+                    outbox.register(destination)
+
+    callback_dict: t.Dict[str, SlackCallbackBase] = rebuild_callbacks(
+        conf, {}, build_times, build_twitter, owns=router.owns
+    )
+    callback_list: t.List[SlackCallbackBase] = list(callback_dict.values())
+    timer.mark("callbacks")
+    if outbox is not None:
+        # register every configured destination before the deliveries left by the previous run are replayed
+        register_destinations(callback_list)
+        outbox.start()
+    callbacks: Callbacks
+    shard_server: t.Optional[ShardServer] = None
+    if router.num_shards > 1:
+        callbacks = ShardedCallbacks(
+            callback_list, router=router, error_sender=DiscordWebhookSender(webhook_url=conf.discord_webhook_sender)
+        )
+        shard_server = ShardServer(callbacks)
+        shard_server.start()
+    else:
+        callbacks = Callbacks(callback_list, error_sender=DiscordWebhookSender(webhook_url=conf.discord_webhook_sender))
+
+    def reload() -> None:
+        nonlocal conf, callback_dict
+        new_conf: ConfigModel = load_config()[0]
+        apply_reloaded_settings(conf, new_conf)
+        new_callback_dict: t.Dict[str, SlackCallbackBase] = rebuild_callbacks(
+            new_conf, callback_dict, build_times, build_twitter, owns=router.owns
+        )
+        added: t.List[SlackCallbackBase] = [c for key, c in new_callback_dict.items() if key not in callback_dict]
+        register_destinations(added)
+        router.channel_ids = frozenset(host_channel_ids(new_conf))
+        callbacks.callbacks = list(new_callback_dict.values())
+        callbacks.build_index()
+        fanout_executor.prune(
+            destination.key for callback in callbacks.callbacks for destination in getattr(callback, "destinations", [])
+        )
+        logger.info(
+            f"callbacks reloaded: added={len(added)}, removed={len(callback_dict.keys() - new_callback_dict.keys())}, "
+            f"total={len(new_callback_dict)}"
+        )
+        conf, callback_dict = new_conf, new_callback_dict
+
+    config_watcher: t.Optional[ConfigWatcher] = None
+    if conf_path is not None and conf.times_app.reload.watch:
+        config_watcher = ConfigWatcher(conf_path, reload, interval=conf.times_app.reload.interval).start()
+
+    def job_transfer_send_button(body: t.Dict[str, t.Any]) -> None:
+        with tracer.trace("action_transfer_send_button", channel=(body.get("channel") or {}).get("id")):
+            callbacks.action_transfer_send_button(body=body)
+            delete_original(body["response_url"])
+
+    def job_delete_original(body: t.Dict[str, t.Any]) -> None:
+        with tracer.trace("action_delete_original", channel=(body.get("channel") or {}).get("id")):
+            delete_original(body["response_url"])
+
+    def job_message(event: t.Dict[str, t.Any], message: t.Dict[str, t.Any], say: t.Optional["Say"] = None) -> None:
+        with tracer.trace("event_message", channel=event.get("channel"), ts=event.get("ts")):
+            callbacks.event_message(
+                event=event,
+                message=message,
+                say=say,
+            )
+
+    jobs = build_job_queue(conf, JobQueue, index=router.index, num_shards=router.num_shards)
+    jobs.register("action_transfer_send_button", job_transfer_send_button)
+    jobs.register("action_delete_original", job_delete_original)
+    jobs.register("event_message", job_message)
+    jobs.start()
+    dedup: t.Optional[DedupStore] = build_dedup_store(conf)
+
+    @times_app_host.action("action_transfer_send_button")
+    def action_transfer_send_button(ack: t.Callable[[], None], body: t.Dict[str, t.Any]) -> None:
+        ack()
+        logger.info("%s", summarize("action_transfer_send_button", body))
+        if is_duplicate(dedup, "action_transfer_send_button", action_keys(body)):
+            return
+        log_payload(logger, body=body)
+        jobs.submit("action_transfer_send_button", body=body)
+
+    @times_app_host.action("action_delete_original")
+    def action_delete_original(ack: t.Callable[[], None], body: t.Dict[str, t.Any]) -> None:
+        ack()
+        logger.info("%s", summarize("action_delete_original", body))
+        if is_duplicate(dedup, "action_delete_original", action_keys(body)):
+            return
+        log_payload(logger, body=body)
+        jobs.submit("action_delete_original", body=body)
+
+    @times_app_host.event("message")
+    def event_message(
+        event: t.Dict[str, t.Any], message: t.Dict[str, t.Any], say: "Say", body: t.Dict[str, t.Any]
+    ) -> None:
+        logger.info("%s", summarize("event_message", event))
+        if is_duplicate(dedup, "event_message", event_keys(body, event)):
+            return
+        log_payload(logger, event=event)
+        jobs.submit("event_message", event=event, message=message, say=say)
+
+    @times_app_host.event("user_change")
+    def event_user_change(event: t.Dict[str, t.Any]) -> None:
+        logger.info("%s", summarize("event_user_change", event))
+        log_payload(logger, event=event)
+        callbacks.event_user_change(event=event)
+
+    @times_app_host.event("channel_rename")
+    def event_channel_rename(event: t.Dict[str, t.Any]) -> None:
+        logger.info("%s", summarize("event_channel_rename", event))
+        log_payload(logger, event=event)
+        callbacks.event_channel_rename(event=event)
+
+    @times_app_host.event("channel_archive")
+    def event_channel_archive(event: t.Dict[str, t.Any]) -> None:
+        logger.info("%s", summarize("event_channel_archive", event))
+        log_payload(logger, event=event)
+        callbacks.event_channel_archive(event=event)
+
+    @times_app_host.event("channel_unarchive")
+    def event_channel_unarchive(event: t.Dict[str, t.Any]) -> None:
+        logger.info("%s", summarize("event_channel_unarchive", event))
+        log_payload(logger, event=event)
+        callbacks.event_channel_unarchive(event=event)
+
+    @times_app_host.event("channel_deleted")
+    def event_channel_deleted(event: t.Dict[str, t.Any]) -> None:
+        logger.info("%s", summarize("event_channel_deleted", event))
+        log_payload(logger, event=event)
+        callbacks.event_channel_deleted(event=event)
+
+    logger.info(f"shard {router.index}/{router.num_shards}: {callback_list=}")
+
+    try:
+        handler = SocketModeHandler(times_app_host, conf.times_app.host.app_level_token)
+        handler.connect()  # type: ignore
+        timer.mark("connect")
+        logger.info(f"startup: {timer.summary()}")
+        threading.Event().wait()
+    finally:
+        if config_watcher is not None:
+            config_watcher.stop()
+        if shard_server is not None:
+            shard_server.stop()
+        jobs.stop(timeout=conf.times_app.jobs.stop_timeout)
+        # the queued deliveries are done: only a hung send is left behind
+        fanout_executor.shutdown(wait=False)
+        if outbox is not None:
+            outbox.close()
+        if dedup is not None:
+            dedup.close()
+        if message_index is not None:
+            message_index.close()
+        if media is not None:
+            media.close()
+
+
+async def run_async(
+    conf: ConfigModel, conf_path: t.Optional[Path] = None, timer: t.Optional[StartupTimer] = None
+) -> None:
+    # Third Party Library
+    from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+    from slack_bolt.async_app import AsyncApp
+    from slack_sdk.webhook.async_client import AsyncWebhookClient
+
+    # First Party Library
+    from pollenjp_times.callbacks import AsyncTimesCallback
+    from pollenjp_times.callbacks import AsyncTwitterCallback
+    from pollenjp_times.callbacks.base import AsyncCallbacks
+    from pollenjp_times.callbacks.base import AsyncSlackCallbackBase
+    from pollenjp_times.callbacks.base import DiscordWebhookSender
+    from pollenjp_times.types import AsyncSlackClientAppModel
+    from pollenjp_times.utils import slack_async as slack_async_utils
+    from pollenjp_times.utils.fanout import AsyncFanoutExecutor
+    from pollenjp_times.utils.http import AsyncConnectionPool
+    from pollenjp_times.utils.http import AsyncMeteredWebClient
+
+    timer = timer or StartupTimer()
+    timer.mark("imports")
+
+    message_index: t.Optional[MessageIndex] = build_message_index(conf)
+    fanout_executor = AsyncFanoutExecutor(
+        max_workers=conf.times_app.fanout.max_workers,
+        timeout=conf.times_app.fanout.timeout,
+    )
+    pool = AsyncConnectionPool(
+        pool_connections=conf.times_app.http.pool_connections, pool_maxsize=conf.times_app.http.pool_maxsize
+    )
+    session = pool.session
+    times_app_host = AsyncApp(
+        client=AsyncMeteredWebClient(token=conf.times_app.host.bot_user_oauth_token, session=session)
+    )
+
+    def build_times_callback(channels_conf: TimesCallbackConfig) -> AsyncSlackCallbackBase:
+        return AsyncTimesCallback(
             src_channel_id=channels_conf.host_channel_id,
             src_user_id=channels_conf.host_user_id,
             tgt_clients=[
-                SlackClientAppModel(
-                    app=App(token=slack_clients_conf.bot_user_oauth_token),
+                AsyncSlackClientAppModel(
+                    app=pool.get_app(slack_clients_conf.bot_user_oauth_token),
                     tgt_channel_id=slack_clients_conf.channel_id,
                 )
                 for slack_clients_conf in channels_conf.clients.slack
             ],
-            slack_webhook_clients=channels_conf.clients.slack_webhooks,
+            slack_webhook_clients=[
+                AsyncWebhookClient(url=webhook_url, session=session)
+                for webhook_url in channels_conf.clients.slack_webhooks
+            ],
             discord_webhook_clients=[
-                discord.webhook.sync.SyncWebhook.from_url(discord_webhook_url)
-                for discord_webhook_url in channels_conf.clients.discord
+                pool.get_discord_webhook(discord_webhook_url) for discord_webhook_url in channels_conf.clients.discord
             ],
             slack_app=times_app_host,
+            fanout_executor=fanout_executor,
         )
-        for channels_conf in conf.times_app.times_callback
-    ]
-    callback_list += [
-        TwitterCallback(
+
+    def build_twitter_callback(channels_conf: TwitterCallbackConfig) -> AsyncSlackCallbackBase:
+        return AsyncTwitterCallback(
             src_channel_id=channels_conf.host_channel_id,
             filter_keyword=channels_conf.filter_keyword,
+            filter_rules=to_filter_rules(channels_conf.filter),
+            destination_filter_rules=to_destination_filter_rules(channels_conf.destination_filters),
             tgt_clients=[
-                SlackClientAppModel(
-                    app=App(token=slack_clients_conf.bot_user_oauth_token),
+                AsyncSlackClientAppModel(
+                    app=pool.get_app(slack_clients_conf.bot_user_oauth_token),
                     tgt_channel_id=slack_clients_conf.channel_id,
                 )
                 for slack_clients_conf in channels_conf.clients.slack
             ],
             discord_webhook_clients=[
-                discord.webhook.sync.SyncWebhook.from_url(discord_webhook_url)
-                for discord_webhook_url in channels_conf.clients.discord
+                pool.get_discord_webhook(discord_webhook_url) for discord_webhook_url in channels_conf.clients.discord
             ],
             slack_app=times_app_host,
+            fanout_executor=fanout_executor,
+            message_index=message_index,
         )
-        for channels_conf in conf.times_app.twitter_callback
-    ]
-    callbacks: Callbacks = Callbacks(
-        callback_list, error_sender=DiscordWebhookSender(webhook_url=conf.discord_webhook_sender)
-    )
 
-    @times_app_host.action("action_transfer_send_button")
-    def action_transfer_send_button(ack: t.Callable[[], None], body: t.Dict[str, t.Any]) -> None:
-        ack()
-        logger.info(f"{body=}")
-        callbacks.action_transfer_send_button(body=body)
-        client: WebhookClient = WebhookClient(url=body["response_url"])
-        client.send(delete_original=True)
+    config_watcher: t.Optional[ConfigWatcher] = None
+    jobs = build_job_queue(conf, AsyncJobQueue)
+    dedup: t.Optional[DedupStore] = build_dedup_store(conf)
+    try:
+        # one auth.test per distinct token, all at once (it verifies the tokens of the clients too)
+        await asyncio.gather(
+            *[
+                slack_async_utils.auth_test(client)
+                for client in [times_app_host.client]
+                + [pool.get_app(token).client for token in slack_client_tokens(conf)]
+            ]
+        )
+        timer.mark("auth_test")
+        callback_dict: t.Dict[str, AsyncSlackCallbackBase] = rebuild_callbacks(
+            conf, {}, build_times_callback, build_twitter_callback
+        )
+        callbacks: AsyncCallbacks = AsyncCallbacks(
+            list(callback_dict.values()), error_sender=DiscordWebhookSender(webhook_url=conf.discord_webhook_sender)
+        )
+        await callbacks.setup()
+        timer.mark("callbacks")
 
-    @times_app_host.action("action_delete_original")
-    def action_delete_original(ack: t.Callable[[], None], body: t.Dict[str, t.Any]) -> None:
-        ack()
-        logger.info(f"{body=}")
-        client: WebhookClient = WebhookClient(url=body["response_url"])
-        client.send(delete_original=True)
+        async def reload() -> None:
+            nonlocal conf, callback_dict
+            new_conf: ConfigModel = load_config()[0]
+            apply_reloaded_settings(conf, new_conf)
+            new_callback_dict: t.Dict[str, AsyncSlackCallbackBase] = rebuild_callbacks(
+                new_conf, callback_dict, build_times_callback, build_twitter_callback
+            )
+            added: t.List[AsyncSlackCallbackBase] = [
+                c for key, c in new_callback_dict.items() if key not in callback_dict
+            ]
+            await asyncio.gather(*[c.setup() for c in added])
+            callbacks.callbacks = list(new_callback_dict.values())
+            callbacks.build_index()
+            logger.info(
+                f"callbacks reloaded: added={len(added)}, "
+                f"removed={len(callback_dict.keys() - new_callback_dict.keys())}, total={len(new_callback_dict)}"
+            )
+            conf, callback_dict = new_conf, new_callback_dict
 
-    @times_app_host.event("message")
-    def event_message(event: t.Dict[str, t.Any], message: t.Dict[str, t.Any], say: Say) -> None:
-        logger.info(f"{event=}")
-        callbacks.event_message(
-            event=event,
-            message=message,
-            say=say,
-        )
+        if conf_path is not None and conf.times_app.reload.watch:
+            loop = asyncio.get_running_loop()
+            # the watcher thread waits for the reload on the event loop, so reloads never overlap
+            config_watcher = ConfigWatcher(
+                conf_path,
+                lambda: asyncio.run_coroutine_threadsafe(reload(), loop).result(),
+                interval=conf.times_app.reload.interval,
+            ).start()
+
+        async def job_transfer_send_button(body: t.Dict[str, t.Any]) -> None:
+            with tracer.trace("action_transfer_send_button", channel=(body.get("channel") or {}).get("id")):
+                await callbacks.action_transfer_send_button(body=body)
+                await AsyncWebhookClient(url=body["response_url"], session=session).send(delete_original=True)
+
+        async def job_delete_original(body: t.Dict[str, t.Any]) -> None:
+            with tracer.trace("action_delete_original", channel=(body.get("channel") or {}).get("id")):
+                await AsyncWebhookClient(url=body["response_url"], session=session).send(delete_original=True)
+
+        async def job_message(event: t.Dict[str, t.Any], message: t.Dict[str, t.Any]) -> None:
+            with tracer.trace("event_message", channel=event.get("channel"), ts=event.get("ts")):
+                await callbacks.event_message(event=event, message=message)
+
+        jobs.register("action_transfer_send_button", job_transfer_send_button)
+        jobs.register("action_delete_original", job_delete_original)
+        jobs.register("event_message", job_message)
+        jobs.start()
+
+        @times_app_host.action("action_transfer_send_button")
+        async def action_transfer_send_button(ack: t.Callable[[], t.Awaitable[None]], body: t.Dict[str, t.Any]) -> None:
+            await ack()
+            logger.info("%s", summarize("action_transfer_send_button", body))
+            if is_duplicate(dedup, "action_transfer_send_button", action_keys(body)):
+                return
+            log_payload(logger, body=body)
+            await jobs.submit("action_transfer_send_button", body=body)
+
+        @times_app_host.action("action_delete_original")
+        async def action_delete_original(ack: t.Callable[[], t.Awaitable[None]], body: t.Dict[str, t.Any]) -> None:
+            await ack()
+            logger.info("%s", summarize("action_delete_original", body))
+            if is_duplicate(dedup, "action_delete_original", action_keys(body)):
+                return
+            log_payload(logger, body=body)
+            await jobs.submit("action_delete_original", body=body)
+
+        @times_app_host.event("message")
+        async def event_message(
+            event: t.Dict[str, t.Any], message: t.Dict[str, t.Any], body: t.Dict[str, t.Any]
+        ) -> None:
+            logger.info("%s", summarize("event_message", event))
+            if is_duplicate(dedup, "event_message", event_keys(body, event)):
+                return
+            log_payload(logger, event=event)
+            await jobs.submit("event_message", event=event, message=message)
+
+        @times_app_host.event("user_change")
+        async def event_user_change(event: t.Dict[str, t.Any]) -> None:
+            logger.info("%s", summarize("event_user_change", event))
+            log_payload(logger, event=event)
+            await callbacks.event_user_change(event=event)
+
+        @times_app_host.event("channel_rename")
+        async def event_channel_rename(event: t.Dict[str, t.Any]) -> None:
+            logger.info("%s", summarize("event_channel_rename", event))
+            log_payload(logger, event=event)
+            await callbacks.event_channel_rename(event=event)
+
+        @times_app_host.event("channel_archive")
+        async def event_channel_archive(event: t.Dict[str, t.Any]) -> None:
+            logger.info("%s", summarize("event_channel_archive", event))
+            log_payload(logger, event=event)
+            await callbacks.event_channel_archive(event=event)
+
+        @times_app_host.event("channel_unarchive")
+        async def event_channel_unarchive(event: t.Dict[str, t.Any]) -> None:
+            logger.info("%s", summarize("event_channel_unarchive", event))
+            log_payload(logger, event=event)
+            await callbacks.event_channel_unarchive(event=event)
+
+        @times_app_host.event("channel_deleted")
+        async def event_channel_deleted(event: t.Dict[str, t.Any]) -> None:
+            logger.info("%s", summarize("event_channel_deleted", event))
+            log_payload(logger, event=event)
+            await callbacks.event_channel_deleted(event=event)
 
-    logger.info(f"{callback_list=}")
+        logger.info(f"{callbacks.callbacks=}")
 
-    SocketModeHandler(times_app_host, conf.times_app.host.app_level_token).start()  # type: ignore
+        handler = AsyncSocketModeHandler(times_app_host, conf.times_app.host.app_level_token)
+        await handler.connect_async()  # type: ignore
+        timer.mark("connect")
+        logger.info(f"startup: {timer.summary()}")
+        await asyncio.Event().wait()
+    finally:
+        if config_watcher is not None:
+            await asyncio.get_running_loop().run_in_executor(None, config_watcher.stop)
+        await jobs.stop(timeout=conf.times_app.jobs.stop_timeout)
+        await pool.close()
+        if dedup is not None:
+            dedup.close()
+        if message_index is not None:
+            message_index.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+# Standard Library
+import os
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from logging import NullHandler
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+# First Party Library
+from pollenjp_times.callbacks.base import SlackCallbackBase
+from pollenjp_times.destinations import Destination
+from pollenjp_times.destinations import Payload
+from pollenjp_times.message_index import source_key
+from pollenjp_times.types import BackfillCheckpointModel
+from pollenjp_times.types import DeliveryResult
+from pollenjp_times.utils.slack import iter_conversations_history
+from pollenjp_times.utils.tracing import tracer
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class Checkpoint:
+    """``BackfillCheckpointModel`` in a json file, replaced atomically"""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path: Path = Path(path)
+
+    def load(self, channel_id: str) -> Optional[BackfillCheckpointModel]:
+        if not self.path.exists():
+            return None
+        checkpoint: BackfillCheckpointModel = BackfillCheckpointModel.parse_file(self.path)
+        if checkpoint.channel_id != channel_id:
+            raise ValueError(f"{self.path} is the checkpoint of another channel: {checkpoint.channel_id}")
+        return checkpoint
+
+    def save(self, checkpoint: BackfillCheckpointModel) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: Path = self.path.with_name(f"{self.path.name}.tmp")
+        tmp_path.write_text(checkpoint.json(), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def select_targets(destinations: Sequence[Destination], targets: Optional[Sequence[str]]) -> Set[str]:
+    """Keys of the destinations whose ``target`` (channel id of a slack client, id of a discord webhook, ...) is in
+    ``targets`` (``None``: every destination)"""
+    if targets is None:
+        return {destination.key for destination in destinations}
+    if unknown := set(targets) - {destination.target for destination in destinations}:
+        raise ValueError(
+            f"Unknown destinations: {sorted(unknown)} (expected some of {[d.target for d in destinations]})"
+        )
+    return {destination.key for destination in destinations if destination.target in targets}
+
+
+class Backfill:
+    """Mirror the history of the source channel of ``callback``, from the oldest message on
+
+    The messages are read page by page (``page_size``) and rendered by the callback (``history_deliveries``). Up to
+    ``workers`` messages are delivered at once, each to its destinations in parallel (the fanout executor of the
+    callback), at the pace of the rate limiter. With ``workers > 1`` two close messages may arrive in either order.
+
+    The checkpoint is the last message up to which every message was handled: it is saved after each message, and an
+    interrupted backfill resumes after it. The first failed delivery stops the backfill there (the messages after it
+    which were in flight are delivered again on resume). Give the callback a fanout executor without timeout: a timed
+    out send may still arrive after the backfill stopped before its message, and is then posted again on resume.
+
+    Args:
+        callback (SlackCallbackBase): renders the messages and delivers them
+        targets (Optional[Sequence[str]]): ``target`` of the destinations to deliver to. ``None``: all of them
+        checkpoint (Optional[Checkpoint]): ``None``: the backfill cannot be resumed
+        workers (int): messages in flight
+        page_size (int): messages requested per conversations.history call
+    """
+
+    def __init__(
+        self,
+        callback: SlackCallbackBase,
+        targets: Optional[Sequence[str]] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        workers: int = 1,
+        page_size: int = 200,
+    ) -> None:
+        if callback.src_channel_id is None:
+            raise ValueError("The callback has no source channel")
+        self.callback: SlackCallbackBase = callback
+        self.channel_id: str = callback.src_channel_id
+        self.destination_keys: Set[str] = select_targets(getattr(callback, "destinations", []), targets)
+        self.checkpoint: Optional[Checkpoint] = checkpoint
+        self.workers: int = workers
+        self.page_size: int = page_size
+
+    def run(self, oldest: str = "0", latest: Optional[str] = None) -> BackfillCheckpointModel:
+        """Mirror the messages after ``oldest`` up to ``latest`` (Slack ts). Returns the progress: its ``ts`` is
+        ``latest`` (or the last message) when the backfill is complete."""
+        progress: BackfillCheckpointModel = BackfillCheckpointModel(channel_id=self.channel_id, ts=oldest)
+        if self.checkpoint is not None and (saved := self.checkpoint.load(self.channel_id)) is not None:
+            if float(saved.ts) > float(oldest):
+                progress = saved
+                logger.info(f"resuming the backfill: {progress=}")
+        failed: bool = False
+        in_flight: Deque[Tuple[str, "Future[Optional[List[DeliveryResult]]]"]] = deque()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill") as executor:
+            for page in iter_conversations_history(
+                self.callback.slack_app, self.channel_id, oldest=progress.ts, latest=latest, page_size=self.page_size
+            ):
+                logger.info(f"backfill page: {len(page)} messages from ts={page[0]['ts']}")
+                for message in page:
+                    while len(in_flight) >= self.workers and not failed:
+                        failed = not self._complete(in_flight.popleft(), progress)
+                    if failed:
+                        break
+                    in_flight.append((message["ts"], executor.submit(self._mirror, message)))
+                if failed:
+                    break
+            while in_flight and not failed:
+                failed = not self._complete(in_flight.popleft(), progress)
+            for _, future in in_flight:
+                future.cancel()
+        if failed:
+            raise RuntimeError(f"Backfill stopped by a failed delivery: resume after ts={progress.ts}")
+        logger.info(f"backfill done: {progress=}")
+        return progress
+
+    def _mirror(self, message: Dict[str, Any]) -> Optional[List[DeliveryResult]]:
+        """The delivery results of ``message`` (``None``: not mirrored)"""
+        with tracer.trace("backfill.message", channel=self.channel_id):
+            deliveries: List[Tuple[Destination, List[Payload]]] = [
+                (destination, payloads)
+                for destination, payloads in self.callback.history_deliveries(message)
+                if destination.key in self.destination_keys and payloads
+            ]
+            if not deliveries:
+                return None
+            # the version of the history: a live edit handled since then is not overwritten
+            version: str = (message.get("edited") or {}).get("ts") or message["ts"]
+            return self.callback.deliver_mirror(source_key(self.channel_id, message["ts"]), deliveries, version)
+
+    def _complete(
+        self, item: Tuple[str, "Future[Optional[List[DeliveryResult]]]"], progress: BackfillCheckpointModel
+    ) -> bool:
+        """Wait for a message and move the checkpoint past it. Returns ``False`` if a delivery failed."""
+        ts, future = item
+        results: Optional[List[DeliveryResult]] = future.result()
+        if results is not None and not all(result.ok for result in results):
+            if any(result.timed_out for result in results):
+                logger.warning(f"backfill delivery timed out, it may still arrive and be posted again on resume: {ts=}")
+            logger.error(f"backfill delivery failed: {ts=}, {results=}")
+            return False
+        progress.ts = ts
+        if results is None:
+            progress.skipped += 1
+        else:
+            progress.delivered += 1
+        if self.checkpoint is not None:
+            self.checkpoint.save(progress)
+        return True
@@ -1,8 +1,12 @@
 # Local Library
+from .times import AsyncTimesCallback
 from .times import TimesCallback
+from .twitter import AsyncTwitterCallback
 from .twitter import TwitterCallback
 
 __all__ = [
+    "AsyncTimesCallback",
+    "AsyncTwitterCallback",
     "TimesCallback",
     "TwitterCallback",
 ]
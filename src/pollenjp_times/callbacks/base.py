@@ -1,17 +1,48 @@
 # Standard Library
 import abc
+import asyncio
+import threading
+import time
 import traceback
 import typing as t
+from functools import partial
 from logging import NullHandler
 from logging import getLogger
 
 # Third Party Library
 import discord
 from slack_bolt import App
+from slack_bolt.async_app import AsyncApp
+
+# First Party Library
+from pollenjp_times.destinations import AsyncDestination
+from pollenjp_times.destinations import Destination
+from pollenjp_times.destinations import Payload
+from pollenjp_times.media import MediaForwarder
+from pollenjp_times.message_index import MessageIndex
+from pollenjp_times.message_index import is_stale
+from pollenjp_times.outbox import Outbox
+from pollenjp_times.types import DeliveryResult
+from pollenjp_times.utils.fanout import AsyncFanoutExecutor
+from pollenjp_times.utils.fanout import FanoutExecutor
+from pollenjp_times.utils.fanout import waiting
+from pollenjp_times.utils.fanout import waiting_async
+from pollenjp_times.utils.http import connection_pool
+from pollenjp_times.utils.metrics import dispatch_seconds
+from pollenjp_times.utils.metrics import events_total
+from pollenjp_times.utils.slack import auth_test
+from pollenjp_times.utils.slack import invalidate_user_cache
+from pollenjp_times.utils.slack import update_channel_cache
+from pollenjp_times.utils.slack import update_message_cache
+from pollenjp_times.utils.slack_async import auth_test as auth_test_async
+from pollenjp_times.utils.tracing import tracer
 
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
+SENDER_USERNAME: str = "pollenJP"
+SENDER_ICON_URL: str = "https://i.gyazo.com/4d3a544918c1bebb5c02f37c7789f765.jpg"
+
 
 class Sender:
     @abc.abstractmethod
@@ -21,16 +52,128 @@ class Sender:
 
 class DiscordWebhookSender(Sender):
     def __init__(self, webhook_url: str) -> None:
-        self.app: discord.webhook.sync.SyncWebhook = discord.webhook.sync.SyncWebhook.from_url(webhook_url)
+        self.app: discord.webhook.sync.SyncWebhook = connection_pool.get_discord_webhook(webhook_url)
 
     def send(self, text: str) -> None:
         self.app.send(content=text)
 
 
+def log_delivery_results(results: t.List[DeliveryResult]) -> None:
+    for result in results:
+        if result.ok:
+            logger.info(f"delivered: {result.destination=}, {result.elapsed=:.3f}")
+        else:
+            logger.error(f"failed to deliver: {result.destination=}, {result.timed_out=}, {result.error=}")
+
+
 class SlackCallbackBase:
-    def __init__(self, *args: t.Any, slack_app: App, **kwargs: t.Any) -> None:
+    # the channel whose events this callback handles (``None``: events of every channel).
+    # ``Callbacks`` uses it to route events, so set it before the callback is registered.
+    src_channel_id: t.Optional[str] = None
+
+    def __init__(
+        self,
+        *args: t.Any,
+        slack_app: App,
+        fanout_executor: t.Optional[FanoutExecutor] = None,
+        outbox: t.Optional[Outbox] = None,
+        message_index: t.Optional[MessageIndex] = None,
+        media: t.Optional[MediaForwarder] = None,
+        **kwargs: t.Any,
+    ) -> None:
         self.slack_app: App = slack_app
-        self.bot_id: str = t.cast(str, self.slack_app.client.auth_test()["user_id"])
+        self.bot_id: str = t.cast(str, auth_test(self.slack_app.client)["user_id"])
+        self.fanout_executor: FanoutExecutor = fanout_executor or FanoutExecutor()
+        self.outbox: t.Optional[Outbox] = outbox
+        self.message_index: t.Optional[MessageIndex] = message_index
+        self.media: t.Optional[MediaForwarder] = media
+
+    def deliver(self, deliveries: t.List[t.Tuple[Destination, t.List[Payload]]]) -> t.List[DeliveryResult]:
+        """Send the payloads to each destination.
+
+        With an outbox the payloads are queued (and sent in the background with retries), so no result is returned.
+        """
+        deliveries = [(destination, payloads) for destination, payloads in deliveries if payloads]
+        if self.outbox is not None:
+            for destination, payloads in deliveries:
+                self.outbox.enqueue(destination, payloads)
+            return []
+        results: t.List[DeliveryResult] = self.fanout_executor.run(
+            [(destination.key, partial(destination.send_all, payloads)) for destination, payloads in deliveries]
+        )
+        log_delivery_results(results)
+        return results
+
+    def fetch_files(
+        self, message: t.Dict[str, t.Any], destinations: t.Sequence[Destination]
+    ) -> t.Tuple[t.List[t.Dict[str, t.Any]], t.List[str]]:
+        """(files of ``message`` to upload, a line per file which could not be fetched), for the Discord destinations
+        (nothing without ``media``)"""
+        if self.media is None or not any(destination.kind == "discord" for destination in destinations):
+            return [], []
+        return self.media.fetch_slack_files(message, token=self.slack_app.client.token or "")
+
+    @property
+    def tracks_posts(self) -> bool:
+        # the outbox sends later and drops the responses: the ids of the posts are unknown
+        return self.message_index is not None and self.outbox is None
+
+    def deliver_mirror(
+        self,
+        source: str,
+        deliveries: t.List[t.Tuple[Destination, t.List[Payload]]],
+        version: t.Optional[str] = None,
+    ) -> t.List[DeliveryResult]:
+        """``deliver`` the mirror of the source message ``source`` (``source_key``): the posts it produced before are
+        edited instead of posted again. ``version`` (``ts`` of the event): the posts are left as they are if they
+        already show a later version of the source."""
+        if not self.tracks_posts:
+            return self.deliver(deliveries)
+        results: t.List[DeliveryResult] = self.fanout_executor.run(
+            [
+                (destination.key, partial(self._sync_mirror, source, destination, payloads, version))
+                for destination, payloads in deliveries
+                if payloads
+            ]
+        )
+        log_delivery_results(results)
+        return results
+
+    def _sync_mirror(
+        self, source: str, destination: Destination, payloads: t.List[Payload], version: t.Optional[str]
+    ) -> t.List[str]:
+        assert self.message_index is not None
+        lock: threading.Lock = self.message_index.post_lock(source, destination.key)
+        with waiting():  # no fanout slot is held while another delivery of the source syncs
+            lock.acquire()
+        try:
+            message_ids: t.List[str] = self.message_index.get(source, destination.key)
+            if version is not None and is_stale(version, synced := self.message_index.version(source, destination.key)):
+                logger.info(
+                    f"skipping an older version of the source: {source=}, {destination=}, {version=}, {synced=}"
+                )
+                return message_ids
+            message_ids = destination.sync_all(message_ids, payloads)
+            self.message_index.set(source, destination.key, message_ids, version)
+        finally:
+            lock.release()
+        return message_ids
+
+    def delete_mirror(
+        self, source: str, destinations: t.Sequence[Destination], version: t.Optional[str] = None
+    ) -> t.List[DeliveryResult]:
+        """Delete the posts the source message ``source`` produced"""
+        if not self.tracks_posts:
+            return []
+        # every destination: a post still being sent is only known once its lock is released
+        results: t.List[DeliveryResult] = self.fanout_executor.run(
+            [
+                (destination.key, partial(self._sync_mirror, source, destination, [], version))
+                for destination in destinations
+            ]
+        )
+        log_delivery_results(results)
+        return results
 
     def event_message(self, **kwargs: t.Any) -> None:
         pass
@@ -56,51 +199,276 @@ class SlackCallbackBase:
     def event_reaction_removed(self, **kwargs: t.Any) -> None:
         pass
 
+    def event_user_change(self, **kwargs: t.Any) -> None:
+        pass
+
     def action_transfer_send_button(self, body: t.Dict[str, t.Any]) -> None:
         pass
 
+    def history_deliveries(self, message: t.Dict[str, t.Any]) -> t.List[t.Tuple[Destination, t.List[Payload]]]:
+        """What mirroring ``message``, an older message of ``src_channel_id``, would deliver (used by the backfill).
+        ``[]``: the callback does not mirror it."""
+        return []
+
+
+class AsyncSlackCallbackBase:
+    """asyncio version of ``SlackCallbackBase``. Every hook is a coroutine function."""
+
+    src_channel_id: t.Optional[str] = None
+
+    def __init__(
+        self,
+        *args: t.Any,
+        slack_app: AsyncApp,
+        fanout_executor: t.Optional[AsyncFanoutExecutor] = None,
+        message_index: t.Optional[MessageIndex] = None,
+        **kwargs: t.Any,
+    ) -> None:
+        self.slack_app: AsyncApp = slack_app
+        self.bot_id: t.Optional[str] = None
+        self.fanout_executor: AsyncFanoutExecutor = fanout_executor or AsyncFanoutExecutor()
+        self.message_index: t.Optional[MessageIndex] = message_index
+
+    async def setup(self) -> None:
+        """Requests which can not run in ``__init__`` (there is no running event loop yet)."""
+        self.bot_id = t.cast(str, (await auth_test_async(self.slack_app.client))["user_id"])
+
+    async def deliver(self, deliveries: t.List[t.Tuple[AsyncDestination, t.List[Payload]]]) -> t.List[DeliveryResult]:
+        results: t.List[DeliveryResult] = await self.fanout_executor.run(
+            [
+                (destination.key, partial(destination.send_all, payloads))
+                for destination, payloads in deliveries
+                if payloads
+            ]
+        )
+        log_delivery_results(results)
+        return results
+
+    @property
+    def tracks_posts(self) -> bool:
+        return self.message_index is not None
 
-class Callbacks:
-    def __init__(self, callbacks: t.List[SlackCallbackBase], error_sender: t.Optional[Sender] = None) -> None:
-        self.callbacks = callbacks
-        self.error_sender = error_sender
+    async def deliver_mirror(
+        self,
+        source: str,
+        deliveries: t.List[t.Tuple[AsyncDestination, t.List[Payload]]],
+        version: t.Optional[str] = None,
+    ) -> t.List[DeliveryResult]:
+        if not self.tracks_posts:
+            return await self.deliver(deliveries)
+        results: t.List[DeliveryResult] = await self.fanout_executor.run(
+            [
+                (destination.key, partial(self._sync_mirror, source, destination, payloads, version))
+                for destination, payloads in deliveries
+                if payloads
+            ]
+        )
+        log_delivery_results(results)
+        return results
+
+    async def _sync_mirror(
+        self, source: str, destination: AsyncDestination, payloads: t.List[Payload], version: t.Optional[str]
+    ) -> t.List[str]:
+        assert self.message_index is not None
+        lock: asyncio.Lock = self.message_index.async_post_lock(source, destination.key)
+        async with waiting_async():
+            await lock.acquire()
+        try:
+            message_ids: t.List[str] = self.message_index.get(source, destination.key)
+            if version is not None and is_stale(version, synced := self.message_index.version(source, destination.key)):
+                logger.info(
+                    f"skipping an older version of the source: {source=}, {destination=}, {version=}, {synced=}"
+                )
+                return message_ids
+            message_ids = await destination.sync_all(message_ids, payloads)
+            self.message_index.set(source, destination.key, message_ids, version)
+        finally:
+            lock.release()
+        return message_ids
+
+    async def delete_mirror(
+        self, source: str, destinations: t.Sequence[AsyncDestination], version: t.Optional[str] = None
+    ) -> t.List[DeliveryResult]:
+        if not self.tracks_posts:
+            return []
+        results: t.List[DeliveryResult] = await self.fanout_executor.run(
+            [
+                (destination.key, partial(self._sync_mirror, source, destination, [], version))
+                for destination in destinations
+            ]
+        )
+        log_delivery_results(results)
+        return results
+
+    async def event_message(self, **kwargs: t.Any) -> None:
+        pass
+
+    async def event_channel_created(self, **kwargs: t.Any) -> None:
+        pass
+
+    async def event_channel_rename(self, **kwargs: t.Any) -> None:
+        pass
+
+    async def event_channel_archive(self, **kwargs: t.Any) -> None:
+        pass
+
+    async def event_channel_unarchive(self, **kwargs: t.Any) -> None:
+        pass
+
+    async def event_channel_deleted(self, **kwargs: t.Any) -> None:
+        pass
+
+    async def event_reaction_added(self, **kwargs: t.Any) -> None:
+        pass
+
+    async def event_reaction_removed(self, **kwargs: t.Any) -> None:
+        pass
+
+    async def event_user_change(self, **kwargs: t.Any) -> None:
+        pass
+
+    async def action_transfer_send_button(self, body: t.Dict[str, t.Any]) -> None:
+        pass
+
+
+HOOK_NAMES: t.Tuple[str, ...] = (
+    "event_message",
+    "event_channel_created",
+    "event_channel_rename",
+    "event_channel_archive",
+    "event_channel_unarchive",
+    "event_channel_deleted",
+    "event_reaction_added",
+    "event_reaction_removed",
+    "event_user_change",
+    "action_transfer_send_button",
+)
+
+
+CallbackT = t.TypeVar("CallbackT", SlackCallbackBase, AsyncSlackCallbackBase)
+
+
+class CallbacksBase(t.Generic[CallbackT]):
+    """Dispatch index shared by ``Callbacks`` and ``AsyncCallbacks``"""
+
+    callback_base: t.Type[CallbackT]
+
+    def __init__(self, callbacks: t.List[CallbackT], error_sender: t.Optional[Sender] = None) -> None:
+        self.callbacks: t.List[CallbackT] = callbacks
+        self.error_sender: t.Optional[Sender] = error_sender
+        # hook name -> callbacks overriding the hook
+        self._hook_index: t.Dict[str, t.List[CallbackT]] = {}
+        # hook name -> source channel id (None: channel not listed) -> callbacks
+        self._channel_index: t.Dict[str, t.Dict[t.Optional[str], t.List[CallbackT]]] = {}
+        self.build_index()
+
+    def build_index(self) -> None:
+        """Build the dispatch index. Call it again after ``self.callbacks`` is modified."""
+        hook_index: t.Dict[str, t.List[CallbackT]] = {}
+        channel_index: t.Dict[str, t.Dict[t.Optional[str], t.List[CallbackT]]] = {}
+        for function_name in HOOK_NAMES:
+            base_func = getattr(self.callback_base, function_name)
+            # callbacks which keep the no-op hook of the base class never see the event
+            overriding: t.List[CallbackT] = [
+                c for c in self.callbacks if getattr(type(c), function_name, base_func) is not base_func
+            ]
+            hook_index[function_name] = overriding
+            channel_ids: t.Set[str] = {c.src_channel_id for c in overriding if c.src_channel_id is not None}
+            channel_index[function_name] = {
+                channel_id: [c for c in overriding if c.src_channel_id in (None, channel_id)]
+                for channel_id in channel_ids
+            }
+            channel_index[function_name][None] = [c for c in overriding if c.src_channel_id is None]
+        self._hook_index = hook_index
+        self._channel_index = channel_index
+        logger.debug(f"{self._channel_index=}")
+
+    @staticmethod
+    def _get_channel_id(kwargs: t.Dict[str, t.Any]) -> t.Optional[str]:
+        """Source channel id of an event / action payload. ``None`` if the payload is not bound to a channel."""
+        if (event := kwargs.get("event")) is not None:
+            channel: t.Any = event.get("channel")
+            if isinstance(channel, str):  # message, channel_archive, ...
+                return channel
+            if isinstance(channel, dict):  # channel_created, channel_rename
+                return t.cast(t.Optional[str], channel.get("id"))
+            if isinstance(item := event.get("item"), dict):  # reaction_added, reaction_removed
+                return t.cast(t.Optional[str], item.get("channel"))
+            return None
+        if (body := kwargs.get("body")) is not None:  # block_actions
+            return t.cast(t.Optional[str], (body.get("channel") or {}).get("id"))
+        return None
+
+    def _get_callbacks(self, function_name: str, kwargs: t.Dict[str, t.Any]) -> t.List[CallbackT]:
+        channel_id: t.Optional[str] = self._get_channel_id(kwargs)
+        events_total.inc(type=function_name.removeprefix("event_"), channel=channel_id or "")
+        if channel_id is None:
+            return self._hook_index[function_name]
+        channel_index = self._channel_index[function_name]
+        return channel_index.get(channel_id, channel_index[None])
+
+    @staticmethod
+    def _record_dispatch(callback: CallbackT, function_name: str, started_at: float) -> None:
+        dispatch_seconds.observe(
+            time.perf_counter() - started_at,
+            callback=type(callback).__name__,
+            channel=callback.src_channel_id or "",
+            hook=function_name,
+        )
+
+    @staticmethod
+    def _format_error(e: Exception) -> str:
+        err_msg_list: t.List[str] = [
+            r"```",
+            f"{traceback.format_exc()}",
+            f"{e}",
+            r"```",
+        ]
+        return "\n".join(err_msg_list)
+
+
+class Callbacks(CallbacksBase[SlackCallbackBase]):
+    callback_base = SlackCallbackBase
 
     def _notify(self, function_name: str, /, **kwargs: t.Any) -> None:
-        for c in self.callbacks:
+        for c in self._get_callbacks(function_name, kwargs):
             try:
                 func = getattr(c, function_name)
             except Exception as e:
                 logger.error(f"{e}", exc_info=True)
                 if self.error_sender is not None:
-                    err_msg_list: t.List[str] = [
-                        r"```",
-                        f"{traceback.format_exc()}",
-                        f"{e}",
-                        r"```",
-                    ]
-                    err_msg = "\n".join(err_msg_list)
-                    self.error_sender.send(err_msg)
+                    self.error_sender.send(self._format_error(e))
                 raise e
 
             else:
-                func(**kwargs)
+                started_at: float = time.perf_counter()
+                try:
+                    with tracer.span(f"{type(c).__name__}.{function_name}", channel=c.src_channel_id):
+                        func(**kwargs)
+                finally:
+                    self._record_dispatch(c, function_name, started_at)
 
     def event_message(self, **kwargs: t.Any) -> None:
+        update_message_cache(kwargs["event"])
         self._notify("event_message", **kwargs)
 
     def event_channel_created(self, **kwargs: t.Any) -> None:
         self._notify("event_channel_created", **kwargs)
 
     def event_channel_rename(self, **kwargs: t.Any) -> None:
+        update_channel_cache(kwargs["event"])
         self._notify("event_channel_rename", **kwargs)
 
     def event_channel_archive(self, **kwargs: t.Any) -> None:
+        update_channel_cache(kwargs["event"])
         self._notify("event_channel_archive", **kwargs)
 
     def event_channel_unarchive(self, **kwargs: t.Any) -> None:
+        update_channel_cache(kwargs["event"])
         self._notify("event_channel_unarchive", **kwargs)
 
     def event_channel_deleted(self, **kwargs: t.Any) -> None:
+        update_channel_cache(kwargs["event"])
         self._notify("event_channel_deleted", **kwargs)
 
     def event_reaction_added(self, **kwargs: t.Any) -> None:
@@ -109,5 +477,71 @@ class Callbacks:
     def event_reaction_removed(self, **kwargs: t.Any) -> None:
         self._notify("event_reaction_removed", **kwargs)
 
+    def event_user_change(self, **kwargs: t.Any) -> None:
+        invalidate_user_cache(kwargs["event"]["user"])
+        self._notify("event_user_change", **kwargs)
+
     def action_transfer_send_button(self, **kwargs: t.Any) -> None:
         self._notify("action_transfer_send_button", **kwargs)
+
+
+class AsyncCallbacks(CallbacksBase[AsyncSlackCallbackBase]):
+    callback_base = AsyncSlackCallbackBase
+
+    async def setup(self) -> None:
+        await asyncio.gather(*[c.setup() for c in self.callbacks])
+
+    async def _notify(self, function_name: str, /, **kwargs: t.Any) -> None:
+        for c in self._get_callbacks(function_name, kwargs):
+            try:
+                func = getattr(c, function_name)
+            except Exception as e:
+                logger.error(f"{e}", exc_info=True)
+                if self.error_sender is not None:
+                    # error_sender is a blocking client
+                    await asyncio.to_thread(self.error_sender.send, self._format_error(e))
+                raise e
+
+            else:
+                started_at: float = time.perf_counter()
+                try:
+                    with tracer.span(f"{type(c).__name__}.{function_name}", channel=c.src_channel_id):
+                        await func(**kwargs)
+                finally:
+                    self._record_dispatch(c, function_name, started_at)
+
+    async def event_message(self, **kwargs: t.Any) -> None:
+        update_message_cache(kwargs["event"])
+        await self._notify("event_message", **kwargs)
+
+    async def event_channel_created(self, **kwargs: t.Any) -> None:
+        await self._notify("event_channel_created", **kwargs)
+
+    async def event_channel_rename(self, **kwargs: t.Any) -> None:
+        update_channel_cache(kwargs["event"])
+        await self._notify("event_channel_rename", **kwargs)
+
+    async def event_channel_archive(self, **kwargs: t.Any) -> None:
+        update_channel_cache(kwargs["event"])
+        await self._notify("event_channel_archive", **kwargs)
+
+    async def event_channel_unarchive(self, **kwargs: t.Any) -> None:
+        update_channel_cache(kwargs["event"])
+        await self._notify("event_channel_unarchive", **kwargs)
+
+    async def event_channel_deleted(self, **kwargs: t.Any) -> None:
+        update_channel_cache(kwargs["event"])
+        await self._notify("event_channel_deleted", **kwargs)
+
+    async def event_reaction_added(self, **kwargs: t.Any) -> None:
+        await self._notify("event_reaction_added", **kwargs)
+
+    async def event_reaction_removed(self, **kwargs: t.Any) -> None:
+        await self._notify("event_reaction_removed", **kwargs)
+
+    async def event_user_change(self, **kwargs: t.Any) -> None:
+        invalidate_user_cache(kwargs["event"]["user"])
+        await self._notify("event_user_change", **kwargs)
+
+    async def action_transfer_send_button(self, **kwargs: t.Any) -> None:
+        await self._notify("action_transfer_send_button", **kwargs)
@@ -5,16 +5,31 @@ from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
 
 # Third Party Library
 import discord
-import requests
 from pydantic import BaseModel
 from slack_bolt.context.say.say import Say
+from slack_sdk.webhook.async_client import AsyncWebhookClient
 
 # First Party Library
+from pollenjp_times.destinations import AsyncDestination
+from pollenjp_times.destinations import AsyncDiscordWebhookDestination
+from pollenjp_times.destinations import AsyncSlackClientDestination
+from pollenjp_times.destinations import AsyncSlackWebhookDestination
+from pollenjp_times.destinations import Destination
+from pollenjp_times.destinations import DiscordWebhookDestination
+from pollenjp_times.destinations import Payload
+from pollenjp_times.destinations import SlackClientDestination
+from pollenjp_times.destinations import SlackWebhookDestination
+from pollenjp_times.types import AsyncSlackClientAppModel
 from pollenjp_times.types import SlackClientAppModel
 from pollenjp_times.types import UserModel
+from pollenjp_times.utils import slack_async
+from pollenjp_times.utils.discord_payload import pack_discord_payloads
+from pollenjp_times.utils.logs import log_payload
+from pollenjp_times.utils.slack import cache_message
 from pollenjp_times.utils.slack import convert_text_slack2discord
 from pollenjp_times.utils.slack import decode_text2dict
 from pollenjp_times.utils.slack import encode_dict2text
@@ -22,6 +37,9 @@ from pollenjp_times.utils.slack import get_a_conversation
 from pollenjp_times.utils.slack import get_user_data_from_user_id
 
 # Local Library
+from .base import SENDER_ICON_URL
+from .base import SENDER_USERNAME
+from .base import AsyncSlackCallbackBase
 from .base import SlackCallbackBase
 
 logger = getLogger(__name__)
@@ -35,6 +53,93 @@ class ButtonValue(BaseModel):
     thread_ts: Optional[str] = None
 
 
+def get_target_user_id(
+    event: Dict[str, Any], message: Dict[str, Any], src_channel_id: str, src_user_id: str
+) -> Optional[str]:
+    """user id of the message if it is posted by ``src_user_id`` in ``src_channel_id``, otherwise None"""
+    if (x := message.get("user")) is None or not isinstance(x, str):
+        return None
+    user_id: str = x
+    if event["channel"] != src_channel_id or user_id != src_user_id:
+        return None
+    return user_id
+
+
+def build_prompt_blocks(src_channel_id: str, message: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """blocks of the ephemeral message which asks whether to send the message"""
+    message_ts: Optional[str] = message.get("ts")
+    if message_ts is None:
+        raise RuntimeError(f"message_ts is not found: {message=}")
+
+    button_value = ButtonValue(channel_id=src_channel_id, message_ts=message_ts, event_ts=message_ts)
+    if message.get("thread_ts") is not None:
+        button_value.thread_ts = message["thread_ts"]
+
+    return [
+        {
+            "type": "actions",
+            "block_id": "actionblock789",
+            "elements": [
+                {
+                    "type": "button",
+                    "text": {"type": "plain_text", "text": "Send"},
+                    "style": "primary",
+                    "value": encode_dict2text(button_value.dict(exclude_none=True)),
+                    "action_id": "action_transfer_send_button",
+                },
+                {
+                    "type": "button",
+                    "text": {"type": "plain_text", "text": "No"},
+                    "style": "danger",
+                    "value": "delete",
+                    "action_id": "action_delete_original",
+                },
+            ],
+        }
+    ]
+
+
+def decode_button_value(body: Dict[str, Any]) -> ButtonValue:
+    recieve_info: Dict[str, str] = decode_text2dict(body["actions"][0]["value"])
+    return ButtonValue(**recieve_info)
+
+
+def get_message_text(message: Dict[str, Any]) -> str:
+    message_txt: str = ""
+    if (txt := message.get("text", None)) is not None:
+        message_txt += txt
+    return message_txt
+
+
+def build_transfer_payloads(message_txt: str, missing_files: Optional[List[str]] = None) -> Dict[str, List[Payload]]:
+    """payloads of a transferred message per destination kind
+
+    Args:
+        missing_files (Optional[List[str]]): files of the message which are not uploaded to Discord (one line each)
+    """
+    return {
+        "slack": [
+            {
+                "text": message_txt,
+                # "as_user": False,
+                # "attachments": message.get("attachments", None),
+                "username": SENDER_USERNAME,
+                "icon_url": SENDER_ICON_URL,
+            }
+        ],
+        "slack_webhook": [
+            {
+                "text": message_txt,
+            }
+        ],
+        "discord": pack_discord_payloads(
+            content="\n".join([convert_text_slack2discord(message_txt), *(missing_files or [])]),
+            username=SENDER_USERNAME,
+            avatar_url=SENDER_ICON_URL,
+        ),
+    }
+
+
 class TimesCallback(SlackCallbackBase):
     def __init__(
         self,
@@ -52,13 +157,21 @@ class TimesCallback(SlackCallbackBase):
         self.slack_clients: List[SlackClientAppModel] = tgt_clients
         self.slack_webhook_clients: List[str] = slack_webhook_clients or []
         self.discord_webhook_clients: List[discord.webhook.sync.SyncWebhook] = discord_webhook_clients or []
+        self.destinations: List[Destination] = [
+            *[SlackClientDestination(client_model) for client_model in self.slack_clients],
+            *[
+                SlackWebhookDestination(webhook_url, timeout=self.fanout_executor.timeout)
+                for webhook_url in self.slack_webhook_clients
+            ],
+            *[DiscordWebhookDestination(webhook) for webhook in self.discord_webhook_clients],
+        ]
 
     def event_message(self, **kwargs: Any) -> None:
         event: Dict[str, Any] = kwargs["event"]
         message: Dict[str, Any] = kwargs["message"]
         say: Say = kwargs["say"]
 
-        logger.info(f"{event=}")
+        log_payload(logger, event=event)
 
         if not self.__is_target_message(event=event, message=message):
             return
@@ -66,10 +179,7 @@ class TimesCallback(SlackCallbackBase):
         self.message_event_none(event, message, say)
 
     def __is_target_message(self, event: Dict[str, Any], message: Dict[str, Any]) -> bool:
-        if (x := message.get("user")) is None or not isinstance(x, str):
-            return False
-        user_id: str = x
-        if event["channel"] != self.src_channel_id or user_id != self.src_user_id:
+        if (user_id := get_target_user_id(event, message, self.src_channel_id, self.src_user_id)) is None:
             return False
         user: UserModel = get_user_data_from_user_id(app=self.slack_app, user_id=user_id)
         logger.info(f"{user=}")
@@ -78,46 +188,17 @@ class TimesCallback(SlackCallbackBase):
         return True
 
     def message_event_none(self, event: Dict[str, Any], message: Dict[str, Any], say: Say) -> None:
-        message_ts: Optional[str] = message.get("ts")
-        if message_ts is None:
-            raise RuntimeError(f"message_ts is not found: {message=}")
-
-        button_value = ButtonValue(channel_id=self.src_channel_id, message_ts=message_ts, event_ts=message_ts)
-        subtype: str
-        if message.get("thread_ts") is not None:
-            button_value.thread_ts = message["thread_ts"]
-
+        # the Send button transfers this message: keep it so that the button does not fetch it again
+        cache_message(self.src_channel_id, message)
         self.slack_app.client.chat_postEphemeral(
             channel=self.src_channel_id,
             text="test message for postEphemeral",
-            blocks=[
-                {
-                    "type": "actions",
-                    "block_id": "actionblock789",
-                    "elements": [
-                        {
-                            "type": "button",
-                            "text": {"type": "plain_text", "text": "Send"},
-                            "style": "primary",
-                            "value": encode_dict2text(button_value.dict(exclude_none=True)),
-                            "action_id": "action_transfer_send_button",
-                        },
-                        {
-                            "type": "button",
-                            "text": {"type": "plain_text", "text": "No"},
-                            "style": "danger",
-                            "value": "delete",
-                            "action_id": "action_delete_original",
-                        },
-                    ],
-                }
-            ],
+            blocks=build_prompt_blocks(self.src_channel_id, message),
             user=message["user"],
         )
 
     def action_transfer_send_button(self, body: Dict[str, Any]) -> None:
-        recieve_info: Dict[str, str] = decode_text2dict(body["actions"][0]["value"])
-        button_value: ButtonValue = ButtonValue(**recieve_info)
+        button_value: ButtonValue = decode_button_value(body)
 
         if self.src_channel_id != button_value.channel_id:
             return
@@ -128,46 +209,91 @@ class TimesCallback(SlackCallbackBase):
             ts=button_value.message_ts,
             is_reply=True if button_value.thread_ts is not None else False,
         )
-        logger.info(f"{message=}")
-
-        message_txt: str = ""
-        if (txt := message.get("text", None)) is not None:
-            message_txt += txt
-
-        client_model: SlackClientAppModel
-        for client_model in self.slack_clients:
-            client_model.app.client.chat_postMessage(
-                channel=client_model.tgt_channel_id,
-                text=message_txt,
-                # as_user=False,
-                # attachments=message.get("attachments", None),
-                username="pollenJP",
-                icon_url="https://i.gyazo.com/4d3a544918c1bebb5c02f37c7789f765.jpg",
-            )
+        log_payload(logger, message=message)
 
-        for webhook_url in self.slack_webhook_clients:
-            requests.post(
-                webhook_url,
-                headers={
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "text": message_txt,
-                },
+        self.deliver(self._transfer_deliveries(message))
+
+    def _transfer_deliveries(self, message: Dict[str, Any]) -> List[Tuple[Destination, List[Payload]]]:
+        message_txt: str = get_message_text(message)
+        files, missing_files = self.fetch_files(message, self.destinations)
+
+        payloads: Dict[str, List[Payload]] = build_transfer_payloads(message_txt, missing_files)
+        if self.media is not None and files:
+            payloads["discord"] = self.media.attach(
+                payloads["discord"], files, username=SENDER_USERNAME, avatar_url=SENDER_ICON_URL
             )
+        log_payload(logger, discord_payloads=payloads["discord"])
+
+        return [(destination, payloads[destination.kind]) for destination in self.destinations]
+
+    def history_deliveries(self, message: Dict[str, Any]) -> List[Tuple[Destination, List[Payload]]]:
+        # the messages the Send button is offered for: those the host user posted (not channel_join & co.)
+        if message.get("user") != self.src_user_id or message.get("subtype") not in (None, "thread_broadcast"):
+            return []
+        return self._transfer_deliveries(message)
+
+
+class AsyncTimesCallback(AsyncSlackCallbackBase):
+    """``TimesCallback`` for the asyncio runtime (``AsyncApp`` / async Slack and Discord clients)"""
 
-        content_list: List[str] = [
-            f"{convert_text_slack2discord(message_txt)}",
+    def __init__(
+        self,
+        *args: Any,
+        src_channel_id: str,
+        src_user_id: str,
+        tgt_clients: List[AsyncSlackClientAppModel],
+        slack_webhook_clients: Optional[List[AsyncWebhookClient]] = None,
+        discord_webhook_clients: Optional[List[discord.Webhook]] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.src_channel_id: str = src_channel_id
+        self.src_user_id: str = src_user_id
+        self.slack_clients: List[AsyncSlackClientAppModel] = tgt_clients
+        self.slack_webhook_clients: List[AsyncWebhookClient] = slack_webhook_clients or []
+        self.discord_webhook_clients: List[discord.Webhook] = discord_webhook_clients or []
+        self.destinations: List[AsyncDestination] = [
+            *[AsyncSlackClientDestination(client_model) for client_model in self.slack_clients],
+            *[AsyncSlackWebhookDestination(webhook_client) for webhook_client in self.slack_webhook_clients],
+            *[AsyncDiscordWebhookDestination(webhook) for webhook in self.discord_webhook_clients],
         ]
 
-        logger.info(f"{content_list}")
+    async def event_message(self, **kwargs: Any) -> None:
+        event: Dict[str, Any] = kwargs["event"]
+        message: Dict[str, Any] = kwargs["message"]
 
-        discord_webhook_app: discord.webhook.sync.SyncWebhook
-        for discord_webhook_app in self.discord_webhook_clients:
-            discord_webhook_app.send(
-                content="\n".join(content_list),
-                username="pollenJP",
-                avatar_url="https://i.gyazo.com/4d3a544918c1bebb5c02f37c7789f765.jpg",
-            )
+        log_payload(logger, event=event)
+
+        if (user_id := get_target_user_id(event, message, self.src_channel_id, self.src_user_id)) is None:
+            return
+        user: UserModel = await slack_async.get_user_data_from_user_id(app=self.slack_app, user_id=user_id)
+        logger.info(f"{user=}")
+        if user.is_bot:
+            return
+
+        cache_message(self.src_channel_id, message)
+        await self.slack_app.client.chat_postEphemeral(
+            channel=self.src_channel_id,
+            text="test message for postEphemeral",
+            blocks=build_prompt_blocks(self.src_channel_id, message),
+            user=message["user"],
+        )
+
+    async def action_transfer_send_button(self, body: Dict[str, Any]) -> None:
+        button_value: ButtonValue = decode_button_value(body)
+
+        if self.src_channel_id != button_value.channel_id:
+            return
+
+        message: Dict[str, Any] = await slack_async.get_a_conversation(
+            app=self.slack_app,
+            channel_id=button_value.channel_id,
+            ts=button_value.message_ts,
+            is_reply=True if button_value.thread_ts is not None else False,
+        )
+        log_payload(logger, message=message)
+
+        message_txt: str = get_message_text(message)
 
-        return
+        payloads: Dict[str, List[Payload]] = build_transfer_payloads(message_txt)
+        await self.deliver([(destination, payloads[destination.kind]) for destination in self.destinations])
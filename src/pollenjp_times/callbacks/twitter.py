@@ -1,13 +1,15 @@
 # Standard Library
-import re
 from logging import NullHandler
 from logging import getLogger
 from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
-from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import TypeVar
 from typing import Union
+from typing import cast
 
 # Third Party Library
 import discord
@@ -16,18 +18,184 @@ from discord.embeds import EmptyEmbed
 from slack_bolt.context.say.say import Say
 
 # First Party Library
+from pollenjp_times.destinations import AsyncDestination
+from pollenjp_times.destinations import AsyncDiscordWebhookDestination
+from pollenjp_times.destinations import AsyncSlackClientDestination
+from pollenjp_times.destinations import Destination
+from pollenjp_times.destinations import DiscordWebhookDestination
+from pollenjp_times.destinations import Payload
+from pollenjp_times.destinations import SlackClientDestination
+from pollenjp_times.message_index import source_key
+from pollenjp_times.types import AsyncSlackClientAppModel
+from pollenjp_times.types import ChannelModel
+from pollenjp_times.types import FilterRulesModel
 from pollenjp_times.types import MessageAttachmentModel
 from pollenjp_times.types import SlackClientAppModel
+from pollenjp_times.utils import slack_async
+from pollenjp_times.utils.discord_payload import pack_discord_payloads
+from pollenjp_times.utils.filter import MessageFilter
+from pollenjp_times.utils.logs import log_payload
 from pollenjp_times.utils.slack import convert_slack_ts_to_datetime
 from pollenjp_times.utils.slack import convert_text_slack2discord
 from pollenjp_times.utils.slack import get_channel_from_channel_id
 
 # Local Library
+from .base import SENDER_ICON_URL
+from .base import SENDER_USERNAME
+from .base import AsyncSlackCallbackBase
 from .base import SlackCallbackBase
 
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
+DestinationT = TypeVar("DestinationT", bound=Union[Destination, AsyncDestination])
+
+
+def resolve_source(event: Dict[str, Any], message: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """(``source_key`` of the message the event is about, message to mirror)
+
+    ``message_changed`` (an edit, or Slack adding an unfurl) mirrors the new version of the message and
+    ``message_deleted`` nothing (``None``): their posts are updated / deleted instead of posted again.
+    """
+    channel_id: str = event["channel"]
+    subtype: Optional[str] = event.get("subtype")
+    if subtype == "message_changed":
+        edited: Dict[str, Any] = event["message"]
+        return source_key(channel_id, edited["ts"]), {**edited, "channel": channel_id}
+    if subtype == "message_deleted":
+        return source_key(channel_id, event["deleted_ts"]), None
+    return source_key(channel_id, event["ts"]), message
+
+
+def source_version(event: Dict[str, Any]) -> str:
+    """Version of the source message ``event`` leaves: its ``ts``, which is when the message was posted, changed or
+    deleted. The posts are not synced to a version older than the one they show (see ``MessageIndex``)."""
+    return cast(str, event.get("event_ts") or event["ts"])
+
+
+def content_changed(event: Dict[str, Any]) -> bool:
+    """``False`` for a ``message_changed`` which leaves the text and the attachments as they were (e.g. a reply was
+    added to the thread of the message)"""
+    if event.get("subtype") != "message_changed":
+        return True
+    previous: Dict[str, Any] = event.get("previous_message") or {}
+    edited: Dict[str, Any] = event["message"]
+    return (previous.get("text"), previous.get("attachments")) != (edited.get("text"), edited.get("attachments"))
+
+
+def unselected_destinations(
+    event: Dict[str, Any], destinations: List[DestinationT], deliveries: List[Tuple[DestinationT, List[Payload]]]
+) -> List[DestinationT]:
+    """Destinations an edit (``message_changed``) is not mirrored to anymore: the new version of the message does not
+    match the filters (of the destination). Their posts of the message are deleted."""
+    if event.get("subtype") != "message_changed":
+        return []
+    selected: Set[str] = {destination.key for destination, _ in deliveries}
+    return [destination for destination in destinations if destination.key not in selected]
+
+
+def get_attachments(message: Dict[str, Any]) -> List[Dict[str, Any]]:
+    attachments: List[Dict[str, Any]] = []
+    if (_attachments := message.get("attachments")) is not None:
+        attachments += _attachments
+    if (_m := message.get("message")) is not None and (_attachments := _m.get("attachments")) is not None:
+        attachments += _attachments
+    return attachments
+
+
+def parse_attachments(attachments: List[Dict[str, Any]]) -> List[MessageAttachmentModel]:
+    return [MessageAttachmentModel(**attachment) for attachment in attachments]
+
+
+def build_content_list(message_txt: Optional[str], ms_attachments: List[MessageAttachmentModel]) -> List[str]:
+    content_list: List[str] = []
+    if message_txt is not None:
+        content_list.append(convert_text_slack2discord(message_txt))
+    for ms_attachment in ms_attachments:
+        if len(ms_attachment.text) > 0:
+            content_list.append(f"{ convert_text_slack2discord(ms_attachment.text).strip() }")
+        if len(ms_attachment.pretext) > 0:
+            content_list.append(f"{ convert_text_slack2discord(ms_attachment.pretext).strip() }")
+    return content_list
+
+
+def build_filters(
+    filter_keyword: Optional[str],
+    filter_rules: Optional[FilterRulesModel],
+    destination_filter_rules: Optional[Dict[str, FilterRulesModel]],
+) -> Tuple[MessageFilter, Dict[str, MessageFilter]]:
+    """filter of the callback (``filter_keyword`` is an include pattern) and filters per destination target"""
+    rules: FilterRulesModel = filter_rules.copy() if filter_rules is not None else FilterRulesModel()
+    if filter_keyword is not None:
+        rules.include_patterns = [*rules.include_patterns, filter_keyword]
+    return MessageFilter(rules), {
+        target: MessageFilter(target_rules) for target, target_rules in (destination_filter_rules or {}).items()
+    }
+
+
+def select_destinations(
+    destinations: List[DestinationT],
+    message_filter: MessageFilter,
+    destination_filters: Dict[str, MessageFilter],
+    message: Dict[str, Any],
+    attachments: List[Dict[str, Any]],
+    content_list: List[str],
+) -> Optional[List[DestinationT]]:
+    """destinations the message is mirrored to. ``None`` if the message is filtered out by the callback."""
+    content: str = "\n".join(content_list)
+    if not message_filter.match(content, message, attachments):
+        logger.info(f"Not matched: {content=}")
+        return None
+    return [
+        destination
+        for destination in destinations
+        if (destination_filter := destination_filters.get(destination.target)) is None
+        or destination_filter.match(content, message, attachments)
+    ]
+
+
+def build_embeds(ms_attachments: List[MessageAttachmentModel], channel: ChannelModel) -> List[Embed]:
+    embeds: List[Embed] = []
+    for ms_attachment in ms_attachments:
+        if ms_attachment.ts is not None:
+            embed = Embed(description=ms_attachment.text, timestamp=convert_slack_ts_to_datetime(ms_attachment.ts))
+        else:
+            embed = Embed(description=ms_attachment.text)
+        embed.set_author(
+            name=ms_attachment.author_name if ms_attachment.author_name is not None else EmptyEmbed,
+            url=f"{ms_attachment.author_link}" if ms_attachment.author_link is not None else EmptyEmbed,
+            icon_url=ms_attachment.author_icon if ms_attachment.author_icon is not None else EmptyEmbed,
+        )
+        embed.set_footer(
+            text=f"{channel.name}",
+            # icon_url=,
+        )
+        if ms_attachment.image_url is not None:
+            embed.set_image(url=ms_attachment.image_url)
+        embeds.append(embed)
+    return embeds
+
+
+def build_mirror_payloads(
+    message_txt: Optional[str], attachments: List[Dict[str, Any]], content_list: List[str], embeds: List[Embed]
+) -> Dict[str, List[Payload]]:
+    """payloads of a mirrored message per destination kind"""
+    return {
+        "slack": [
+            {
+                "text": message_txt,
+                # "as_user": False,
+                "attachments": attachments,
+                "username": SENDER_USERNAME,
+                "icon_url": SENDER_ICON_URL,
+            }
+        ],
+        # the text and its attachments in as few messages as possible, in order
+        "discord": pack_discord_payloads(
+            content="\n".join(content_list), embeds=[cast(Dict[str, Any], embed.to_dict()) for embed in embeds]
+        ),
+    }
+
 
 class TwitterCallback(SlackCallbackBase):
     def __init__(
@@ -37,19 +205,22 @@ class TwitterCallback(SlackCallbackBase):
         tgt_clients: Optional[List[SlackClientAppModel]] = None,
         discord_webhook_clients: Optional[List[discord.webhook.sync.SyncWebhook]] = None,
         filter_keyword: Optional[str] = None,
+        filter_rules: Optional[FilterRulesModel] = None,
+        destination_filter_rules: Optional[Dict[str, FilterRulesModel]] = None,
         **kwargs: Any,
     ) -> None:
         super().__init__(*args, **kwargs)
         self.src_channel_id: str = src_channel_id
         self.slack_clients: List[SlackClientAppModel] = tgt_clients or []
         self.discord_webhook_clients: List[discord.webhook.sync.SyncWebhook] = discord_webhook_clients or []
-        self.filter_pattern = (
-            re.compile(
-                f"{filter_keyword}",
-                flags=re.IGNORECASE,
-            )
-            if filter_keyword is not None
-            else None
+        self.destinations: List[Destination] = [
+            *[SlackClientDestination(client_model) for client_model in self.slack_clients],
+            *[DiscordWebhookDestination(webhook) for webhook in self.discord_webhook_clients],
+        ]
+        self.message_filter: MessageFilter
+        self.destination_filters: Dict[str, MessageFilter]
+        self.message_filter, self.destination_filters = build_filters(
+            filter_keyword, filter_rules, destination_filter_rules
         )
 
     def event_message(self, **kwargs: Any) -> None:
@@ -57,8 +228,7 @@ class TwitterCallback(SlackCallbackBase):
         message: Dict[str, Any] = kwargs["message"]
         say: Say = kwargs["say"]
 
-        logger.info(f"{event=}")
-        logger.info(f"{message=}")
+        log_payload(logger, event=event, message=message)
 
         self._event_message(event, message, say)
 
@@ -66,71 +236,137 @@ class TwitterCallback(SlackCallbackBase):
         if event["channel"] != self.src_channel_id:
             return
 
-        content_list: List[str] = []
-        if (message_txt := message.get("text", None)) is not None:
-            content_list.append(convert_text_slack2discord(message_txt))
+        source: Optional[str] = None
+        version: str = source_version(event)
+        if self.tracks_posts:
+            if not content_changed(event):
+                return
+            source, mirrored = resolve_source(event, message)
+            if mirrored is None:
+                self.delete_mirror(source, self.destinations, version)
+                return
+            message = mirrored
+
+        deliveries: List[Tuple[Destination, List[Payload]]] = self._mirror_deliveries(message)
+        if source is None:
+            self.deliver(deliveries)
+            return
+        if unselected := unselected_destinations(event, self.destinations, deliveries):
+            self.delete_mirror(source, unselected, version)
+        if deliveries:
+            self.deliver_mirror(source, deliveries, version)
+
+    def _mirror_deliveries(self, message: Dict[str, Any]) -> List[Tuple[Destination, List[Payload]]]:
+        message_txt: Optional[str] = message.get("text", None)
+        attachments: List[Dict[str, Any]] = get_attachments(message)
+        ms_attachments: List[MessageAttachmentModel] = parse_attachments(attachments)
+        content_list: List[str] = build_content_list(message_txt, ms_attachments)
+
+        destinations: Optional[List[Destination]] = select_destinations(
+            self.destinations, self.message_filter, self.destination_filters, message, attachments, content_list
+        )
+        if not destinations:
+            return []
 
-        attachments: Sequence[Union[Dict[str, Any]]] = []
-        if (_attachments := message.get("attachments")) is not None:
-            attachments += _attachments
-        if (_m := message.get("message")) is not None and (_attachments := _m.get("attachments")) is not None:
-            attachments += _attachments
+        embeds: List[Embed] = []
         if attachments:
-            for attachment in attachments:
-                ms_attachment = MessageAttachmentModel(**attachment)
-                if len(ms_attachment.text) > 0:
-                    content_list.append(f"{ convert_text_slack2discord(ms_attachment.text).strip() }")
-                if len(ms_attachment.pretext) > 0:
-                    content_list.append(f"{ convert_text_slack2discord(ms_attachment.pretext).strip() }")
-
-        if self.filter_pattern is not None:
-            include_keyword: bool = False
-            for txt in content_list:
-                if self.filter_pattern.match(txt) is not None:
-                    include_keyword = True
-                    break
-                logger.info(f"Not matched: {txt=}")
-            if not include_keyword:
-                return
+            channel: ChannelModel = get_channel_from_channel_id(self.slack_app, message.get("channel"))
+            embeds = build_embeds(ms_attachments, channel)
+        files, missing_files = self.fetch_files(message, destinations)
 
-        client_model: SlackClientAppModel
-        for client_model in self.slack_clients:
-            client_model.app.client.chat_postMessage(
-                channel=client_model.tgt_channel_id,
-                text=message_txt,
-                # as_user=False,
-                attachments=attachments,
-                username="pollenJP",
-                icon_url="https://i.gyazo.com/4d3a544918c1bebb5c02f37c7789f765.jpg",
+        payloads: Dict[str, List[Payload]] = build_mirror_payloads(
+            message_txt, attachments, content_list + missing_files, embeds
+        )
+        if self.media is not None and any(destination.kind == "discord" for destination in destinations):
+            images = self.media.rehost_embed_images(
+                [embed for payload in payloads["discord"] for embed in payload.get("embeds") or []]
             )
+            payloads["discord"] = self.media.attach(payloads["discord"], files, images)
+        return [(destination, payloads[destination.kind]) for destination in destinations]
+
+    def history_deliveries(self, message: Dict[str, Any]) -> List[Tuple[Destination, List[Payload]]]:
+        # the messages of conversations.history have no channel: the embeds need it
+        return self._mirror_deliveries({**message, "channel": self.src_channel_id})
 
-        for discord_webhook_app in self.discord_webhook_clients:
-            discord_webhook_app.send(content="\n".join(content_list))
 
-        channel = get_channel_from_channel_id(self.slack_app, message.get("channel"))
+class AsyncTwitterCallback(AsyncSlackCallbackBase):
+    """``TwitterCallback`` for the asyncio runtime (``AsyncApp`` / async Slack and Discord clients)"""
+
+    def __init__(
+        self,
+        *args: Any,
+        src_channel_id: str,
+        tgt_clients: Optional[List[AsyncSlackClientAppModel]] = None,
+        discord_webhook_clients: Optional[List[discord.Webhook]] = None,
+        filter_keyword: Optional[str] = None,
+        filter_rules: Optional[FilterRulesModel] = None,
+        destination_filter_rules: Optional[Dict[str, FilterRulesModel]] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.src_channel_id: str = src_channel_id
+        self.slack_clients: List[AsyncSlackClientAppModel] = tgt_clients or []
+        self.discord_webhook_clients: List[discord.Webhook] = discord_webhook_clients or []
+        self.destinations: List[AsyncDestination] = [
+            *[AsyncSlackClientDestination(client_model) for client_model in self.slack_clients],
+            *[AsyncDiscordWebhookDestination(webhook) for webhook in self.discord_webhook_clients],
+        ]
+        self.message_filter: MessageFilter
+        self.destination_filters: Dict[str, MessageFilter]
+        self.message_filter, self.destination_filters = build_filters(
+            filter_keyword, filter_rules, destination_filter_rules
+        )
+
+    async def event_message(self, **kwargs: Any) -> None:
+        event: Dict[str, Any] = kwargs["event"]
+        message: Dict[str, Any] = kwargs["message"]
+
+        log_payload(logger, event=event, message=message)
+
+        if event["channel"] != self.src_channel_id:
+            return
+
+        source: Optional[str] = None
+        version: str = source_version(event)
+        if self.tracks_posts:
+            if not content_changed(event):
+                return
+            source, mirrored = resolve_source(event, message)
+            if mirrored is None:
+                await self.delete_mirror(source, self.destinations, version)
+                return
+            message = mirrored
+
+        message_txt: Optional[str] = message.get("text", None)
+        attachments: List[Dict[str, Any]] = get_attachments(message)
+        ms_attachments: List[MessageAttachmentModel] = parse_attachments(attachments)
+        content_list: List[str] = build_content_list(message_txt, ms_attachments)
+
+        destinations: List[AsyncDestination] = (
+            select_destinations(
+                self.destinations, self.message_filter, self.destination_filters, message, attachments, content_list
+            )
+            or []
+        )
+        if source is not None and (
+            unselected := unselected_destinations(event, self.destinations, [(d, []) for d in destinations])
+        ):
+            await self.delete_mirror(source, unselected, version)
+        if not destinations:
+            return
 
         embeds: List[Embed] = []
         if attachments:
-            for attachment in attachments:
-                ms_attachment = MessageAttachmentModel(**attachment)
-                if ms_attachment.ts is not None:
-                    embed = Embed(
-                        description=ms_attachment.text, timestamp=convert_slack_ts_to_datetime(ms_attachment.ts)
-                    )
-                else:
-                    embed = Embed(description=ms_attachment.text)
-                embed.set_author(
-                    name=ms_attachment.author_name if ms_attachment.author_name is not None else EmptyEmbed,
-                    url=f"{ms_attachment.author_link}" if ms_attachment.author_link is not None else EmptyEmbed,
-                    icon_url=ms_attachment.author_icon if ms_attachment.author_icon is not None else EmptyEmbed,
-                )
-                embed.set_footer(
-                    text=f"{channel.name}",
-                    # icon_url=,
-                )
-                if ms_attachment.image_url is not None:
-                    embed.set_image(url=ms_attachment.image_url)
-                embeds.append(embed)
-
-            for discord_webhook_app in self.discord_webhook_clients:
-                discord_webhook_app.send(content="attachment", embeds=embeds)
+            channel: ChannelModel = await slack_async.get_channel_from_channel_id(
+                self.slack_app, message.get("channel")
+            )
+            embeds = build_embeds(ms_attachments, channel)
+
+        payloads: Dict[str, List[Payload]] = build_mirror_payloads(message_txt, attachments, content_list, embeds)
+        deliveries: List[Tuple[AsyncDestination, List[Payload]]] = [
+            (destination, payloads[destination.kind]) for destination in destinations
+        ]
+        if source is None:
+            await self.deliver(deliveries)
+        else:
+            await self.deliver_mirror(source, deliveries, version)
@@ -0,0 +1,114 @@
+# Standard Library
+import sqlite3
+import threading
+import time
+from logging import NullHandler
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+
+# First Party Library
+from pollenjp_times.utils.cache import TTLCache
+from pollenjp_times.utils.metrics import duplicates_total
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS seen (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def event_keys(body: Dict[str, Any], event: Dict[str, Any]) -> List[str]:
+    """``event_id`` of the envelope, and the channel / ts / subtype of a message (a retry may get a new envelope)"""
+    keys: List[str] = []
+    if (event_id := body.get("event_id")) is not None:
+        keys.append(f"event:{event_id}")
+    if (channel := event.get("channel")) is not None and (ts := event.get("ts")) is not None:
+        keys.append(f"message:{channel}:{ts}:{event.get('subtype') or ''}")
+    return keys
+
+
+def action_keys(body: Dict[str, Any]) -> List[str]:
+    """channel / ts of the prompt / action / value of a button: a second click on the same prompt transfers nothing,
+    while the buttons of the other prompts (the value of "No" is the same for all of them) still work"""
+    action: Dict[str, Any] = (body.get("actions") or [{}])[0]
+    channel: Optional[str] = (body.get("channel") or {}).get("id")
+    message_ts: Optional[str] = (body.get("container") or {}).get("message_ts") or (body.get("message") or {}).get("ts")
+    if message_ts is None:
+        message_ts = action.get("action_ts")  # no prompt message: every click is distinct
+    return [f"action:{channel}:{message_ts}:{action.get('action_id')}:{action.get('value')}"]
+
+
+class DedupStore:
+    """Keys of the events which were already handled, for ``ttl`` seconds.
+
+    The keys live in an LRU in memory (``maxsize`` entries). With ``path`` they are written to a sqlite file too, so
+    a retry after a restart is recognized, and the shards of a host sharing the file recognize the retries Slack
+    delivers to another shard.
+
+    Args:
+        maxsize (int): keys kept in memory
+        ttl (float): seconds a key is remembered
+        path (Optional[Union[str, Path]]): sqlite file. ``None``: memory only
+    """
+
+    prune_interval: int = 1000  # expired keys are deleted from the file every prune_interval new keys
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0, path: Optional[Union[str, Path]] = None) -> None:
+        self.ttl: float = ttl
+        self._memory: TTLCache[str, bool] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock: threading.Lock = threading.Lock()
+        self._added: int = 0
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(f"{path}", check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def first_seen(self, kind: str, keys: List[str]) -> bool:
+        """Record ``keys``. Returns ``False`` if one of them was already recorded (``kind`` labels the metric)."""
+        with self._lock:
+            duplicate: bool = False
+            for key in keys:
+                # every key is recorded: a retry may only share some of them
+                if not self._memory.add(key, True):
+                    duplicate = True
+                if self._conn is not None and not self._add_to_file(key):
+                    duplicate = True
+        if duplicate:
+            duplicates_total.inc(type=kind)
+            logger.info(f"duplicate dropped: {kind=}, {keys=}")
+        return not duplicate
+
+    def _add_to_file(self, key: str) -> bool:
+        assert self._conn is not None
+        now: float = time.time()
+        added: bool = (
+            self._conn.execute(
+                "INSERT INTO seen (key, expires_at) VALUES (?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at WHERE seen.expires_at < ?",
+                (key, now + self.ttl, now),
+            ).rowcount
+            > 0
+        )
+        if added:
+            self._added += 1
+            if self._added % self.prune_interval == 0:
+                self._conn.execute("DELETE FROM seen WHERE expires_at < ?", (now,))
+        return added
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,428 @@
+# Standard Library
+import abc
+import asyncio
+import hashlib
+import json
+import time
+from logging import NullHandler
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import cast
+
+# Third Party Library
+import discord
+import requests
+from discord.embeds import Embed
+from slack_sdk.webhook.async_client import AsyncWebhookClient
+
+# First Party Library
+from pollenjp_times.types import AsyncSlackClientAppModel
+from pollenjp_times.types import MediaFileModel
+from pollenjp_times.types import SlackClientAppModel
+from pollenjp_times.utils.discord_payload import drop_missing_files
+from pollenjp_times.utils.fanout import waiting
+from pollenjp_times.utils.fanout import waiting_async
+from pollenjp_times.utils.http import connection_pool
+from pollenjp_times.utils.metrics import send_errors_total
+from pollenjp_times.utils.metrics import send_rate_limited_total
+from pollenjp_times.utils.metrics import send_seconds
+from pollenjp_times.utils.multipart import MultipartStream
+from pollenjp_times.utils.multipart import Part
+from pollenjp_times.utils.ratelimit import RateLimitedError
+from pollenjp_times.utils.ratelimit import get_retry_after
+from pollenjp_times.utils.ratelimit import parse_retry_after
+from pollenjp_times.utils.ratelimit import rate_limiter
+from pollenjp_times.utils.tracing import tracer
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# payload: json serializable keyword arguments of a single post
+#   slack:         chat.postMessage arguments except ``channel``
+#   slack_webhook: request body of the incoming webhook
+#   discord:       ``content``, ``username``, ``avatar_url``, ``embeds`` (``Embed.to_dict()``) and ``files``
+#                  (``MediaFileModel.dict()``)
+Payload = Dict[str, Any]
+
+# arguments of chat.update (the author of a message can not be changed)
+SLACK_UPDATE_KEYS: Tuple[str, ...] = ("text", "attachments", "blocks")
+# arguments of a Discord webhook message edit
+DISCORD_UPDATE_KEYS: Tuple[str, ...] = ("content", "embeds")
+
+
+def _digest(secret: str) -> str:
+    # tokens and webhook urls are credentials, so never put them in destination keys (they end up in logs)
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:12]
+
+
+def slack_client_key(token: Optional[str], channel_id: str) -> str:
+    return f"slack:{_digest(token or '')}:{channel_id}"
+
+
+def slack_webhook_key(webhook_url: str) -> str:
+    return f"slack_webhook:{_digest(webhook_url)}"
+
+
+def discord_webhook_key(webhook_id: int) -> str:
+    return f"discord:{webhook_id}"
+
+
+def discord_send_kwargs(payload: Payload) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {key: val for key, val in payload.items() if key != "embeds"}
+    if embeds := payload.get("embeds"):
+        kwargs["embeds"] = [Embed.from_dict(embed) for embed in embeds]
+    return kwargs
+
+
+def discord_edit_kwargs(payload: Payload) -> Dict[str, Any]:
+    # every key: the ones the new version does not have are cleared
+    kwargs: Dict[str, Any] = {key: payload.get(key) for key in DISCORD_UPDATE_KEYS}
+    kwargs["embeds"] = [Embed.from_dict(embed) for embed in kwargs["embeds"] or []]
+    return kwargs
+
+
+def record_send(key: str, kind: str, started_at: float, rate_limited: bool = False, failed: bool = False) -> None:
+    """Metrics of one post to a destination"""
+    send_seconds.observe(time.perf_counter() - started_at, destination=key, kind=kind)
+    if rate_limited:
+        send_rate_limited_total.inc(destination=key, kind=kind)
+    if failed:
+        send_errors_total.inc(destination=key, kind=kind)
+
+
+class Destination(abc.ABC):
+    """Where a callback posts to.
+
+    ``key`` identifies the destination without exposing credentials, so it is used for logs, results, queues and
+    rate limits. ``send`` waits for the rate limit of the destination and retries 429 responses after ``Retry-After``.
+
+    The posts of the destinations which implement ``message_id`` can be changed in place by ``send_update`` and
+    ``send_delete`` (the rate limited ``update`` and ``delete``).
+    """
+
+    kind: str
+
+    def __init__(self, key: str, target: str) -> None:
+        self.key: str = key
+        # how the config refers to the destination:
+        #   channel id (slack), webhook url (slack_webhook), webhook id (discord)
+        self.target: str = target
+
+    @abc.abstractmethod
+    def post(self, payload: Payload) -> Any:
+        ...
+
+    def message_id(self, response: Any) -> Optional[str]:
+        """id of the post ``response`` of ``post`` refers to"""
+        return None
+
+    def update(self, message_id: str, payload: Payload) -> Any:
+        raise NotImplementedError(f"{self.kind} posts can not be edited")
+
+    def delete(self, message_id: str) -> Any:
+        raise NotImplementedError(f"{self.kind} posts can not be deleted")
+
+    def send(self, payload: Payload) -> Any:
+        return self._request("send", self.post, payload)
+
+    def send_update(self, message_id: str, payload: Payload) -> Any:
+        return self._request("update", self.update, message_id, payload)
+
+    def send_delete(self, message_id: str) -> Any:
+        return self._request("delete", self.delete, message_id)
+
+    def _request(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        attempt: int = 0
+        while True:
+            with waiting():
+                rate_limiter.acquire(self.key, self.kind)
+            started_at: float = time.perf_counter()
+            try:
+                with tracer.span(f"{operation}.{self.kind}", destination=self.key, attempt=attempt):
+                    response: Any = func(*args)
+            except Exception as e:
+                retry_after: Optional[float] = get_retry_after(e)
+                failed: bool = retry_after is None or attempt >= rate_limiter.max_retries
+                record_send(self.key, self.kind, started_at, rate_limited=retry_after is not None, failed=failed)
+                if retry_after is None or failed:
+                    raise
+                attempt += 1
+                logger.warning(f"rate limited by the destination: {self.key=}, {retry_after=}, {attempt=}")
+                with waiting():
+                    time.sleep(rate_limiter.penalize(self.key, self.kind, retry_after))
+            else:
+                record_send(self.key, self.kind, started_at)
+                return response
+
+    def send_all(self, payloads: List[Payload]) -> List[Any]:
+        # in order: a message and its attachments must not be swapped
+        return [self.send(payload) for payload in payloads]
+
+    def sync_all(self, message_ids: List[str], payloads: List[Payload]) -> List[str]:
+        """Make the posts ``message_ids`` show ``payloads``: the first ones are edited, the missing ones are posted and
+        the extra ones deleted. Returns the ids of the posts (``[]`` if the destination has no ``message_id``)."""
+        new_ids: List[str] = []
+        for idx, payload in enumerate(payloads):
+            if idx < len(message_ids):
+                self.send_update(message_ids[idx], payload)
+                new_ids.append(message_ids[idx])
+            elif (message_id := self.message_id(self.send(payload))) is not None:
+                new_ids.append(message_id)
+        for message_id in message_ids[len(payloads) :]:
+            self.send_delete(message_id)
+        return new_ids
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(key={self.key!r})"
+
+
+class SlackClientDestination(Destination):
+    kind = "slack"
+
+    def __init__(self, client_model: SlackClientAppModel) -> None:
+        super().__init__(
+            slack_client_key(client_model.app.client.token, client_model.tgt_channel_id), client_model.tgt_channel_id
+        )
+        self.client_model: SlackClientAppModel = client_model
+
+    def post(self, payload: Payload) -> Any:
+        return self.client_model.app.client.chat_postMessage(channel=self.client_model.tgt_channel_id, **payload)
+
+    def message_id(self, response: Any) -> Optional[str]:
+        return cast(Optional[str], response.get("ts"))
+
+    def update(self, message_id: str, payload: Payload) -> Any:
+        return self.client_model.app.client.chat_update(
+            channel=self.client_model.tgt_channel_id,
+            ts=message_id,
+            **{key: val for key, val in payload.items() if key in SLACK_UPDATE_KEYS},
+        )
+
+    def delete(self, message_id: str) -> Any:
+        return self.client_model.app.client.chat_delete(channel=self.client_model.tgt_channel_id, ts=message_id)
+
+
+class SlackWebhookDestination(Destination):
+    kind = "slack_webhook"
+
+    def __init__(self, webhook_url: str, timeout: Optional[float] = 10.0) -> None:
+        super().__init__(slack_webhook_key(webhook_url), webhook_url)
+        self.webhook_url: str = webhook_url
+        self.timeout: Optional[float] = timeout
+
+    def post(self, payload: Payload) -> requests.Response:
+        response: requests.Response = connection_pool.session.post(
+            self.webhook_url,
+            headers={
+                "Content-Type": "application/json",
+            },
+            json=payload,
+            timeout=self.timeout,
+        )
+        if response.status_code == 429:
+            raise RateLimitedError(parse_retry_after(response.headers))
+        response.raise_for_status()
+        return response
+
+
+class DiscordWebhookDestination(Destination):
+    kind = "discord"
+
+    def __init__(self, webhook: discord.webhook.sync.SyncWebhook, upload_timeout: Optional[float] = 60.0) -> None:
+        super().__init__(discord_webhook_key(webhook.id), f"{webhook.id}")
+        self.webhook: discord.webhook.sync.SyncWebhook = webhook
+        self.upload_timeout: Optional[float] = upload_timeout
+
+    def post(self, payload: Payload) -> Any:
+        if payload.get("files") and (payload := drop_missing_files(payload)).get("files"):
+            return self.upload(payload)
+        # wait: Discord answers with the message, whose id is kept to edit it
+        return self.webhook.send(wait=True, **discord_send_kwargs(payload))
+
+    def upload(self, payload: Payload, message_id: Optional[str] = None) -> requests.Response:
+        """Post ``payload`` with its files, streamed from the disk (``SyncWebhook.send`` reads them in memory), or edit
+        the post ``message_id`` into it: the attachments of the post are replaced by the files of ``payload``
+        (``SyncWebhook.edit_message`` can not replace them)"""
+        files: List[MediaFileModel] = [MediaFileModel(**file) for file in payload.get("files") or []]
+        payload_json: Dict[str, Any] = {key: val for key, val in payload.items() if key != "files"}
+        payload_json["attachments"] = [{"id": idx, "filename": file.filename} for idx, file in enumerate(files)]
+        body = MultipartStream(
+            [
+                Part("payload_json", json.dumps(payload_json).encode("utf-8"), "application/json"),
+                *[
+                    Part(f"files[{idx}]", Path(file.path), file.content_type, filename=file.filename)
+                    for idx, file in enumerate(files)
+                ],
+            ]
+        )
+        url: str = (
+            f"https://discord.com/api/v{discord.http.API_VERSION}/webhooks/{self.webhook.id}/{self.webhook.token}"
+        )
+        response: requests.Response = connection_pool.session.request(
+            "POST" if message_id is None else "PATCH",
+            url if message_id is None else f"{url}/messages/{message_id}",
+            params={"wait": "true"} if message_id is None else None,
+            data=body,
+            headers={"Content-Type": body.content_type},
+            timeout=self.upload_timeout,
+        )
+        if response.status_code == 429:
+            raise RateLimitedError(parse_retry_after(response.headers))
+        response.raise_for_status()
+        return response
+
+    def message_id(self, response: Any) -> Optional[str]:
+        if isinstance(response, requests.Response):
+            return f"{response.json()['id']}"
+        return f"{response.id}" if response is not None else None
+
+    def update(self, message_id: str, payload: Payload) -> Any:
+        if payload.get("files"):
+            # even if all of them are gone: the files of the older version have to be removed from the post
+            return self.upload(drop_missing_files(payload), message_id=message_id)
+        return self.webhook.edit_message(int(message_id), **discord_edit_kwargs(payload))
+
+    def delete(self, message_id: str) -> Any:
+        return self.webhook.delete_message(int(message_id))
+
+
+class AsyncDestination(abc.ABC):
+    """asyncio version of ``Destination``"""
+
+    kind: str
+
+    def __init__(self, key: str, target: str) -> None:
+        self.key: str = key
+        self.target: str = target
+
+    @abc.abstractmethod
+    async def post(self, payload: Payload) -> Any:
+        ...
+
+    def message_id(self, response: Any) -> Optional[str]:
+        return None
+
+    async def update(self, message_id: str, payload: Payload) -> Any:
+        raise NotImplementedError(f"{self.kind} posts can not be edited")
+
+    async def delete(self, message_id: str) -> Any:
+        raise NotImplementedError(f"{self.kind} posts can not be deleted")
+
+    async def send(self, payload: Payload) -> Any:
+        return await self._request("send", self.post, payload)
+
+    async def send_update(self, message_id: str, payload: Payload) -> Any:
+        return await self._request("update", self.update, message_id, payload)
+
+    async def send_delete(self, message_id: str) -> Any:
+        return await self._request("delete", self.delete, message_id)
+
+    async def _request(self, operation: str, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        attempt: int = 0
+        while True:
+            async with waiting_async():
+                await rate_limiter.acquire_async(self.key, self.kind)
+            started_at: float = time.perf_counter()
+            try:
+                with tracer.span(f"{operation}.{self.kind}", destination=self.key, attempt=attempt):
+                    response: Any = await func(*args)
+            except Exception as e:
+                retry_after: Optional[float] = get_retry_after(e)
+                failed: bool = retry_after is None or attempt >= rate_limiter.max_retries
+                record_send(self.key, self.kind, started_at, rate_limited=retry_after is not None, failed=failed)
+                if retry_after is None or failed:
+                    raise
+                attempt += 1
+                logger.warning(f"rate limited by the destination: {self.key=}, {retry_after=}, {attempt=}")
+                async with waiting_async():
+                    await asyncio.sleep(rate_limiter.penalize(self.key, self.kind, retry_after))
+            else:
+                record_send(self.key, self.kind, started_at)
+                return response
+
+    async def send_all(self, payloads: List[Payload]) -> List[Any]:
+        return [await self.send(payload) for payload in payloads]
+
+    async def sync_all(self, message_ids: List[str], payloads: List[Payload]) -> List[str]:
+        new_ids: List[str] = []
+        for idx, payload in enumerate(payloads):
+            if idx < len(message_ids):
+                await self.send_update(message_ids[idx], payload)
+                new_ids.append(message_ids[idx])
+            elif (message_id := self.message_id(await self.send(payload))) is not None:
+                new_ids.append(message_id)
+        for message_id in message_ids[len(payloads) :]:
+            await self.send_delete(message_id)
+        return new_ids
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(key={self.key!r})"
+
+
+class AsyncSlackClientDestination(AsyncDestination):
+    kind = "slack"
+
+    def __init__(self, client_model: AsyncSlackClientAppModel) -> None:
+        super().__init__(
+            slack_client_key(client_model.app.client.token, client_model.tgt_channel_id), client_model.tgt_channel_id
+        )
+        self.client_model: AsyncSlackClientAppModel = client_model
+
+    async def post(self, payload: Payload) -> Any:
+        return await self.client_model.app.client.chat_postMessage(channel=self.client_model.tgt_channel_id, **payload)
+
+    def message_id(self, response: Any) -> Optional[str]:
+        return cast(Optional[str], response.get("ts"))
+
+    async def update(self, message_id: str, payload: Payload) -> Any:
+        return await self.client_model.app.client.chat_update(
+            channel=self.client_model.tgt_channel_id,
+            ts=message_id,
+            **{key: val for key, val in payload.items() if key in SLACK_UPDATE_KEYS},
+        )
+
+    async def delete(self, message_id: str) -> Any:
+        return await self.client_model.app.client.chat_delete(channel=self.client_model.tgt_channel_id, ts=message_id)
+
+
+class AsyncSlackWebhookDestination(AsyncDestination):
+    kind = "slack_webhook"
+
+    def __init__(self, webhook_client: AsyncWebhookClient) -> None:
+        super().__init__(slack_webhook_key(webhook_client.url), webhook_client.url)
+        self.webhook_client: AsyncWebhookClient = webhook_client
+
+    async def post(self, payload: Payload) -> Any:
+        response = await self.webhook_client.send_dict(payload)
+        if response.status_code == 429:
+            raise RateLimitedError(parse_retry_after(response.headers))
+        if response.status_code != 200:
+            raise RuntimeError(f"slack webhook returned {response.status_code}: {response.body}")
+        return response
+
+
+class AsyncDiscordWebhookDestination(AsyncDestination):
+    kind = "discord"
+
+    def __init__(self, webhook: discord.Webhook) -> None:
+        super().__init__(discord_webhook_key(webhook.id), f"{webhook.id}")
+        self.webhook: discord.Webhook = webhook
+
+    async def post(self, payload: Payload) -> Any:
+        return await self.webhook.send(wait=True, **discord_send_kwargs(payload))
+
+    def message_id(self, response: Any) -> Optional[str]:
+        return f"{response.id}" if response is not None else None
+
+    async def update(self, message_id: str, payload: Payload) -> Any:
+        return await self.webhook.edit_message(int(message_id), **discord_edit_kwargs(payload))
+
+    async def delete(self, message_id: str) -> Any:
+        return await self.webhook.delete_message(int(message_id))
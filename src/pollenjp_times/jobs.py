@@ -0,0 +1,338 @@
+# Standard Library
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+import time
+from logging import NullHandler
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Generic
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+from typing import Union
+
+# First Party Library
+from pollenjp_times.utils.metrics import jobs_shed_total
+from pollenjp_times.utils.metrics import jobs_spilled_total
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+BACKPRESSURE_POLICIES: Tuple[str, ...] = ("block", "shed", "spill")
+
+Job = Tuple[str, Dict[str, Any]]  # (name, keyword arguments)
+JobFuncT = TypeVar("JobFuncT")
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    kwargs TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    claimed_at REAL
+);
+"""
+
+
+class JobSpill:
+    """Jobs which did not fit in the queue, in a sqlite file: they are run in order, and after a restart too.
+
+    ``pop`` claims a job and ``done`` deletes it once it ran: the jobs a process claimed but did not finish (crash,
+    stop timeout) are claimable again when the file is opened next (at-least-once).
+
+    The keyword arguments are stored as json: values which cannot be (e.g. ``say``) are given back as ``None``.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path: Path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn: sqlite3.Connection = sqlite3.connect(f"{self.path}", check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        if "claimed_at" not in [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN claimed_at REAL")  # file of an older version
+        # the claims of the previous process: its unfinished jobs run again
+        if requeued := self._conn.execute("UPDATE jobs SET claimed_at = NULL WHERE claimed_at IS NOT NULL").rowcount:
+            logger.info(f"spilled jobs claimed by the previous run requeued: {requeued}")
+        self._lock: threading.Lock = threading.Lock()
+        self._closed: bool = False
+        self._count: int = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]  # unclaimed
+
+    def __len__(self) -> int:
+        return self._count
+
+    def push(self, job: Job) -> None:
+        name, kwargs = job
+        data: str = json.dumps(kwargs, ensure_ascii=False, default=lambda obj: None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (name, kwargs, created_at) VALUES (?, ?, ?)", (name, data, time.time())
+            )
+            self._count += 1
+
+    def pop(self) -> Optional[Tuple[int, Job]]:
+        """Claim the oldest job. Returns its id (for ``done``) and the job."""
+        with self._lock:
+            if self._count == 0 or self._closed:
+                return None
+            row: Optional[Tuple[int, str, str]] = self._conn.execute(
+                "SELECT id, name, kwargs FROM jobs WHERE claimed_at IS NULL ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self._count = 0
+                return None
+            self._conn.execute("UPDATE jobs SET claimed_at = ? WHERE id = ?", (time.time(), row[0]))
+            self._count -= 1
+        return row[0], (row[1], json.loads(row[2]))
+
+    def done(self, job_id: int) -> None:
+        """Delete the claimed job ``job_id`` (it ran, or failed: a failed job is not retried)"""
+        with self._lock:
+            if self._closed:
+                return  # stopped while the job ran: it stays claimed and runs again on the next start
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
+
+class JobQueueBase(Generic[JobFuncT]):
+    """Work the Slack listeners hand over once they acknowledged the envelope
+
+    Jobs are registered by name (``register``) and queued with their keyword arguments (``submit``). When the queue
+    holds ``maxsize`` jobs, ``backpressure`` decides:
+
+    * ``block``: the listener waits for a free slot
+    * ``shed``: the job is dropped (logged, and counted by ``pollenjp_times_jobs_shed_total``)
+    * ``spill``: the job is written to the sqlite file ``spill_path``; the jobs submitted while the file is not empty
+      go there too, so they still run in order
+
+    Args:
+        workers (int): jobs run at once. ``0``: the jobs run in the listener, as if there was no queue
+        maxsize (int): jobs waiting in memory
+        backpressure (str): one of ``BACKPRESSURE_POLICIES``
+        spill_path (Optional[Union[str, Path]]): required by ``spill``
+    """
+
+    poll_interval: float = 1.0  # seconds between two checks of the spill file by an idle worker
+
+    def __init__(
+        self,
+        workers: int = 8,
+        maxsize: int = 1000,
+        backpressure: str = "block",
+        spill_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Invalid backpressure: {backpressure} (expected one of {BACKPRESSURE_POLICIES})")
+        if backpressure == "spill" and spill_path is None:
+            raise ValueError("backpressure 'spill' requires a spill_path")
+        self.workers: int = workers
+        self.maxsize: int = maxsize
+        self.backpressure: str = backpressure
+        self.spill: Optional[JobSpill] = JobSpill(spill_path) if backpressure == "spill" and spill_path else None
+        self.jobs: Dict[str, JobFuncT] = {}
+
+    def register(self, name: str, func: JobFuncT) -> None:
+        self.jobs[name] = func
+
+    def _must_spill(self) -> bool:
+        # jobs are already waiting in the file: the new ones go after them
+        return self.spill is not None and len(self.spill) > 0
+
+    def _overflow(self, job: Job) -> bool:
+        """The queue is full: shed or spill ``job``. Returns whether it will run."""
+        if self.spill is None:
+            jobs_shed_total.inc(job=job[0])
+            logger.warning(f"job queue is full, job shed: name={job[0]}, maxsize={self.maxsize}")
+            return False
+        jobs_spilled_total.inc(job=job[0])
+        self.spill.push(job)
+        return True
+
+    def _pop_spilled(self) -> Optional[Tuple[Job, Optional[int]]]:
+        if self.spill is None or (spilled := self.spill.pop()) is None:
+            return None
+        return spilled[1], spilled[0]
+
+    def _finish(self, spill_id: Optional[int]) -> None:
+        if spill_id is not None and self.spill is not None:
+            self.spill.done(spill_id)
+
+
+class JobQueue(JobQueueBase[Callable[..., None]]):
+    __doc__ = JobQueueBase.__doc__
+
+    def __init__(
+        self,
+        workers: int = 8,
+        maxsize: int = 1000,
+        backpressure: str = "block",
+        spill_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        super().__init__(workers=workers, maxsize=maxsize, backpressure=backpressure, spill_path=spill_path)
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=maxsize)
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "JobQueue":
+        if self.spill is not None and len(self.spill) > 0:
+            logger.info(f"jobs left by the previous run: {len(self.spill)}")
+        self._threads = [
+            threading.Thread(target=self._run, name=f"job-worker-{idx}", daemon=True) for idx in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Run the jobs in memory and stop the workers (spilled jobs stay in the file for the next start)"""
+        for _ in self._threads:
+            self._queue.put(None)
+        deadline: Optional[float] = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(timeout=None if deadline is None else max(deadline - time.monotonic(), 0.0))
+        self._threads = []
+        if self.spill is not None:
+            self.spill.close()
+
+    def submit(self, name: str, **kwargs: Any) -> bool:
+        """Queue the job ``name``. Returns ``False`` if it was shed."""
+        if name not in self.jobs:
+            raise ValueError(f"Unknown job: {name}")
+        if not self._threads:
+            self._execute((name, kwargs))
+            return True
+        if self._must_spill():
+            return self._overflow((name, kwargs))
+        if self.backpressure == "block":
+            self._queue.put((name, kwargs))
+            return True
+        try:
+            self._queue.put_nowait((name, kwargs))
+        except queue.Full:
+            return self._overflow((name, kwargs))
+        return True
+
+    def _take(self) -> Union[Tuple[Job, Optional[int]], None, bool]:
+        """A job (and its id in the spill file), ``None`` to stop, or ``False`` if there is nothing to run yet"""
+        job: Optional[Job]
+        try:
+            job = self._queue.get_nowait()
+            return None if job is None else (job, None)
+        except queue.Empty:
+            pass
+        if (spilled := self._pop_spilled()) is not None:
+            return spilled
+        try:
+            job = self._queue.get(timeout=self.poll_interval if self.spill is not None else None)
+        except queue.Empty:
+            return False
+        return None if job is None else (job, None)
+
+    def _run(self) -> None:
+        while (taken := self._take()) is not None:
+            if taken is not False:
+                assert not isinstance(taken, bool)
+                self._execute(taken[0])
+                self._finish(taken[1])
+
+    def _execute(self, job: Job) -> None:
+        name, kwargs = job
+        try:
+            self.jobs[name](**kwargs)
+        except Exception:
+            logger.error(f"job failed: {name=}", exc_info=True)
+
+
+class AsyncJobQueue(JobQueueBase[Callable[..., Awaitable[None]]]):
+    """asyncio version of ``JobQueue``: the workers are tasks of the running event loop"""
+
+    def __init__(
+        self,
+        workers: int = 8,
+        maxsize: int = 1000,
+        backpressure: str = "block",
+        spill_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        super().__init__(workers=workers, maxsize=maxsize, backpressure=backpressure, spill_path=spill_path)
+        self._queue: Optional["asyncio.Queue[Optional[Job]]"] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    def start(self) -> "AsyncJobQueue":
+        """Must be called in the event loop of the listeners"""
+        if self.spill is not None and len(self.spill) > 0:
+            logger.info(f"jobs left by the previous run: {len(self.spill)}")
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._run(), name=f"job-worker-{idx}") for idx in range(self.workers)]
+        return self
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        if self._queue is not None:
+            for _ in self._tasks:
+                await self._queue.put(None)
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+        self._tasks = []
+        if self.spill is not None:
+            self.spill.close()
+
+    async def submit(self, name: str, **kwargs: Any) -> bool:
+        if name not in self.jobs:
+            raise ValueError(f"Unknown job: {name}")
+        if self._queue is None or not self._tasks:
+            await self._execute((name, kwargs))
+            return True
+        if self._must_spill():
+            return self._overflow((name, kwargs))
+        if self.backpressure == "block":
+            await self._queue.put((name, kwargs))
+            return True
+        try:
+            self._queue.put_nowait((name, kwargs))
+        except asyncio.QueueFull:
+            return self._overflow((name, kwargs))
+        return True
+
+    async def _take(self) -> Union[Tuple[Job, Optional[int]], None, bool]:
+        assert self._queue is not None
+        job: Optional[Job]
+        try:
+            job = self._queue.get_nowait()
+            return None if job is None else (job, None)
+        except asyncio.QueueEmpty:
+            pass
+        if (spilled := self._pop_spilled()) is not None:
+            return spilled
+        if self.spill is None:
+            job = await self._queue.get()
+        else:
+            try:
+                job = await asyncio.wait_for(self._queue.get(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                return False
+        return None if job is None else (job, None)
+
+    async def _run(self) -> None:
+        while (taken := await self._take()) is not None:
+            if taken is not False:
+                assert not isinstance(taken, bool)
+                await self._execute(taken[0])
+                self._finish(taken[1])
+
+    async def _execute(self, job: Job) -> None:
+        name, kwargs = job
+        try:
+            await self.jobs[name](**kwargs)
+        except Exception:
+            logger.error(f"job failed: {name=}", exc_info=True)
@@ -0,0 +1,285 @@
+# Standard Library
+import hashlib
+import mimetypes
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from logging import NullHandler
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+from urllib.parse import urlparse
+
+# First Party Library
+from pollenjp_times.types import MediaFileModel
+from pollenjp_times.utils.discord_payload import attach_embed_images
+from pollenjp_times.utils.discord_payload import pack_discord_files
+from pollenjp_times.utils.http import connection_pool
+from pollenjp_times.utils.metrics import media_fetches_total
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    content_type TEXT NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_used_at ON objects (used_at);
+CREATE TABLE IF NOT EXISTS keys (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+"""
+
+# Slack files which have no content to download
+SLACK_FILE_MODES_WITHOUT_CONTENT: Tuple[str, ...] = ("tombstone", "hidden_by_limit", "external")
+
+
+class TooLargeError(Exception):
+    pass
+
+
+class MediaCache:
+    """Files downloaded for the mirrors, stored in ``directory`` once per content (sha256)
+
+    A ``key`` (e.g. the id of a Slack file, or the url of an image) maps to the content it was downloaded as, so a
+    file is requested once however many destinations it is sent to or however often it is posted again. The files are
+    streamed to the disk chunk by chunk. Beyond ``max_total_bytes`` the least recently used files are removed.
+
+    Args:
+        directory (Union[str, Path]): the files and the index (``index.sqlite``)
+        max_file_bytes (int): larger files are not downloaded
+        max_total_bytes (int): size of the cache
+        timeout (float): seconds to connect / between two chunks of a download
+    """
+
+    key_locks: int = 64  # downloads of the same key wait for each other (the keys share these locks)
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_file_bytes: int = 10 * 1024 * 1024,
+        max_total_bytes: int = 512 * 1024 * 1024,
+        chunk_size: int = 64 * 1024,
+        timeout: float = 30.0,
+    ) -> None:
+        self.directory: Path = Path(directory)
+        self.max_file_bytes: int = max_file_bytes
+        self.max_total_bytes: int = max(max_total_bytes, max_file_bytes)
+        self.chunk_size: int = chunk_size
+        self.timeout: float = timeout
+        (self.directory / "tmp").mkdir(parents=True, exist_ok=True)
+        self._conn: sqlite3.Connection = sqlite3.connect(
+            f"{self.directory / 'index.sqlite'}", check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock: threading.Lock = threading.Lock()
+        self._key_locks: List[threading.Lock] = [threading.Lock() for _ in range(self.key_locks)]
+
+    def object_path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / digest
+
+    def fetch(
+        self,
+        url: str,
+        key: str,
+        filename: str,
+        headers: Optional[Dict[str, str]] = None,
+        size: Optional[int] = None,
+        reject_html: bool = False,
+    ) -> Optional[MediaFileModel]:
+        """The file of ``key``, downloaded from ``url`` if the cache does not have it. ``None``: too large (``size``:
+        the announced size, if known) or the download failed.
+
+        Args:
+            reject_html (bool): an html response is an error (Slack answers the file urls with its sign-in page
+                when the token may not read the file)
+        """
+        if size is not None and size > self.max_file_bytes:
+            media_fetches_total.inc(result="too_large")
+            return None
+        with self._key_locks[hash(key) % self.key_locks]:
+            if (cached := self._lookup(key)) is not None:
+                media_fetches_total.inc(result="hit")
+                return MediaFileModel(path=f"{self.object_path(cached[0])}", filename=filename, **cached[1])
+            try:
+                digest, nbytes, content_type = self._download(url, headers or {}, reject_html)
+            except TooLargeError:
+                media_fetches_total.inc(result="too_large")
+                logger.info(f"file too large: {key=}, max_file_bytes={self.max_file_bytes}")
+                return None
+            except Exception:
+                media_fetches_total.inc(result="error")
+                logger.warning(f"Failed to download a file: {key=}", exc_info=True)
+                return None
+            self._store(key, digest, nbytes, content_type)
+        media_fetches_total.inc(result="download")
+        return MediaFileModel(
+            path=f"{self.object_path(digest)}", filename=filename, content_type=content_type, size=nbytes
+        )
+
+    def _lookup(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            row: Optional[Tuple[str, int, str]] = self._conn.execute(
+                "SELECT objects.digest, objects.size, objects.content_type FROM keys"
+                " JOIN objects ON keys.digest = objects.digest WHERE keys.key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if not self.object_path(row[0]).exists():  # removed by hand
+                self._conn.execute("DELETE FROM objects WHERE digest = ?", (row[0],))
+                return None
+            self._conn.execute("UPDATE objects SET used_at = ? WHERE digest = ?", (time.time(), row[0]))
+        return row[0], {"size": row[1], "content_type": row[2]}
+
+    def _download(self, url: str, headers: Dict[str, str], reject_html: bool) -> Tuple[str, int, str]:
+        """Stream ``url`` into the cache. Returns its sha256, size and content type."""
+        digest = hashlib.sha256()
+        nbytes: int = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory / "tmp")
+        try:
+            with os.fdopen(fd, mode="wb") as f, connection_pool.session.get(
+                url, headers=headers, stream=True, timeout=self.timeout
+            ) as response:
+                response.raise_for_status()
+                content_type: str = response.headers.get("Content-Type", "application/octet-stream").split(";")[0]
+                if reject_html and content_type == "text/html":
+                    raise ValueError(f"html instead of a file: is the token allowed to read it? {response.url=}")
+                if int(response.headers.get("Content-Length") or 0) > self.max_file_bytes:
+                    raise TooLargeError()
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    nbytes += len(chunk)
+                    if nbytes > self.max_file_bytes:
+                        raise TooLargeError()
+                    digest.update(chunk)
+                    f.write(chunk)
+            path: Path = self.object_path(digest.hexdigest())
+            path.parent.mkdir(exist_ok=True)
+            os.replace(tmp_name, path)  # the same content downloaded under another key: same file
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return digest.hexdigest(), nbytes, content_type
+
+    def _store(self, key: str, digest: str, nbytes: int, content_type: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO objects (digest, size, content_type, used_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (digest) DO UPDATE SET used_at = excluded.used_at",
+                (digest, nbytes, content_type, time.time()),
+            )
+            self._conn.execute(
+                "INSERT INTO keys (key, digest) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET digest = excluded.digest",
+                (key, digest),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total: int = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        if total <= self.max_total_bytes:
+            return
+        for digest, size in self._conn.execute("SELECT digest, size FROM objects ORDER BY used_at").fetchall():
+            self.object_path(digest).unlink(missing_ok=True)
+            self._conn.execute("DELETE FROM keys WHERE digest = ?", (digest,))
+            self._conn.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+            total -= size
+            if total <= self.max_total_bytes:
+                break
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class MediaForwarder:
+    """Uploads the files of the mirrored messages (and the images of their embeds) to Discord
+
+    Slack and Slack webhook destinations are not concerned: their payloads are left as they are.
+
+    Args:
+        cache (MediaCache): where the files are downloaded
+        max_upload_bytes (int): files of a Discord message, in total (the upload limit of the server)
+        rehost_images (bool): upload the images of the embeds too, instead of letting Discord fetch their url
+    """
+
+    def __init__(self, cache: MediaCache, max_upload_bytes: int = 10 * 1024 * 1024, rehost_images: bool = True) -> None:
+        self.cache: MediaCache = cache
+        self.max_upload_bytes: int = max_upload_bytes
+        self.rehost_images: bool = rehost_images
+
+    def fetch_slack_files(self, message: Dict[str, Any], token: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """(``MediaFileModel.dict()`` of the files of ``message``, a line per file which could not be fetched)"""
+        files: List[Dict[str, Any]] = []
+        missing: List[str] = []
+        for file in message.get("files") or []:
+            url: Optional[str] = file.get("url_private_download") or file.get("url_private")
+            name: str = file.get("name") or file.get("title") or f"{file.get('id')}"
+            media_file: Optional[MediaFileModel] = None
+            if url is not None and file.get("mode") not in SLACK_FILE_MODES_WITHOUT_CONTENT:
+                media_file = self.cache.fetch(
+                    url,
+                    key=f"slack:{file.get('id')}",
+                    filename=name,
+                    headers={"Authorization": f"Bearer {token}"},
+                    size=file.get("size"),
+                    reject_html=file.get("mimetype") != "text/html",
+                )
+            if media_file is None:
+                missing.append(f"{name} {file.get('permalink') or ''}".strip())
+            else:
+                media_file.url = file.get("permalink")
+                files.append(media_file.dict())
+        return files, missing
+
+    def rehost_embed_images(self, embeds: List[Dict[str, Any]]) -> Dict[str, Tuple[Dict[str, Any], str]]:
+        """Point the images of ``embeds`` (``Embed.to_dict()``) at uploaded copies (``attachment://<name>``).
+
+        Returns:
+            Dict[str, Tuple[Dict[str, Any], str]]: name of an upload: (``MediaFileModel.dict()``, url of the image)
+        """
+        images: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        if not self.rehost_images:
+            return images
+        for embed in embeds:
+            if (url := (embed.get("image") or {}).get("url")) is None or not url.startswith(("http://", "https://")):
+                continue
+            key: str = f"url:{url}"
+            suffix: str = Path(urlparse(url).path).suffix
+            name: str = f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}{suffix}"
+            if (media_file := self.cache.fetch(url, key=key, filename=name, reject_html=True)) is None:
+                continue
+            if not suffix and (guessed := mimetypes.guess_extension(media_file.content_type)) is not None:
+                # Discord shows an attachment as an image by its extension
+                media_file.filename = name = f"{name}{guessed}"
+            media_file.url = url
+            embed["image"]["url"] = f"attachment://{name}"
+            images[name] = (media_file.dict(), url)
+        return images
+
+    def attach(
+        self,
+        payloads: List[Dict[str, Any]],
+        files: List[Dict[str, Any]],
+        images: Optional[Dict[str, Tuple[Dict[str, Any], str]]] = None,
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        """Add the uploads to the Discord ``payloads``: the images with the embeds which show them, then ``files``"""
+        if images:
+            payloads = attach_embed_images(payloads, images, max_bytes=self.max_upload_bytes)
+        return pack_discord_files(payloads, files, max_bytes=self.max_upload_bytes, **kwargs)
+
+    def close(self) -> None:
+        self.cache.close()
@@ -0,0 +1,146 @@
+# Standard Library
+import asyncio
+import sqlite3
+import threading
+import time
+from decimal import Decimal
+from logging import NullHandler
+from logging import getLogger
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS posts (
+    source TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    message_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (source, destination, seq)
+);
+CREATE INDEX IF NOT EXISTS posts_created_at ON posts (created_at);
+CREATE TABLE IF NOT EXISTS versions (
+    source TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    version TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (source, destination)
+);
+"""
+
+
+def source_key(channel_id: str, ts: str) -> str:
+    return f"{channel_id}:{ts}"
+
+
+def is_stale(version: str, synced: Optional[str]) -> bool:
+    """Whether the posts already show a later version (``synced``) of the source than ``version`` (Slack ``ts``)"""
+    return synced is not None and Decimal(version) < Decimal(synced)
+
+
+class MessageIndex:
+    """Ids of the posts (Slack ``ts``, Discord message id) a source message produced at each destination, so an edit
+    of the source updates them and a deletion deletes them instead of posting again.
+
+    The version of the source the posts show is kept too (even once they are deleted): the syncs of a message and of
+    its edits can take the ``post_lock`` in any order, and an older version must not overwrite a newer one.
+
+    Args:
+        path (Union[str, Path]): sqlite file. ``":memory:"``: the index is lost on restart
+        retention (float): seconds an entry is kept. Older messages are not edited / deleted anymore
+    """
+
+    prune_interval: float = 3600.0  # seconds between two deletions of the expired entries
+    post_locks: int = 64  # syncs of the posts of a source at a destination wait for each other (sharing these locks)
+
+    def __init__(self, path: Union[str, Path] = ":memory:", retention: float = 7 * 86400.0) -> None:
+        self.path: str = f"{path}"
+        self.retention: float = retention
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn: sqlite3.Connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock: threading.Lock = threading.Lock()
+        self._pruned_at: float = 0.0
+        self._post_locks: List[threading.Lock] = [threading.Lock() for _ in range(self.post_locks)]
+        self._async_post_locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(self.post_locks)]
+
+    def post_lock(self, source: str, destination: str) -> threading.Lock:
+        """To hold from ``get`` to ``set`` of the posts of ``source`` at ``destination``: a message and its edit
+        handled by two workers at once would both find no post, and both post."""
+        return self._post_locks[hash((source, destination)) % self.post_locks]
+
+    def async_post_lock(self, source: str, destination: str) -> asyncio.Lock:
+        """``post_lock`` of the asyncio runtime"""
+        return self._async_post_locks[hash((source, destination)) % self.post_locks]
+
+    def get(self, source: str, destination: str) -> List[str]:
+        """Ids of the posts of ``source`` at ``destination``, in order (``[]``: none)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message_id FROM posts WHERE source = ? AND destination = ? AND created_at >= ? ORDER BY seq",
+                (source, destination, time.time() - self.retention),
+            ).fetchall()
+        return [message_id for (message_id,) in rows]
+
+    def version(self, source: str, destination: str) -> Optional[str]:
+        """Version of ``source`` its posts at ``destination`` show (``None``: unknown)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM versions WHERE source = ? AND destination = ? AND created_at >= ?",
+                (source, destination, time.time() - self.retention),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, source: str, destination: str, message_ids: List[str], version: Optional[str] = None) -> None:
+        now: float = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM posts WHERE source = ? AND destination = ?", (source, destination))
+                self._conn.executemany(
+                    "INSERT INTO posts (source, destination, seq, message_id, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [(source, destination, seq, message_id, now) for seq, message_id in enumerate(message_ids)],
+                )
+                if version is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO versions (source, destination, version, created_at)"
+                        " VALUES (?, ?, ?, ?)",
+                        (source, destination, version, now),
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            if now - self._pruned_at > self.prune_interval:
+                self._pruned_at = now
+                self._conn.execute("DELETE FROM posts WHERE created_at < ?", (now - self.retention,))
+                self._conn.execute("DELETE FROM versions WHERE created_at < ?", (now - self.retention,))
+
+    def pop(self, source: str) -> Dict[str, List[str]]:
+        """Remove ``source``. Returns the ids of its posts per destination."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT destination, message_id FROM posts WHERE source = ? AND created_at >= ?"
+                " ORDER BY destination, seq",
+                (source, time.time() - self.retention),
+            ).fetchall()
+            self._conn.execute("DELETE FROM posts WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM versions WHERE source = ?", (source,))
+        posts: Dict[str, List[str]] = {}
+        for destination, message_id in rows:
+            posts.setdefault(destination, []).append(message_id)
+        return posts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,245 @@
+# Standard Library
+import json
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from logging import NullHandler
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+# First Party Library
+from pollenjp_times.destinations import Destination
+from pollenjp_times.destinations import Payload
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+STATUS_PENDING: str = "pending"
+STATUS_DEAD: str = "dead"
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    destination TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS deliveries_status_destination ON deliveries (status, destination, id);
+"""
+
+
+class Outbox:
+    """Durable outbound delivery queue backed by SQLite (WAL mode).
+
+    Deliveries are stored before they are sent and removed once the destination accepted them, so anything left in
+    the database when the process stops is sent again on the next start (at-least-once).
+
+    * deliveries of one destination are sent one at a time in enqueue order, different destinations in parallel
+    * a failed delivery is retried with exponential backoff (``base_delay * 2 ** (attempts - 1)`` capped by
+      ``max_delay``, with jitter) and moved to the dead letters after ``max_attempts``
+    * a delivery whose destination is not registered (e.g. removed from the config) goes to the dead letters too
+
+    Args:
+        path (Union[str, Path]): sqlite database file
+        max_attempts (int): attempts before a delivery is dead-lettered
+        base_delay (float): seconds before the first retry
+        max_delay (float): upper bound of the retry delay in seconds
+        workers (int): max number of destinations sent to at once
+    """
+
+    poll_interval: float = 1.0
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_attempts: int = 8,
+        base_delay: float = 1.0,
+        max_delay: float = 300.0,
+        workers: int = 4,
+    ) -> None:
+        self.path: Path = Path(path)
+        self.max_attempts: int = max_attempts
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+        self.workers: int = workers
+        self.destinations: Dict[str, Destination] = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn: sqlite3.Connection = sqlite3.connect(f"{self.path}", check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._db_lock: threading.Lock = threading.Lock()
+
+        self._wakeup: threading.Event = threading.Event()
+        self._stop: threading.Event = threading.Event()
+        self._in_flight: Set[str] = set()  # destinations with a delivery being sent
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, destination: Destination) -> None:
+        self.destinations[destination.key] = destination
+
+    def enqueue(self, destination: Destination, payloads: List[Payload]) -> None:
+        if destination.key not in self.destinations:
+            self.register(destination)
+        now: float = time.time()
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT INTO deliveries (destination, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                [(destination.key, json.dumps(payload, ensure_ascii=False), now, now) for payload in payloads],
+            )
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Start sending. Deliveries left by the previous process are replayed first."""
+        if self._thread is not None:
+            return
+        logger.info(f"Starting outbox: {self.stats()=}")
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="outbox")
+        self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            try:
+                wait_timeout: float = self._dispatch_due()
+            except Exception:
+                logger.error("outbox dispatcher failed", exc_info=True)
+                wait_timeout = self.poll_interval
+            self._wakeup.wait(timeout=wait_timeout)
+
+    def _dispatch_due(self) -> float:
+        """Submit the head delivery of every idle destination which is due. Returns seconds until the next one."""
+        now: float = time.time()
+        wait_timeout: float = self.poll_interval
+        claimed: List[Tuple[int, Destination, str, int]] = []
+        unknown: List[Tuple[int, str, int]] = []
+        # the heads are read and their destinations claimed under the lock _on_done deletes / updates a row and
+        # releases its destination with: a row delivered meanwhile is never read as a head again
+        with self._db_lock:
+            heads: List[Tuple[int, str, str, int, float]] = self._conn.execute(
+                "SELECT id, destination, payload, attempts, next_attempt_at FROM deliveries"
+                " WHERE id IN (SELECT MIN(id) FROM deliveries WHERE status = ? GROUP BY destination)",
+                (STATUS_PENDING,),
+            ).fetchall()
+            for delivery_id, destination_key, payload, attempts, next_attempt_at in heads:
+                if destination_key in self._in_flight:
+                    continue
+                if next_attempt_at > now:
+                    wait_timeout = min(wait_timeout, next_attempt_at - now)
+                    continue
+                if (destination := self.destinations.get(destination_key)) is None:
+                    unknown.append((delivery_id, destination_key, attempts))
+                    continue
+                self._in_flight.add(destination_key)
+                claimed.append((delivery_id, destination, payload, attempts))
+
+        for delivery_id, destination_key, attempts in unknown:
+            self._dead_letter(delivery_id, attempts, f"unknown destination: {destination_key}")
+        assert self._executor is not None
+        for delivery_id, destination, payload, attempts in claimed:
+            future: "Future[Any]" = self._executor.submit(destination.send, json.loads(payload))
+            future.add_done_callback(
+                partial(self._on_done, delivery_id=delivery_id, destination_key=destination.key, attempts=attempts)
+            )
+        return max(wait_timeout, 0.0)
+
+    def _on_done(self, future: "Future[Any]", delivery_id: int, destination_key: str, attempts: int) -> None:
+        error: Optional[BaseException] = future.exception()
+        dead: bool = error is not None and attempts + 1 >= self.max_attempts
+        if error is None:
+            logger.info(f"delivered: {destination_key=}, {delivery_id=}")
+        elif dead:
+            logger.error(f"failed to deliver: {destination_key=}, {delivery_id=}", exc_info=error)
+            logger.error(f"dead-lettered: {delivery_id=}, attempts={attempts + 1}, error={error!r}")
+        with self._db_lock:
+            try:
+                if error is None:
+                    self._conn.execute("DELETE FROM deliveries WHERE id = ?", (delivery_id,))
+                elif dead:
+                    self._conn.execute(
+                        "UPDATE deliveries SET status = ?, attempts = ?, last_error = ? WHERE id = ?",
+                        (STATUS_DEAD, attempts + 1, f"{error!r}", delivery_id),
+                    )
+                else:
+                    delay: float = self.retry_delay(attempts + 1)
+                    logger.warning(
+                        f"failed to deliver, retry in {delay:.1f}s: {destination_key=}, {delivery_id=}, {error!r}"
+                    )
+                    self._conn.execute(
+                        "UPDATE deliveries SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                        (attempts + 1, time.time() + delay, f"{error!r}", delivery_id),
+                    )
+            except Exception:
+                logger.error(f"failed to record a delivery: {destination_key=}, {delivery_id=}", exc_info=True)
+            finally:
+                # released with the row update: the dispatcher never sees the destination idle with the old head
+                self._in_flight.discard(destination_key)
+        self._wakeup.set()
+
+    def retry_delay(self, attempts: int) -> float:
+        delay: float = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.0)
+
+    def _dead_letter(self, delivery_id: int, attempts: int, error: str) -> None:
+        logger.error(f"dead-lettered: {delivery_id=}, {attempts=}, {error=}")
+        with self._db_lock:
+            self._conn.execute(
+                "UPDATE deliveries SET status = ?, attempts = ?, last_error = ? WHERE id = ?",
+                (STATUS_DEAD, attempts, error, delivery_id),
+            )
+
+    def replay_dead_letters(self, destination_key: Optional[str] = None) -> int:
+        """Move dead letters back to the queue. Returns the number of requeued deliveries."""
+        query: str = "UPDATE deliveries SET status = ?, attempts = 0, next_attempt_at = ? WHERE status = ?"
+        params: List[Any] = [STATUS_PENDING, time.time(), STATUS_DEAD]
+        if destination_key is not None:
+            query += " AND destination = ?"
+            params.append(destination_key)
+        with self._db_lock:
+            count: int = self._conn.execute(query, params).rowcount
+        self._wakeup.set()
+        return count
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Number of deliveries per status and destination"""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT status, destination, COUNT(*) FROM deliveries GROUP BY status, destination"
+            ).fetchall()
+        stats: Dict[str, Dict[str, int]] = {}
+        for status, destination_key, count in rows:
+            stats.setdefault(status, {})[destination_key] = count
+        return stats
+
+    def close(self) -> None:
+        self.stop()
+        with self._db_lock:
+            self._conn.close()
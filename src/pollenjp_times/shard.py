@@ -0,0 +1,217 @@
+# Standard Library
+import contextvars
+import hashlib
+import hmac
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from logging import NullHandler
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# First Party Library
+from pollenjp_times.callbacks.base import HOOK_NAMES
+from pollenjp_times.callbacks.base import Callbacks
+from pollenjp_times.callbacks.base import Sender
+from pollenjp_times.callbacks.base import SlackCallbackBase
+from pollenjp_times.utils.http import connection_pool
+from pollenjp_times.utils.tracing import tracer
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# keyword arguments of the hooks which are sent to the other shards (``say`` is bound to the receiving connection)
+FORWARDED_KWARGS: Tuple[str, ...] = ("event", "message", "body")
+
+# HMAC-SHA256 (hex) of the body of a forwarded hook, keyed by the secret the shards share
+SIGNATURE_HEADER: str = "X-Shard-Signature"
+
+# True while a hook forwarded by another shard runs: it is never forwarded again
+_forwarded: contextvars.ContextVar[bool] = contextvars.ContextVar("_forwarded", default=False)
+
+
+def shard_of(channel_id: str, num_shards: int) -> int:
+    """Shard owning the callbacks of the source channel ``channel_id`` (stable across processes)"""
+    return zlib.crc32(channel_id.encode("utf-8")) % num_shards
+
+
+def sign(secret: str, body: bytes) -> str:
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def shard_path(path: str, index: int, num_shards: int) -> str:
+    """``outbox.sqlite3`` -> ``outbox.shard-1.sqlite3``: every shard keeps its own file"""
+    if num_shards <= 1:
+        return path
+    p = Path(path)
+    return f"{p.with_name(f'{p.stem}.shard-{index}{p.suffix}')}"
+
+
+class ShardRouter:
+    """Sends hooks to the shard owning their source channel.
+
+    Every shard opens its own socket mode connection, and Slack hands each event to one of the connections of the
+    app, not to the shard owning the channel. Each shard listens on ``host:base_port + index`` for the events the
+    other shards received, signed with ``secret`` (anything which can reach the port could make the bot post).
+
+    Args:
+        index (int): index of this shard
+        num_shards (int): number of shards
+        secret (str): key of the signatures of the forwarded hooks, the same for every shard
+        host (str): address the shards listen on
+        base_port (int): port of shard 0
+        timeout (float): seconds to wait for the owner to run a forwarded hook
+        channel_ids (Optional[Iterable[str]]): source channels of the callbacks of every shard. The events of the
+            other channels are dropped instead of forwarded (the bot joins every channel). ``None``: forward all
+    """
+
+    def __init__(
+        self,
+        index: int,
+        num_shards: int,
+        secret: str,
+        host: str = "127.0.0.1",
+        base_port: int = 47100,
+        timeout: float = 30.0,
+        channel_ids: Optional[Iterable[str]] = None,
+    ) -> None:
+        if not 0 <= index < num_shards:
+            raise ValueError(f"Invalid shard index: {index=}, {num_shards=}")
+        self.index: int = index
+        self.num_shards: int = num_shards
+        self.secret: str = secret
+        self.host: str = host
+        self.base_port: int = base_port
+        self.timeout: float = timeout
+        # replaced as a whole when the config is reloaded
+        self.channel_ids: Optional[FrozenSet[str]] = frozenset(channel_ids) if channel_ids is not None else None
+
+    def owns(self, channel_id: str) -> bool:
+        return shard_of(channel_id, self.num_shards) == self.index
+
+    def watched(self, channel_id: str) -> bool:
+        """Whether a callback of some shard has ``channel_id`` as its source channel"""
+        return self.channel_ids is None or channel_id in self.channel_ids
+
+    def url(self, index: int) -> str:
+        return f"http://{self.host}:{self.base_port + index}/"
+
+    def forward(self, index: int, function_name: str, kwargs: Dict[str, Any]) -> None:
+        """Run the hook on shard ``index`` and wait for it"""
+        data: Dict[str, Any] = {key: val for key, val in kwargs.items() if key in FORWARDED_KWARGS}
+        body: bytes = json.dumps({"hook": function_name, "kwargs": data}).encode("utf-8")
+        response = connection_pool.session.post(
+            self.url(index),
+            data=body,
+            headers={"Content-Type": "application/json", SIGNATURE_HEADER: sign(self.secret, body)},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+    def verify(self, body: bytes, signature: Optional[str]) -> bool:
+        """Whether ``body`` was forwarded by a shard"""
+        return signature is not None and hmac.compare_digest(sign(self.secret, body), signature)
+
+    def broadcast(self, function_name: str, kwargs: Dict[str, Any]) -> None:
+        """Run the hook on every other shard (events which are not bound to a channel, e.g. ``user_change``)"""
+        for index in range(self.num_shards):
+            if index == self.index:
+                continue
+            try:
+                self.forward(index, function_name, kwargs)
+            except Exception:
+                logger.warning(f"Failed to forward {function_name} to shard {index}", exc_info=True)
+
+
+class ShardedCallbacks(Callbacks):
+    """``Callbacks`` of one shard: hooks of channels owned by another shard are forwarded to it"""
+
+    def __init__(
+        self, callbacks: List[SlackCallbackBase], router: ShardRouter, error_sender: Optional[Sender] = None
+    ) -> None:
+        super().__init__(callbacks, error_sender=error_sender)
+        self.router: ShardRouter = router
+
+    def _notify(self, function_name: str, /, **kwargs: Any) -> None:
+        if not _forwarded.get():
+            if (channel_id := self._get_channel_id(kwargs)) is None:
+                self.router.broadcast(function_name, kwargs)
+            elif not self.router.owns(channel_id):
+                if not self.router.watched(channel_id):
+                    logger.debug(f"drop {function_name} of {channel_id=}: no callback watches the channel")
+                    return
+                owner: int = shard_of(channel_id, self.router.num_shards)
+                logger.debug(f"forward {function_name} of {channel_id=} to shard {owner}")
+                with tracer.span(f"shard.forward.{function_name}", shard=owner):
+                    self.router.forward(owner, function_name, kwargs)
+                return
+        super()._notify(function_name, **kwargs)
+
+    def run_forwarded(self, function_name: str, kwargs: Dict[str, Any]) -> None:
+        token = _forwarded.set(True)
+        try:
+            if function_name == "event_message":
+                kwargs = {"say": None, **kwargs}
+            getattr(self, function_name)(**kwargs)
+        finally:
+            _forwarded.reset(token)
+
+
+class ShardServer(ThreadingHTTPServer):
+    """Receives the hooks forwarded by the other shards"""
+
+    daemon_threads = True
+
+    def __init__(self, callbacks: ShardedCallbacks) -> None:
+        router: ShardRouter = callbacks.router
+        super().__init__((router.host, router.base_port + router.index), _ShardRequestHandler)
+        self.callbacks: ShardedCallbacks = callbacks
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.serve_forever, name="shard-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _ShardRequestHandler(BaseHTTPRequestHandler):
+    server: ShardServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+    def do_POST(self) -> None:
+        body: bytes = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.server.callbacks.router.verify(body, self.headers.get(SIGNATURE_HEADER)):
+            logger.warning(f"rejected a hook without a valid signature from {self.client_address}")
+            self.send_error(403)
+            return
+        try:
+            data: Dict[str, Any] = json.loads(body)
+            function_name: str = data["hook"]
+            kwargs: Dict[str, Any] = data["kwargs"]
+            if function_name not in HOOK_NAMES or not isinstance(kwargs, dict):
+                raise ValueError(f"Unknown hook: {function_name}")
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_error(400, explain=f"{e}")
+            return
+        try:
+            self.server.callbacks.run_forwarded(function_name, kwargs)
+        except Exception as e:
+            logger.error(f"Failed to run forwarded {function_name}", exc_info=True)
+            self.send_error(500, explain=f"{e}")
+            return
+        self.send_response(204)
+        self.end_headers()
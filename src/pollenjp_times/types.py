@@ -7,6 +7,7 @@ from typing import Optional
 # Third Party Library
 from pydantic import BaseModel
 from slack_bolt import App
+from slack_bolt.async_app import AsyncApp
 
 
 class SlackClientAppModel(BaseModel):
@@ -17,6 +18,14 @@ class SlackClientAppModel(BaseModel):
     tgt_channel_id: str
 
 
+class AsyncSlackClientAppModel(BaseModel):
+    class Config:
+        arbitrary_types_allowed = True
+
+    app: AsyncApp
+    tgt_channel_id: str
+
+
 class UserModel(BaseModel):
     id: str
     name: str
@@ -35,6 +44,7 @@ class ChannelModel(BaseModel):
     # is_shared: bool
     # is_org_shared: bool
     is_archived: bool = False
+    is_member: Optional[bool] = None  # None: unknown (e.g. built from an event)
 
 
 class ResponseMetadataModel(BaseModel):
@@ -63,3 +73,60 @@ class MessageAttachmentModel(BaseModel):
     author_icon: Optional[str] = None
     author_name: Optional[str] = None
     author_link: Optional[str] = None
+
+
+class FilterRulesModel(BaseModel):
+    """Rules of ``MessageFilter``
+
+    A message passes if it matches every kind of include rule which is set (text: keywords or patterns, author,
+    domain) and no exclude rule. Keywords and patterns are case insensitive.
+    """
+
+    include_keywords: List[str] = []
+    exclude_keywords: List[str] = []
+    include_patterns: List[str] = []  # regular expressions searched anywhere in the text
+    exclude_patterns: List[str] = []
+    authors: List[str] = []  # user id, bot id, user name or attachment author (``@`` is ignored)
+    exclude_authors: List[str] = []
+    domains: List[str] = []  # domains of the linked urls (subdomains included)
+    exclude_domains: List[str] = []
+
+
+class DeliveryResult(BaseModel):
+    class Config:
+        arbitrary_types_allowed = True
+
+    destination: str
+    ok: bool
+    timed_out: bool = False
+    elapsed: float = 0.0  # seconds
+    error: Optional[str] = None
+    response: Any = None
+
+
+class BackfillCheckpointModel(BaseModel):
+    """Progress of a backfill, saved after every message"""
+
+    channel_id: str
+    ts: str  # the last message handled: the backfill resumes after it
+    delivered: int = 0  # messages mirrored
+    skipped: int = 0  # messages the callback does not mirror
+
+
+class JoinReportModel(BaseModel):
+    """Result of ``invite_existing_channels``"""
+
+    joined: List[str] = []  # channel ids
+    already_joined: int = 0
+    archived: int = 0
+    failed: Dict[str, str] = {}  # channel id: error
+
+
+class MediaFileModel(BaseModel):
+    """A file of the media cache to upload with a post (the payloads hold ``.dict()``: they are json)"""
+
+    path: str
+    filename: str
+    content_type: str = "application/octet-stream"
+    size: int  # bytes
+    url: Optional[str] = None  # where it comes from (permalink, image url): shown instead if the file is gone
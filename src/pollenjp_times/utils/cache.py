@@ -0,0 +1,109 @@
+# Standard Library
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+from typing import Generic
+from typing import Hashable
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Thread safe LRU cache whose entries also expire ``ttl`` seconds after they are set.
+
+    Args:
+        maxsize (int): max number of entries. The least recently used entry is evicted first.
+        ttl (Optional[float]): seconds until an entry expires. ``None`` means never.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 3600.0) -> None:
+        self.maxsize: int = maxsize
+        self.ttl: Optional[float] = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        with self._lock:
+            return self._get(key) is not None
+
+    def _get(self, key: K) -> Optional[Tuple[float, V]]:
+        if (item := self._data.get(key)) is None:
+            return None
+        if item[0] < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            if (item := self._get(key)) is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: K, value: V) -> None:
+        expires_at: float = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def add(self, key: K, value: V) -> bool:
+        """Set ``key`` unless it is already cached (and not expired). Returns whether it was set."""
+        expires_at: float = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            if self._get(key) is not None:
+                return False
+            self._data[key] = (expires_at, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def get_or_set(self, key: K, factory: Callable[[], V]) -> V:
+        if (value := self.get(key)) is not None:
+            return value
+        # call the factory outside the lock: it is usually a Web API request
+        value = factory()
+        self.set(key, value)
+        return value
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def configure(self, maxsize: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    @property
+    def hit_ratio(self) -> float:
+        total: int = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(maxsize={self.maxsize}, ttl={self.ttl}, size={len(self._data)},"
+            f" hits={self.hits}, misses={self.misses})"
+        )
@@ -0,0 +1,85 @@
+# Standard Library
+import signal
+import threading
+from logging import NullHandler
+from logging import getLogger
+from pathlib import Path
+from types import FrameType
+from typing import Callable
+from typing import Optional
+from typing import Tuple
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class ConfigWatcher:
+    """Calls ``on_change`` from a background thread when ``path`` is modified or the process receives SIGHUP.
+
+    The file is polled (mtime and size) every ``interval`` seconds, so no inotify dependency is needed and editors
+    which replace the file instead of writing it in place are handled too. ``on_change`` runs in the watcher thread,
+    one call at a time; an exception is logged and the watcher keeps running.
+
+    Args:
+        path (Path): watched file
+        on_change (Callable[[], None]): reloads the configuration
+        interval (float): seconds between two polls. ``0``: SIGHUP only
+    """
+
+    def __init__(self, path: Path, on_change: Callable[[], None], interval: float = 2.0) -> None:
+        self.path: Path = path
+        self.on_change: Callable[[], None] = on_change
+        self.interval: float = interval
+        self._triggered: threading.Event = threading.Event()
+        self._stopped: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stat: Optional[Tuple[int, int]] = self._read_stat()
+
+    def _read_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def trigger(self) -> None:
+        """Reload now (e.g. from a signal handler: it only sets an event)"""
+        self._triggered.set()
+
+    def _on_sighup(self, signum: int, frame: Optional[FrameType]) -> None:
+        logger.info("SIGHUP: reload the config")
+        self.trigger()
+
+    def start(self) -> "ConfigWatcher":
+        if threading.current_thread() is threading.main_thread() and hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._on_sighup)
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._triggered.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _changed(self) -> bool:
+        stat: Optional[Tuple[int, int]] = self._read_stat()
+        if stat is None or stat == self._stat:  # a missing file is being replaced: wait for the new one
+            return False
+        self._stat = stat
+        return True
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            triggered: bool = self._triggered.wait(self.interval if self.interval > 0 else None)
+            if self._stopped.is_set():
+                break
+            self._triggered.clear()
+            if not (self._changed() or triggered):
+                continue
+            logger.info(f"reload the config: {self.path}")
+            try:
+                self.on_change()
+            except Exception:
+                logger.error(f"Failed to reload the config: {self.path}", exc_info=True)
@@ -0,0 +1,199 @@
+# Standard Library
+import copy
+import os
+from logging import NullHandler
+from logging import getLogger
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# https://discord.com/developers/docs/resources/channel#create-message
+MAX_CONTENT_LENGTH: int = 2000
+MAX_EMBEDS: int = 10
+MAX_FILES: int = 10
+# https://discord.com/developers/docs/resources/channel#embed-object-embed-limits
+MAX_EMBED_TOTAL_LENGTH: int = 6000  # sum over every embed of a message
+MAX_TITLE_LENGTH: int = 256
+MAX_DESCRIPTION_LENGTH: int = 4096
+MAX_AUTHOR_NAME_LENGTH: int = 256
+MAX_FOOTER_TEXT_LENGTH: int = 2048
+
+ELLIPSIS: str = "…"
+
+
+def truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[: limit - len(ELLIPSIS)] + ELLIPSIS
+
+
+def embed_length(embed: Dict[str, Any]) -> int:
+    """Number of characters counted against ``MAX_EMBED_TOTAL_LENGTH``"""
+    length: int = len(embed.get("title") or "") + len(embed.get("description") or "")
+    length += len((embed.get("author") or {}).get("name") or "")
+    length += len((embed.get("footer") or {}).get("text") or "")
+    for field in embed.get("fields") or []:
+        length += len(field.get("name") or "") + len(field.get("value") or "")
+    return length
+
+
+def fit_embed(embed: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of ``embed`` (``Embed.to_dict()``) truncated to the limits of a single embed"""
+    embed = copy.deepcopy(embed)
+    if (title := embed.get("title")) is not None:
+        embed["title"] = truncate(title, MAX_TITLE_LENGTH)
+    if (author := embed.get("author")) is not None and (name := author.get("name")) is not None:
+        author["name"] = truncate(name, MAX_AUTHOR_NAME_LENGTH)
+    if (footer := embed.get("footer")) is not None and (text := footer.get("text")) is not None:
+        footer["text"] = truncate(text, MAX_FOOTER_TEXT_LENGTH)
+    if (description := embed.get("description")) is not None:
+        # the description takes what the other parts leave of the total
+        rest: int = embed_length(embed) - len(description)
+        embed["description"] = truncate(description, min(MAX_DESCRIPTION_LENGTH, MAX_EMBED_TOTAL_LENGTH - rest))
+    return embed
+
+
+def split_content(content: str, limit: int = MAX_CONTENT_LENGTH) -> List[str]:
+    """Split ``content`` into chunks of at most ``limit`` characters, at line breaks where possible"""
+    if len(content) <= limit:
+        return [content] if content else []
+    chunks: List[str] = []
+    current: str = ""
+    for line in content.splitlines(keepends=True):
+        while len(line) > limit:  # a single line longer than a message
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            chunks.append(current)
+            current = ""
+        current += line
+    if current:
+        chunks.append(current)
+    return [chunk.rstrip("\n") for chunk in chunks if chunk.strip()]
+
+
+def pack_discord_payloads(
+    content: Optional[str] = None, embeds: Optional[List[Dict[str, Any]]] = None, **kwargs: Any
+) -> List[Dict[str, Any]]:
+    """Pack a text and its embeds into as few webhook messages as possible, keeping their order.
+
+    The text is split at ``MAX_CONTENT_LENGTH`` and the embeds are appended to the last text message, then to new
+    messages, as long as a message has at most ``MAX_EMBEDS`` embeds of ``MAX_EMBED_TOTAL_LENGTH`` characters.
+
+    Args:
+        content (Optional[str]): text of the message
+        embeds (Optional[List[Dict[str, Any]]]): ``Embed.to_dict()`` of the embeds
+        kwargs: added to every payload (e.g. ``username``, ``avatar_url``)
+
+    Returns:
+        List[Dict[str, Any]]: discord destination payloads
+    """
+    payloads: List[Dict[str, Any]] = [{"content": chunk, **kwargs} for chunk in split_content(content or "")]
+
+    current: Optional[Dict[str, Any]] = payloads[-1] if payloads else None
+    current_length: int = 0
+    for embed in map(fit_embed, embeds or []):
+        length: int = embed_length(embed)
+        if (
+            current is None
+            or len(current.setdefault("embeds", [])) >= MAX_EMBEDS
+            or current_length + length > MAX_EMBED_TOTAL_LENGTH
+        ):
+            current = {"embeds": [], **kwargs}
+            current_length = 0
+            payloads.append(current)
+        current["embeds"].append(embed)
+        current_length += length
+
+    if len(payloads) > 1:
+        logger.debug(f"discord message is split into {len(payloads)} payloads")
+    return payloads
+
+
+def attach_embed_images(
+    payloads: List[Dict[str, Any]], images: Dict[str, Tuple[Dict[str, Any], str]], max_bytes: int
+) -> List[Dict[str, Any]]:
+    """Add the uploads shown by the embeds (``attachment://<name>``) to the ``files`` of their payload. An image
+    which does not fit in the message (``MAX_FILES`` files of ``max_bytes`` bytes) is shown from its url again.
+
+    Args:
+        images (Dict[str, Tuple[Dict[str, Any], str]]): name of an upload: (``MediaFileModel.dict()``, url)
+    """
+    for payload in payloads:
+        for embed in payload.get("embeds") or []:
+            if (image := embed.get("image")) is None or (name := image["url"][len("attachment://") :]) not in images:
+                continue
+            media_file, url = images[name]
+            files: List[Dict[str, Any]] = payload.setdefault("files", [])
+            if len(files) < MAX_FILES and sum(file["size"] for file in files) + media_file["size"] <= max_bytes:
+                files.append(media_file)
+            else:
+                image["url"] = url
+        if not payload.get("files"):
+            payload.pop("files", None)
+    return payloads
+
+
+def pack_discord_files(
+    payloads: List[Dict[str, Any]], files: List[Dict[str, Any]], max_bytes: int, **kwargs: Any
+) -> List[Dict[str, Any]]:
+    """Append ``files`` (``MediaFileModel.dict()``) to the last payload, then to new ones, in order, as long as a
+    message has at most ``MAX_FILES`` files of ``max_bytes`` bytes in total. A file larger than ``max_bytes`` is
+    left out.
+
+    Args:
+        kwargs: added to the new payloads (e.g. ``username``, ``avatar_url``)
+    """
+    current: Optional[Dict[str, Any]] = payloads[-1] if payloads else None
+    for file in files:
+        if file["size"] > max_bytes:
+            logger.warning(f"file larger than a message: {file['filename']=}, {file['size']=}, {max_bytes=}")
+            continue
+        if (
+            current is None
+            or len(current.setdefault("files", [])) >= MAX_FILES
+            or sum(attached["size"] for attached in current["files"]) + file["size"] > max_bytes
+        ):
+            current = {"files": [], **kwargs}
+            payloads.append(current)
+        current["files"].append(file)
+    return payloads
+
+
+def drop_missing_files(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """``payload`` without the files which are not on the disk anymore (removed from the media cache after the payload
+    was built, e.g. a delivery the outbox retries later): an image of an embed is shown from its url again, another
+    file becomes a line of the content with its name and url."""
+    files: List[Dict[str, Any]] = payload.get("files") or []
+    if not (missing := [file for file in files if not os.path.exists(file["path"])]):
+        return payload
+    payload = copy.deepcopy(payload)
+    payload["files"] = [file for file in files if file not in missing]
+    lines: List[str] = []
+    for file in missing:
+        logger.warning(f"file removed from the media cache before its upload: {file['filename']=}")
+        images: List[Dict[str, Any]] = [
+            image
+            for embed in payload.get("embeds") or []
+            if (image := embed.get("image")) is not None and image.get("url") == f"attachment://{file['filename']}"
+        ]
+        for image in images:
+            image["url"] = file.get("url") or ""
+        if not images:
+            lines.append(f"{file['filename']} {file.get('url') or ''}".strip())
+    for embed in payload.get("embeds") or []:
+        if not (embed.get("image") or {}).get("url", True):
+            embed.pop("image")
+    if lines:
+        payload["content"] = truncate("\n".join([payload.get("content") or "", *lines]).strip("\n"), MAX_CONTENT_LENGTH)
+    if not payload["files"]:
+        payload.pop("files")
+    return payload
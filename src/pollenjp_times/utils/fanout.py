@@ -0,0 +1,308 @@
+# Standard Library
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from logging import NullHandler
+from logging import getLogger
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+# First Party Library
+from pollenjp_times.types import DeliveryResult
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+DeliveryTask = Tuple[str, Callable[[], Any]]  # (destination, function)
+AsyncDeliveryTask = Tuple[str, Callable[[], Awaitable[Any]]]  # (destination, coroutine function)
+
+
+class _Running:
+    """A delivery being run by a ``FanoutExecutor``: holds one of its slots while it sends, and the time it spent
+    sending, which its timeout is measured on"""
+
+    def __init__(self, slots: threading.Semaphore) -> None:
+        self.slots: threading.Semaphore = slots
+        self.started_at: float = time.monotonic()
+        self._spent: float = 0.0
+        self._since: Optional[float] = None  # None: waiting
+        self._lock: threading.Lock = threading.Lock()
+
+    def resume(self) -> None:
+        self.slots.acquire()
+        with self._lock:
+            self._since = time.monotonic()
+
+    def pause(self) -> None:
+        with self._lock:
+            if self._since is None:
+                return
+            self._spent += time.monotonic() - self._since
+            self._since = None
+        self.slots.release()
+
+    def elapsed(self, now: float) -> Optional[float]:
+        """Seconds spent sending. ``None``: waiting now (the clock is stopped)"""
+        with self._lock:
+            return None if self._since is None else self._spent + now - self._since
+
+
+class _AsyncRunning:
+    """``_Running`` of an ``AsyncFanoutExecutor`` (single event loop: no lock)"""
+
+    def __init__(self, slots: asyncio.Semaphore) -> None:
+        self.slots: asyncio.Semaphore = slots
+        self.started_at: float = time.monotonic()
+        self._spent: float = 0.0
+        self._since: Optional[float] = None
+
+    async def resume(self) -> None:
+        await self.slots.acquire()
+        self._since = time.monotonic()
+
+    def pause(self) -> None:
+        if self._since is None:
+            return
+        self._spent += time.monotonic() - self._since
+        self._since = None
+        self.slots.release()
+
+    def elapsed(self, now: float) -> Optional[float]:
+        return None if self._since is None else self._spent + now - self._since
+
+
+_running: contextvars.ContextVar[Optional[_Running]] = contextvars.ContextVar("fanout_running", default=None)
+_async_running: contextvars.ContextVar[Optional[_AsyncRunning]] = contextvars.ContextVar(
+    "fanout_async_running", default=None
+)
+
+
+@contextmanager
+def waiting() -> Iterator[None]:
+    """The delivery running in this context waits (e.g. for its rate limit): it gives its slot to the other
+    destinations meanwhile, and the wait does not count against its timeout. No-op outside a ``FanoutExecutor``."""
+    if (running := _running.get()) is None:
+        yield
+        return
+    running.pause()
+    try:
+        yield
+    finally:
+        running.resume()
+
+
+@asynccontextmanager
+async def waiting_async() -> AsyncIterator[None]:
+    """``waiting`` for the deliveries of an ``AsyncFanoutExecutor``"""
+    if (running := _async_running.get()) is None:
+        yield
+        return
+    running.pause()
+    try:
+        yield
+    finally:
+        await running.resume()
+
+
+class FanoutExecutor:
+    """Send to many destinations at once.
+
+    Each task is a ``(destination, function)`` pair and runs in a copy of the caller's context on the lane of its
+    destination (threads of that destination only). ``max_workers`` caps the number of in-flight sends: a task holds a
+    slot while it sends, and gives it back while it waits for its rate limit (``waiting``), so a throttled destination
+    only holds threads of its own lane and never holds back the others. ``timeout`` is measured per destination on
+    the time its task spent sending, so a slow destination is reported as timed out without holding back the results
+    of the others, and a wait for the rate limit is not a timeout.
+
+    The lanes of the destinations which are not used anymore (e.g. removed by a reload of the config) are shut down by
+    ``prune``.
+    """
+
+    poll_interval: float = 0.05
+
+    def __init__(self, max_workers: int = 8, timeout: Optional[float] = 10.0) -> None:
+        self.max_workers: int = max_workers
+        self.timeout: Optional[float] = timeout
+        self._slots: threading.Semaphore = threading.Semaphore(max_workers)
+        self._lanes: Dict[str, ThreadPoolExecutor] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._closed: bool = False
+
+    def _lane(self, destination: str) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("FanoutExecutor is shut down")
+            if (lane := self._lanes.get(destination)) is None:
+                # threads are started on demand: an idle destination keeps at most the threads it once needed
+                lane = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"fanout-{destination}")
+                self._lanes[destination] = lane
+            return lane
+
+    def _submit(self, destination: str, *args: Any) -> "Future[DeliveryResult]":
+        while True:
+            lane: ThreadPoolExecutor = self._lane(destination)
+            try:
+                # a context per task: the trace of the event follows the delivery into the lane
+                return lane.submit(contextvars.copy_context().run, self._call, *args)
+            except RuntimeError:
+                # pruned after it was looked up (a delivery of a callback which was just removed): use a new lane
+                with self._lock:
+                    if self._lanes.get(destination) is lane:
+                        del self._lanes[destination]
+
+    def prune(self, destinations: Iterable[str]) -> None:
+        """Shut down the lanes of the destinations other than ``destinations`` (their running sends complete)"""
+        keep: Set[str] = set(destinations)
+        with self._lock:
+            pruned: Dict[str, ThreadPoolExecutor] = {
+                destination: lane for destination, lane in self._lanes.items() if destination not in keep
+            }
+            for destination in pruned:
+                del self._lanes[destination]
+        for lane in pruned.values():
+            lane.shutdown(wait=False)
+        if pruned:
+            logger.info(f"fanout lanes removed: {sorted(pruned)}")
+
+    def run(self, tasks: Sequence[DeliveryTask]) -> List[DeliveryResult]:
+        running: Dict[int, _Running] = {}
+        future_to_idx: Dict["Future[DeliveryResult]", int] = {
+            self._submit(destination, idx, destination, func, running): idx
+            for idx, (destination, func) in enumerate(tasks)
+        }
+        results: List[Optional[DeliveryResult]] = [None] * len(tasks)
+
+        pending: Set["Future[DeliveryResult]"] = set(future_to_idx)
+        while pending:
+            wait_timeout: Optional[float] = None
+            if self.timeout is not None:
+                now: float = time.monotonic()
+                for future in list(pending):
+                    idx = future_to_idx[future]
+                    remaining: float
+                    elapsed: Optional[float] = None
+                    if (run := running.get(idx)) is None or (elapsed := run.elapsed(now)) is None:
+                        remaining = self.poll_interval  # queued in its lane, or waiting for its rate limit / a slot
+                    elif (remaining := self.timeout - elapsed) <= 0:
+                        pending.discard(future)
+                        future.cancel()
+                        destination: str = tasks[idx][0]
+                        logger.warning(f"delivery timed out: {destination=}, timeout={self.timeout}")
+                        results[idx] = DeliveryResult(
+                            destination=destination,
+                            ok=False,
+                            timed_out=True,
+                            elapsed=now - run.started_at,
+                            error=f"timed out after {self.timeout} seconds",
+                        )
+                        continue
+                    wait_timeout = remaining if wait_timeout is None else min(wait_timeout, remaining)
+                if not pending:
+                    break
+            done, pending = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[future_to_idx[future]] = future.result()
+
+        return [result for result in results if result is not None]
+
+    def _call(
+        self, idx: int, destination: str, func: Callable[[], Any], running: Dict[int, _Running]
+    ) -> DeliveryResult:
+        run = _Running(self._slots)
+        running[idx] = run
+        _running.set(run)
+        run.resume()
+        try:
+            response: Any = func()
+        except Exception as e:
+            logger.error(f"delivery failed: {destination=}", exc_info=True)
+            return DeliveryResult(
+                destination=destination, ok=False, elapsed=time.monotonic() - run.started_at, error=f"{e!r}"
+            )
+        finally:
+            run.pause()
+        return DeliveryResult(
+            destination=destination, ok=True, elapsed=time.monotonic() - run.started_at, response=response
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            self._closed = True
+            lanes: List[ThreadPoolExecutor] = list(self._lanes.values())
+            self._lanes = {}
+        for lane in lanes:
+            lane.shutdown(wait=wait)
+
+
+class AsyncFanoutExecutor:
+    """asyncio version of ``FanoutExecutor``: all destinations share the running event loop (a task holds a slot
+    while it sends, and its timeout is measured on that time, as for ``FanoutExecutor``)."""
+
+    poll_interval: float = 0.05
+
+    def __init__(self, max_workers: int = 8, timeout: Optional[float] = 10.0) -> None:
+        self.max_workers: int = max_workers
+        self.timeout: Optional[float] = timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def run(self, tasks: Sequence[AsyncDeliveryTask]) -> List[DeliveryResult]:
+        if self._semaphore is None:
+            # created lazily to bind it to the running loop
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return list(await asyncio.gather(*[self._call(destination, func) for destination, func in tasks]))
+
+    async def _run_func(self, run: _AsyncRunning, func: Callable[[], Awaitable[Any]]) -> Any:
+        _async_running.set(run)  # the task has its own copy of the context
+        await run.resume()
+        try:
+            return await func()
+        finally:
+            run.pause()
+
+    async def _call(self, destination: str, func: Callable[[], Awaitable[Any]]) -> DeliveryResult:
+        assert self._semaphore is not None
+        run = _AsyncRunning(self._semaphore)
+        task: "asyncio.Task[Any]" = asyncio.ensure_future(self._run_func(run, func))
+        try:
+            while not task.done():
+                remaining: Optional[float] = None
+                if self.timeout is not None:
+                    elapsed: Optional[float] = run.elapsed(time.monotonic())
+                    remaining = self.poll_interval if elapsed is None else self.timeout - elapsed
+                    if remaining <= 0:
+                        task.cancel()
+                        logger.warning(f"delivery timed out: {destination=}, timeout={self.timeout}")
+                        return DeliveryResult(
+                            destination=destination,
+                            ok=False,
+                            timed_out=True,
+                            elapsed=time.monotonic() - run.started_at,
+                            error=f"timed out after {self.timeout} seconds",
+                        )
+                await asyncio.wait({task}, timeout=remaining)
+            response: Any = task.result()
+        except Exception as e:
+            logger.error(f"delivery failed: {destination=}", exc_info=True)
+            return DeliveryResult(
+                destination=destination, ok=False, elapsed=time.monotonic() - run.started_at, error=f"{e!r}"
+            )
+        return DeliveryResult(
+            destination=destination, ok=True, elapsed=time.monotonic() - run.started_at, response=response
+        )
@@ -0,0 +1,173 @@
+# Standard Library
+import re
+from logging import NullHandler
+from logging import getLogger
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Pattern
+from typing import Set
+from urllib.parse import urlparse
+
+# First Party Library
+from pollenjp_times.types import FilterRulesModel
+from pollenjp_times.utils.slack import extract_slack_urls
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+_TrieNode = Dict[str, Any]
+
+
+def keywords_to_pattern(keywords: Iterable[str]) -> str:
+    """Alternation of ``keywords`` factored by common prefixes (``cat|car`` -> ``ca(?:r|t)``).
+
+    ``re`` tries the alternatives of an alternation one by one, so a flat list of N keywords costs N comparisons at
+    every position of the text. The factored form decides on one character at a time.
+    """
+    trie: _TrieNode = {}
+    for keyword in keywords:
+        if not keyword:
+            continue
+        node: _TrieNode = trie
+        for char in keyword.lower():
+            node = node.setdefault(char, {})
+        node[""] = {}  # end of a keyword
+
+    def build(node: _TrieNode) -> str:
+        alternatives: List[str] = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        body: str = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        if "" in node:  # a keyword may end here
+            return (body if len(alternatives) > 1 else f"(?:{body})") + "?"
+        return body
+
+    return build(trie)
+
+
+def _combine(keywords: List[str], patterns: List[str]) -> Optional[str]:
+    alternatives: List[str] = [f"(?:{pattern})" for pattern in patterns]
+    if keywords_pattern := keywords_to_pattern(keywords):
+        alternatives.append(keywords_pattern)
+    return "|".join(alternatives) if alternatives else None
+
+
+def _normalize_author(author: str) -> str:
+    return author.strip().lstrip("@").lower()
+
+
+def _domain_matches(host: str, domains: Set[str]) -> bool:
+    return any(host == domain or host.endswith(f".{domain}") for domain in domains)
+
+
+def message_authors(message: Dict[str, Any], attachments: List[Dict[str, Any]]) -> Set[str]:
+    authors: Set[str] = set()
+    for key in ("user", "bot_id", "username"):
+        if isinstance(val := message.get(key), str):
+            authors.add(_normalize_author(val))
+    for attachment in attachments:
+        for key in ("author_name", "author_subname"):
+            if isinstance(val := attachment.get(key), str):
+                authors.add(_normalize_author(val))
+        if isinstance(author_link := attachment.get("author_link"), str):
+            # e.g. https://twitter.com/<screen name>
+            authors.add(_normalize_author(urlparse(author_link).path.rstrip("/").rsplit("/", 1)[-1]))
+    authors.discard("")
+    return authors
+
+
+def message_domains(message: Dict[str, Any], attachments: List[Dict[str, Any]]) -> Set[str]:
+    urls: List[str] = []
+    for text in [message.get("text")] + [
+        attachment.get(key) for attachment in attachments for key in ("text", "pretext")
+    ]:
+        if isinstance(text, str):
+            urls += extract_slack_urls(text)
+    for attachment in attachments:
+        urls += [
+            url for key in ("from_url", "original_url", "title_link") if isinstance(url := attachment.get(key), str)
+        ]
+    return {host.lower() for url in urls if (host := urlparse(url).hostname)}
+
+
+class MessageFilter:
+    """Rules of a ``FilterRulesModel`` compiled for matching.
+
+    Every keyword and pattern (include and exclude) is compiled into one regular expression, so the text of a message
+    is scanned once however many rules there are.
+    """
+
+    def __init__(self, rules: FilterRulesModel) -> None:
+        self.rules: FilterRulesModel = rules
+        include: Optional[str] = _combine(rules.include_keywords, rules.include_patterns)
+        exclude: Optional[str] = _combine(rules.exclude_keywords, rules.exclude_patterns)
+        self._has_text_include: bool = include is not None
+        # keywords are lower-cased, so without user patterns the text is lower-cased once instead of matching with
+        # ``re.IGNORECASE``, which is several times slower
+        self._lower: bool = not (rules.include_patterns or rules.exclude_patterns)
+        flags: int = 0 if self._lower else re.IGNORECASE
+        # the exclude alternative comes first, so a match is an exclude match iff ``_exclude_pattern`` matches at
+        # its start (named groups around the alternatives would disable the literal prefix scan of ``re``)
+        self._exclude_pattern: Optional[Pattern[str]] = (
+            re.compile(exclude, flags=flags) if exclude is not None else None
+        )
+        alternatives: List[str] = [f"(?:{pattern})" for pattern in (exclude, include) if pattern is not None]
+        self._text_pattern: Optional[Pattern[str]] = (
+            re.compile("|".join(alternatives), flags=flags) if alternatives else None
+        )
+        self._authors: Set[str] = {_normalize_author(author) for author in rules.authors}
+        self._exclude_authors: Set[str] = {_normalize_author(author) for author in rules.exclude_authors}
+        self._domains: Set[str] = {domain.lower() for domain in rules.domains}
+        self._exclude_domains: Set[str] = {domain.lower() for domain in rules.exclude_domains}
+
+    @classmethod
+    def from_keyword(cls, filter_keyword: Optional[str]) -> "MessageFilter":
+        """Filter of the single ``filter_keyword`` regular expression (searched anywhere in the text)"""
+        return cls(FilterRulesModel(include_patterns=[filter_keyword] if filter_keyword is not None else []))
+
+    @property
+    def is_empty(self) -> bool:
+        return self._text_pattern is None and not (
+            self._authors or self._exclude_authors or self._domains or self._exclude_domains
+        )
+
+    def match(self, content: str, message: Dict[str, Any], attachments: List[Dict[str, Any]]) -> bool:
+        """Whether the message passes
+
+        Args:
+            content (str): text of the message and its attachments
+            message (Dict[str, Any]): the message event (for the author and domain rules)
+            attachments (List[Dict[str, Any]]): attachments of the message
+        """
+        if self._authors or self._exclude_authors:
+            authors: Set[str] = message_authors(message, attachments)
+            if authors & self._exclude_authors:
+                return False
+            if self._authors and not authors & self._authors:
+                return False
+
+        if self._domains or self._exclude_domains:
+            hosts: Set[str] = message_domains(message, attachments)
+            if any(_domain_matches(host, self._exclude_domains) for host in hosts):
+                return False
+            if self._domains and not any(_domain_matches(host, self._domains) for host in hosts):
+                return False
+
+        if self._text_pattern is None:
+            return True
+        if self._lower:
+            content = content.lower()
+        included: bool = not self._has_text_include
+        pos: int = 0
+        while (match := self._text_pattern.search(content, pos)) is not None:
+            if self._exclude_pattern is None:
+                return True
+            if self._exclude_pattern.match(content, match.start()) is not None:
+                return False
+            included = True
+            # an exclude rule may start inside the included text
+            pos = match.start() + 1
+        return included
@@ -0,0 +1,150 @@
+# Standard Library
+import threading
+from logging import NullHandler
+from logging import getLogger
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+# Third Party Library
+import aiohttp
+import discord
+import requests
+from requests.adapters import HTTPAdapter
+from slack_bolt import App
+from slack_bolt.async_app import AsyncApp
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.web.async_slack_response import AsyncSlackResponse
+from slack_sdk.web.client import WebClient
+from slack_sdk.web.slack_response import SlackResponse
+
+# First Party Library
+from pollenjp_times.utils.metrics import slack_api_calls_total
+from pollenjp_times.utils.metrics import slack_api_errors_total
+from pollenjp_times.utils.tracing import tracer
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class MeteredWebClient(WebClient):
+    """``WebClient`` which counts its calls by API method and traces them"""
+
+    def api_call(self, api_method: str, **kwargs: Any) -> SlackResponse:
+        slack_api_calls_total.inc(method=api_method)
+        try:
+            with tracer.span(f"slack.{api_method}"):
+                return super().api_call(api_method, **kwargs)
+        except SlackApiError:
+            slack_api_errors_total.inc(method=api_method)
+            raise
+
+
+class AsyncMeteredWebClient(AsyncWebClient):
+    """asyncio version of ``MeteredWebClient``"""
+
+    async def api_call(self, api_method: str, **kwargs: Any) -> AsyncSlackResponse:
+        slack_api_calls_total.inc(method=api_method)
+        try:
+            with tracer.span(f"slack.{api_method}"):
+                return await super().api_call(api_method, **kwargs)
+        except SlackApiError:
+            slack_api_errors_total.inc(method=api_method)
+            raise
+
+
+class ConnectionPool:
+    """Process wide HTTP clients.
+
+    * one ``requests.Session`` (keep-alive connection pool per host) for Slack incoming webhooks, ``response_url`` and
+      Discord webhooks
+    * one ``App`` / ``SyncWebhook`` per unique token / webhook url
+
+    Args:
+        pool_connections (int): number of hosts to keep connection pools for
+        pool_maxsize (int): max number of kept-alive connections per host
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10) -> None:
+        self.pool_connections: int = pool_connections
+        self.pool_maxsize: int = pool_maxsize
+        self._session: Optional[requests.Session] = None
+        self._apps: Dict[str, App] = {}
+        self._discord_webhooks: Dict[str, discord.webhook.sync.SyncWebhook] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def configure(self, pool_connections: int, pool_maxsize: int) -> None:
+        """Change the pool sizes. Call it before any client is created."""
+        with self._lock:
+            if self._session is not None:
+                raise RuntimeError("The connection pool is already in use")
+            self.pool_connections = pool_connections
+            self.pool_maxsize = pool_maxsize
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def get_app(self, token: str) -> App:
+        """``App`` for ``token``. Apps are shared, so do not register listeners on an app from here."""
+        with self._lock:
+            if (app := self._apps.get(token)) is None:
+                # the token is verified by ``slack.auth_test_all`` (every token at once) instead of here
+                app = App(client=MeteredWebClient(token=token), token_verification_enabled=False)
+                self._apps[token] = app
+            return app
+
+    def get_discord_webhook(self, webhook_url: str) -> discord.webhook.sync.SyncWebhook:
+        session: requests.Session = self.session
+        with self._lock:
+            if (webhook := self._discord_webhooks.get(webhook_url)) is None:
+                webhook = discord.webhook.sync.SyncWebhook.from_url(webhook_url, session=session)
+                self._discord_webhooks[webhook_url] = webhook
+            return webhook
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class AsyncConnectionPool:
+    """asyncio version of ``ConnectionPool``: every client shares one ``aiohttp.ClientSession``.
+
+    Create it inside a running event loop and ``await close()`` it on shutdown.
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10) -> None:
+        self.session: aiohttp.ClientSession = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_connections * pool_maxsize, limit_per_host=pool_maxsize)
+        )
+        self._apps: Dict[str, AsyncApp] = {}
+        self._discord_webhooks: Dict[str, discord.Webhook] = {}
+
+    def get_app(self, token: str) -> AsyncApp:
+        if (app := self._apps.get(token)) is None:
+            app = AsyncApp(client=AsyncMeteredWebClient(token=token, session=self.session))
+            self._apps[token] = app
+        return app
+
+    def get_discord_webhook(self, webhook_url: str) -> discord.Webhook:
+        if (webhook := self._discord_webhooks.get(webhook_url)) is None:
+            webhook = discord.Webhook.from_url(webhook_url, session=self.session)
+            self._discord_webhooks[webhook_url] = webhook
+        return webhook
+
+    async def close(self) -> None:
+        await self.session.close()
+
+
+# shared by every sender of the sync runtime
+connection_pool: ConnectionPool = ConnectionPool()
@@ -0,0 +1,183 @@
+"""Logging of the event payloads off the listener threads
+
+- ``summarize`` : one lazily formatted line per event / action (INFO)
+- ``log_payload`` : the full payloads (DEBUG) of a sample of the events, truncated to ``payload_settings.max_chars``
+- ``enable_queue_logging`` : the handlers of the configured loggers are moved to a background thread, so formatting
+  the records and writing them to the disk never blocks the socket mode listeners
+
+The payloads are formatted when the record is emitted (in the background thread with the queue): a record which is
+filtered out by its level costs nothing, and a payload mutated after it was logged is written as it is then.
+"""
+# Standard Library
+import atexit
+import logging
+import queue
+import random
+import threading
+from logging import Handler
+from logging import Logger
+from logging import LogRecord
+from logging import NullHandler
+from logging import getLogger
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class PayloadSettings:
+    def __init__(self, max_chars: int = 2000, sample_rate: float = 1.0) -> None:
+        self.max_chars: int = max_chars  # 0: no limit
+        self.sample_rate: float = sample_rate  # ratio of the events whose payloads are logged
+
+    def configure(self, max_chars: int, sample_rate: float) -> None:
+        self.max_chars = max_chars
+        self.sample_rate = sample_rate
+
+
+payload_settings: PayloadSettings = PayloadSettings()
+
+
+class LazyPayload:
+    """``repr(obj)`` truncated to ``payload_settings.max_chars``, computed when the record is formatted (once: e.g.
+    ``RotatingFileHandler`` formats a record twice)"""
+
+    __slots__ = ("obj", "_text")
+
+    def __init__(self, obj: Any) -> None:
+        self.obj: Any = obj
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            text: str = repr(self.obj)
+            if 0 < (max_chars := payload_settings.max_chars) < len(text):
+                text = f"{text[:max_chars]}...({len(text) - max_chars} more chars)"
+            self._text = text
+        return self._text
+
+    __repr__ = __str__
+
+
+def log_payload(log: Logger, **payloads: Any) -> None:
+    """``name=payload`` records at DEBUG, for a ``payload_settings.sample_rate`` share of the calls"""
+    if not log.isEnabledFor(logging.DEBUG):
+        return
+    if payload_settings.sample_rate < 1.0 and random.random() >= payload_settings.sample_rate:
+        return
+    for name, obj in payloads.items():
+        log.debug("%s=%s", name, LazyPayload(obj), stacklevel=2)
+
+
+class EventSummary:
+    """One line describing an event or an action body, e.g.
+    ``message channel=C0123 user=U0123 ts=1700000000.000100 subtype=None thread_ts=None text=42chars``
+    """
+
+    __slots__ = ("kind", "payload")
+
+    def __init__(self, kind: str, payload: Mapping[str, Any]) -> None:
+        self.kind: str = kind
+        self.payload: Mapping[str, Any] = payload
+
+    def __str__(self) -> str:
+        payload: Mapping[str, Any] = self.payload
+        fields: Dict[str, Any]
+        if payload.get("type") == "block_actions":
+            fields = {
+                "channel": (payload.get("channel") or {}).get("id"),
+                "user": (payload.get("user") or {}).get("id"),
+                "actions": [action.get("action_id") for action in payload.get("actions") or []],
+            }
+        else:
+            channel: Any = payload.get("channel")
+            user: Any = payload.get("user")
+            fields = {
+                "channel": channel.get("id") if isinstance(channel, dict) else channel,
+                "user": user.get("id") if isinstance(user, dict) else user,
+                "ts": payload.get("ts") or payload.get("event_ts"),
+                "subtype": payload.get("subtype"),
+                "thread_ts": payload.get("thread_ts"),
+                "text": f"{len(payload.get('text') or '')}chars",
+            }
+        return " ".join([self.kind] + [f"{key}={val}" for key, val in fields.items()])
+
+    __repr__ = __str__
+
+
+def summarize(kind: str, payload: Mapping[str, Any]) -> EventSummary:
+    return EventSummary(kind, payload)
+
+
+class LazyQueueHandler(QueueHandler):
+    """``QueueHandler`` which leaves the formatting to the listener thread and drops the records when the queue is
+    full instead of blocking the caller"""
+
+    def __init__(self, queue_: "queue.Queue[Any]") -> None:
+        super().__init__(queue_)
+        self.dropped: int = 0
+        self._lock_dropped: threading.Lock = threading.Lock()
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        if record.exc_info and not record.exc_text:
+            # the traceback refers to the frames of the caller: render it now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock_dropped:
+                self.dropped += 1
+
+
+class _QueueListener(QueueListener):
+    def stop(self) -> None:
+        # registered at exit: may already be stopped
+        if self._thread is not None:
+            super().stop()
+
+
+def enable_queue_logging(maxsize: int = 10000) -> List[QueueListener]:
+    """Put a queue in front of the handlers of every logger which has some (except ``NullHandler``)
+
+    The loggers sharing the same handlers share one queue and one listener thread. The listeners are stopped (and the
+    queues flushed) at exit.
+
+    Args:
+        maxsize (int): records a queue can hold. Records beyond are dropped (``LazyQueueHandler.dropped``).
+    """
+    loggers: List[Logger] = [logging.getLogger()] + [
+        log for log in list(logging.Logger.manager.loggerDict.values()) if isinstance(log, Logger)
+    ]
+    groups: Dict[Tuple[Handler, ...], List[Logger]] = {}
+    for log in loggers:
+        handlers: Tuple[Handler, ...] = tuple(
+            handler for handler in log.handlers if not isinstance(handler, (NullHandler, QueueHandler))
+        )
+        if handlers:
+            groups.setdefault(handlers, []).append(log)
+
+    listeners: List[QueueListener] = []
+    for handlers, group in groups.items():
+        queue_: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        queue_handler = LazyQueueHandler(queue_)
+        for log in group:
+            for handler in handlers:
+                log.removeHandler(handler)
+            log.addHandler(queue_handler)
+        listener = _QueueListener(queue_, *handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        listeners.append(listener)
+        logger.info(f"queue logging: loggers={[log.name for log in group]}, {handlers=}")
+    return listeners
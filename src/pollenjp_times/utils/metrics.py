@@ -0,0 +1,259 @@
+"""Prometheus metrics of the bot, exposed in the text exposition format by ``MetricsServer``
+
+<https://prometheus.io/docs/instrumenting/exposition_formats/>
+
+Recording is a no-op until ``metrics.enabled`` is set, so the instrumented code paths cost nothing when the
+endpoint is not configured.
+"""
+# Standard Library
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from logging import NullHandler
+from logging import getLogger
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[LabelValues, float]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    type_name: str = "untyped"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.registry: MetricsRegistry = registry
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._lock: threading.Lock = threading.Lock()
+        registry.register(self)
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(f"{labels[name]}" for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], LabelValues, float]]:
+        """(name suffix, label names, label values, value)"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines: List[str] = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines += [
+            f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}"
+            for suffix, names, values, value in self.samples()
+        ]
+        return lines
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(registry, name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key: LabelValues = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], LabelValues, float]]:
+        with self._lock:
+            return [("", self.labelnames, key, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # label values -> (count per bucket (not cumulative, the last one is +Inf), sum)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key: LabelValues = self._label_values(labels)
+        with self._lock:
+            if (item := self._values.get(key)) is None:
+                item = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            item[0][bisect.bisect_left(self.buckets, value)] += 1
+            item[1][0] += value
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], LabelValues, float]]:
+        names: Tuple[str, ...] = self.labelnames + ("le",)
+        samples: List[Tuple[str, Sequence[str], LabelValues, float]] = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative: int = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    samples.append(("_bucket", names, key + (_format_value(bound),), cumulative))
+                samples.append(("_sum", self.labelnames, key, total[0]))
+                samples.append(("_count", self.labelnames, key, cumulative))
+        return samples
+
+
+class FunctionMetric(Metric):
+    """Metric whose samples are read from elsewhere (e.g. cache statistics) when the endpoint is scraped"""
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        documentation: str,
+        type_name: str,
+        labelnames: Sequence[str],
+        function: Callable[[], Iterable[Sample]],
+    ):
+        super().__init__(registry, name, documentation, labelnames)
+        self.type_name = type_name
+        self.function: Callable[[], Iterable[Sample]] = function
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], LabelValues, float]]:
+        return [("", self.labelnames, key, value) for key, value in self.function()]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self._metrics: Dict[str, Metric] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def register(self, metric: Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicated metric: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics: List[Metric] = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                lines += metric.render()
+            except Exception:
+                logger.warning(f"Failed to collect {metric.name}", exc_info=True)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """``GET /metrics`` of ``registry`` on ``host:port``"""
+
+    daemon_threads = True
+
+    def __init__(self, registry: "MetricsRegistry", host: str = "127.0.0.1", port: int = 9464) -> None:
+        super().__init__((host, port), _MetricsRequestHandler)
+        self.registry: MetricsRegistry = registry
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    server: MetricsServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body: bytes = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", f"{len(body)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+metrics: MetricsRegistry = MetricsRegistry()
+
+events_total: Counter = Counter(
+    metrics, "pollenjp_times_events_total", "Slack events and actions received", ("type", "channel")
+)
+dispatch_seconds: Histogram = Histogram(
+    metrics, "pollenjp_times_dispatch_seconds", "Time a callback spends in a hook", ("callback", "channel", "hook")
+)
+send_seconds: Histogram = Histogram(
+    metrics, "pollenjp_times_send_seconds", "Latency of a send to a destination", ("destination", "kind")
+)
+send_errors_total: Counter = Counter(
+    metrics, "pollenjp_times_send_errors_total", "Sends which failed (after the retries)", ("destination", "kind")
+)
+send_rate_limited_total: Counter = Counter(
+    metrics, "pollenjp_times_send_rate_limited_total", "Sends answered with 429", ("destination", "kind")
+)
+slack_api_calls_total: Counter = Counter(
+    metrics, "pollenjp_times_slack_api_calls_total", "Slack Web API calls", ("method",)
+)
+slack_api_errors_total: Counter = Counter(
+    metrics, "pollenjp_times_slack_api_errors_total", "Slack Web API calls which failed", ("method",)
+)
+jobs_shed_total: Counter = Counter(
+    metrics, "pollenjp_times_jobs_shed_total", "Jobs dropped because the job queue was full", ("job",)
+)
+jobs_spilled_total: Counter = Counter(
+    metrics,
+    "pollenjp_times_jobs_spilled_total",
+    "Jobs written to the spill file because the job queue was full",
+    ("job",),
+)
+duplicates_total: Counter = Counter(
+    metrics, "pollenjp_times_duplicates_total", "Events and actions dropped as already handled", ("type",)
+)
+media_fetches_total: Counter = Counter(
+    metrics,
+    "pollenjp_times_media_fetches_total",
+    "Files asked to the media cache, by result (hit, download, too_large, error)",
+    ("result",),
+)
@@ -0,0 +1,85 @@
+# Standard Library
+import secrets
+from pathlib import Path
+from typing import BinaryIO
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Union
+
+
+class Part(NamedTuple):
+    name: str
+    content: Union[bytes, Path]  # a path is read when the body is sent
+    content_type: str = "application/octet-stream"
+    filename: Optional[str] = None
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", " ").replace("\n", " ")
+
+
+class MultipartStream:
+    """``multipart/form-data`` body which reads its files chunk by chunk while it is sent
+
+    Passed as ``data`` to requests, it is streamed with a ``Content-Length`` (``__len__``), so an upload never holds a
+    whole file in memory (``files=`` builds the body in memory). A stream is read once: build a new one to retry.
+    """
+
+    def __init__(self, parts: List[Part], chunk_size: int = 64 * 1024) -> None:
+        self.boundary: str = secrets.token_hex(16)
+        self.chunk_size: int = chunk_size
+        self._segments: List[Union[bytes, Path]] = []
+        for part in parts:
+            disposition: str = f'form-data; name="{_quote(part.name)}"'
+            if part.filename is not None:
+                disposition += f'; filename="{_quote(part.filename)}"'
+            self._segments.append(
+                (
+                    f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+                    f"Content-Type: {part.content_type}\r\n\r\n"
+                ).encode("utf-8")
+            )
+            self._segments.append(part.content)
+            self._segments.append(b"\r\n")
+        self._segments.append(f"--{self.boundary}--\r\n".encode("utf-8"))
+        self._length: int = sum(
+            segment.stat().st_size if isinstance(segment, Path) else len(segment) for segment in self._segments
+        )
+        self._chunks: Iterator[bytes] = self._iter_chunks()
+        self._buffer: bytes = b""
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        for segment in self._segments:
+            if isinstance(segment, bytes):
+                yield segment
+                continue
+            f: BinaryIO
+            with open(segment, mode="rb") as f:
+                while chunk := f.read(self.chunk_size):
+                    yield chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._buffer:
+            yield self._buffer
+            self._buffer = b""
+        yield from self._chunks
+
+    def read(self, size: int = -1) -> bytes:
+        """http.client / urllib3 read the body in blocks"""
+        if size is None or size < 0:
+            data: bytes = self._buffer + b"".join(self._chunks)
+            self._buffer = b""
+            return data
+        while len(self._buffer) < size and (chunk := next(self._chunks, None)) is not None:
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
@@ -0,0 +1,202 @@
+# Standard Library
+import asyncio
+import threading
+import time
+from logging import NullHandler
+from logging import getLogger
+from typing import Any
+from typing import Dict
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+
+# Third Party Library
+import discord
+import requests
+from slack_sdk.errors import SlackApiError
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# destination kind -> (requests per second, burst)
+#   slack:         chat.postMessage allows about 1 message per second per channel
+#   slack_webhook: incoming webhooks allow about 1 message per second
+#   discord:       webhooks allow 5 requests per 2 seconds
+DEFAULT_LIMITS: Dict[str, Tuple[float, int]] = {
+    "slack": (1.0, 3),
+    "slack_webhook": (1.0, 3),
+    "discord": (2.5, 5),
+}
+
+
+class RateLimitedError(Exception):
+    """The destination answered 429 Too Many Requests"""
+
+    def __init__(self, retry_after: float, message: str = "") -> None:
+        super().__init__(message or f"rate limited, retry after {retry_after} seconds")
+        self.retry_after: float = retry_after
+
+
+def parse_retry_after(headers: Optional[Mapping[str, Any]], default: float = 1.0) -> float:
+    if headers is None:
+        return default
+    for key, val in headers.items():
+        if key.lower() == "retry-after":
+            try:
+                return float(val[0] if isinstance(val, list) else val)
+            except (TypeError, ValueError):
+                return default
+    return default
+
+
+def get_retry_after(e: BaseException) -> Optional[float]:
+    """Seconds to wait if ``e`` is a 429 response of Slack or Discord, otherwise ``None``"""
+    if isinstance(e, RateLimitedError):
+        return e.retry_after
+    if isinstance(e, SlackApiError) and e.response.status_code == 429:
+        return parse_retry_after(e.response.headers)
+    if isinstance(e, discord.HTTPException) and e.status == 429:
+        return parse_retry_after(getattr(e.response, "headers", None))
+    if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code == 429:
+        return parse_retry_after(e.response.headers)
+    return None
+
+
+class TokenBucket:
+    """Token bucket which hands out send times.
+
+    ``reserve()`` takes a token even if the bucket is empty (the balance goes negative) and returns how long the caller
+    has to wait, so concurrent senders are spaced by ``1 / rate`` seconds in arrival order.
+
+    Args:
+        rate (float): tokens added per second
+        capacity (int): max number of tokens (burst size)
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate: float = rate
+        self.capacity: int = capacity
+        self._tokens: float = float(capacity)
+        self._updated_at: float = time.monotonic()
+        self.backlog: int = 0  # senders waiting for their turn
+        self._lock: threading.Lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(float(self.capacity), self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1.0
+            return max(0.0, -self._tokens / self.rate)
+
+    def penalize(self, retry_after: float) -> None:
+        """Stop handing out tokens for ``retry_after`` seconds (after the senders already waiting)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - retry_after * self.rate
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def _enter(self) -> float:
+        delay: float = self.reserve()
+        if delay > 0:
+            with self._lock:
+                self.backlog += 1
+        return delay
+
+    def _leave(self, delay: float) -> None:
+        if delay > 0:
+            with self._lock:
+                self.backlog -= 1
+
+    def acquire(self) -> float:
+        """Block until the caller may send. Returns the waited seconds."""
+        delay: float = self._enter()
+        try:
+            if delay > 0:
+                time.sleep(delay)
+        finally:
+            self._leave(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        delay: float = self._enter()
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+        finally:
+            self._leave(delay)
+        return delay
+
+
+class RateLimiter:
+    """One ``TokenBucket`` per destination key, with the rate and burst of the destination kind.
+
+    Args:
+        limits (Optional[Dict[str, Tuple[float, int]]]): destination kind -> (requests per second, burst).
+            Kinds which are not listed are not limited.
+        max_retries (int): how many times a send answered with 429 is retried after ``Retry-After``
+        enabled (bool): ``False`` disables pacing (429 responses are still retried)
+    """
+
+    def __init__(
+        self, limits: Optional[Dict[str, Tuple[float, int]]] = None, max_retries: int = 3, enabled: bool = True
+    ) -> None:
+        self.limits: Dict[str, Tuple[float, int]] = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.max_retries: int = max_retries
+        self.enabled: bool = enabled
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def configure(self, limits: Dict[str, Tuple[float, int]], max_retries: int, enabled: bool = True) -> None:
+        with self._lock:
+            self.limits = dict(limits)
+            self.max_retries = max_retries
+            self.enabled = enabled
+            self._buckets.clear()
+
+    def bucket(self, key: str, kind: str) -> Optional[TokenBucket]:
+        if not self.enabled or (limit := self.limits.get(kind)) is None:
+            return None
+        with self._lock:
+            if (bucket := self._buckets.get(key)) is None:
+                bucket = TokenBucket(rate=limit[0], capacity=limit[1])
+                self._buckets[key] = bucket
+            return bucket
+
+    def acquire(self, key: str, kind: str) -> float:
+        if (bucket := self.bucket(key, kind)) is None:
+            return 0.0
+        if (waited := bucket.acquire()) > 0:
+            logger.debug(f"rate limited: {key=}, {waited=:.3f}")
+        return waited
+
+    async def acquire_async(self, key: str, kind: str) -> float:
+        if (bucket := self.bucket(key, kind)) is None:
+            return 0.0
+        if (waited := await bucket.acquire_async()) > 0:
+            logger.debug(f"rate limited: {key=}, {waited=:.3f}")
+        return waited
+
+    def penalize(self, key: str, kind: str, retry_after: float) -> float:
+        """Delay the next sends after a 429. Returns how long the caller has to wait before retrying."""
+        if (bucket := self.bucket(key, kind)) is None:
+            return retry_after
+        bucket.penalize(retry_after)
+        return 0.0  # the retry waits in ``acquire``
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Budget (available tokens, negative while senders queue) and backlog per destination"""
+        with self._lock:
+            buckets: Dict[str, TokenBucket] = dict(self._buckets)
+        return {key: {"tokens": bucket.tokens, "backlog": bucket.backlog} for key, bucket in buckets.items()}
+
+
+# shared by every destination, so callbacks which post to the same place share its budget
+rate_limiter: RateLimiter = RateLimiter()
@@ -1,27 +1,89 @@
 # Standard Library
 import datetime
 import re
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from logging import NullHandler
 from logging import getLogger
 from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import NamedTuple
 from typing import Optional
+from typing import Pattern
 from typing import Set
+from typing import Tuple
 from typing import Union
+from typing import cast
 
 # Third Party Library
 from slack_bolt import App
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.client import WebClient
 from slack_sdk.web.slack_response import SlackResponse
 
 # First Party Library
 from pollenjp_times.types import ChannelModel
 from pollenjp_times.types import ConversationsModel
+from pollenjp_times.types import JoinReportModel
 from pollenjp_times.types import UserModel
+from pollenjp_times.utils.cache import TTLCache
+from pollenjp_times.utils.metrics import FunctionMetric
+from pollenjp_times.utils.metrics import metrics
+from pollenjp_times.utils.ratelimit import TokenBucket
+from pollenjp_times.utils.ratelimit import get_retry_after
 
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
+# users.info / bots.info results keyed by user id / bot id
+user_cache: TTLCache[str, UserModel] = TTLCache(maxsize=1024, ttl=3600.0)
+# conversations.info results keyed by channel id
+channel_cache: TTLCache[str, ChannelModel] = TTLCache(maxsize=4096, ttl=3600.0)
+# message snapshots keyed by (channel id, ts), filled from message events
+message_cache: TTLCache[Tuple[str, str], Dict[str, Any]] = TTLCache(maxsize=1024, ttl=86400.0)
+# auth.test results keyed by token (a token does not change its bot user)
+auth_test_results: Dict[str, Dict[str, Any]] = {}
+_auth_test_lock: threading.Lock = threading.Lock()
+
+_caches: Dict[str, TTLCache[Any, Any]] = {"user": user_cache, "channel": channel_cache, "message": message_cache}
+FunctionMetric(
+    metrics,
+    "pollenjp_times_cache_hits_total",
+    "Cache hits",
+    "counter",
+    ("cache",),
+    lambda: [((name,), float(cache.hits)) for name, cache in _caches.items()],
+)
+FunctionMetric(
+    metrics,
+    "pollenjp_times_cache_misses_total",
+    "Cache misses",
+    "counter",
+    ("cache",),
+    lambda: [((name,), float(cache.misses)) for name, cache in _caches.items()],
+)
+FunctionMetric(
+    metrics,
+    "pollenjp_times_cache_hit_ratio",
+    "Cache hits / lookups",
+    "gauge",
+    ("cache",),
+    lambda: [((name,), cache.hit_ratio) for name, cache in _caches.items()],
+)
+FunctionMetric(
+    metrics,
+    "pollenjp_times_cache_entries",
+    "Cached entries",
+    "gauge",
+    ("cache",),
+    lambda: [((name,), float(len(cache))) for name, cache in _caches.items()],
+)
+
 
 def encode_dict2text(d: Dict[Any, Any], values_separator: str = "/", key_val_separator: str = ":") -> str:
     return f"{values_separator}".join([f"{key}{key_val_separator}{val}" for key, val in d.items()])
@@ -33,10 +95,169 @@ def decode_text2dict(text: str, values_separator: str = "/", key_val_separator:
     return {key: val for (key, val) in key_val_list}
 
 
+class MrkdwnToken(NamedTuple):
+    """A piece of slack message text
+
+    kind:
+        - ``text``: plain text (html entities are already decoded)
+        - ``user``: ``<@U123|name>``, value is the user id
+        - ``channel``: ``<#C123|name>``, value is the channel id
+        - ``special``: ``<!here>``, ``<!subteam^S123|@team>``, value is the command
+        - ``link``: ``<https://example.com|label>``, value is the url
+        - ``code_fence``: ````` `` `````
+    """
+
+    kind: str
+    value: str
+    label: Optional[str] = None
+
+
+_MRKDWN_PATTERN: Pattern[str] = re.compile(r"<([^<>]*)>|&(amp|lt|gt);|```")
+_MRKDWN_LINK_PATTERN: Pattern[str] = re.compile(r"<([^<>@#!|][^<>|]*)(?:\|[^<>]*)?>")
+_HTML_ENTITIES: Dict[str, str] = {"amp": "&", "lt": "<", "gt": ">"}
+_CODE_FENCE_TOKEN: MrkdwnToken = MrkdwnToken("code_fence", "```")
+
+
+def _to_token(match: "re.Match[str]") -> MrkdwnToken:
+    if (entity := match.group(2)) is not None:
+        return MrkdwnToken("text", _HTML_ENTITIES[entity])
+    if (inner := match.group(1)) is None:
+        return _CODE_FENCE_TOKEN
+    value, _, label = inner.partition("|")
+    if value.startswith("@"):
+        return MrkdwnToken("user", value[1:], label or None)
+    if value.startswith("#"):
+        return MrkdwnToken("channel", value[1:], label or None)
+    if value.startswith("!"):
+        return MrkdwnToken("special", value[1:], label or None)
+    return MrkdwnToken("link", value, label or None)
+
+
+def tokenize_mrkdwn(text: str) -> List[MrkdwnToken]:
+    """Split slack message text into tokens in a single linear pass
+
+    <https://api.slack.com/reference/surfaces/formatting#escaping>
+
+    example:
+        Input: "a &amp; <@U1> <https://example.com|ex>"
+        Output: [
+            MrkdwnToken("text", "a & "),
+            MrkdwnToken("user", "U1"),
+            MrkdwnToken("text", " "),
+            MrkdwnToken("link", "https://example.com", "ex"),
+        ]
+    """
+    tokens: List[MrkdwnToken] = []
+    buffer: List[str] = []  # adjacent text and entities are joined into one text token
+    pos: int = 0
+    for match in _MRKDWN_PATTERN.finditer(text):
+        buffer.append(text[pos : match.start()])
+        pos = match.end()
+        token: MrkdwnToken = _to_token(match)
+        if token.kind == "text":
+            buffer.append(token.value)
+            continue
+        if joined := "".join(buffer):
+            tokens.append(MrkdwnToken("text", joined))
+        buffer = []
+        tokens.append(token)
+    buffer.append(text[pos:])
+    if joined := "".join(buffer):
+        tokens.append(MrkdwnToken("text", joined))
+    return tokens
+
+
+def render_token_discord(token: MrkdwnToken) -> str:
+    if token.kind == "text":
+        return token.value
+    if token.kind == "user":
+        return f"`@ {token.label or token.value}`"
+    if token.kind == "channel":
+        return f"`#{token.label or token.value}`"
+    if token.kind == "special":
+        return f"`{token.label or '@' + token.value.split('^')[0]}`"
+    if token.kind == "link":
+        # surrounding spaces let discord detect the url
+        return f" [{token.label}]({token.value}) " if token.label is not None else f" {token.value} "
+    if token.kind == "code_fence":
+        # slack format
+        #   ```def function():\n    pass```
+        # discord format
+        #   ```\ndef function():\n    pass\n```
+        return "\n```\n"
+    raise ValueError(f"Unknown token: {token=}")
+
+
+def render_token_plain(token: MrkdwnToken) -> str:
+    if token.kind in ("text", "code_fence"):
+        return token.value
+    if token.kind == "user":
+        return f"@{token.label or token.value}"
+    if token.kind == "channel":
+        return f"#{token.label or token.value}"
+    if token.kind == "special":
+        return token.label or "@" + token.value.split("^")[0]
+    if token.kind == "link":
+        return token.value if token.label in (None, token.value) else f"{token.label} ({token.value})"
+    raise ValueError(f"Unknown token: {token=}")
+
+
+def render_mrkdwn_discord(tokens: List[MrkdwnToken]) -> str:
+    return "".join(render_token_discord(token) for token in tokens)
+
+
+def render_mrkdwn_plain(tokens: List[MrkdwnToken]) -> str:
+    return "".join(render_token_plain(token) for token in tokens)
+
+
 def extract_slack_urls(text: str) -> List[str]:
     """
     extract urls from slack message text
 
+    example:
+        Input: "へー\n<https://example.com>\n<https://example.com|https://example.com>"
+        Output: ["https://example.com", "https://example.com"]
+    """
+    return _MRKDWN_LINK_PATTERN.findall(text)
+
+
+def convert_text_slack2discord(text: str) -> str:
+    """
+    convert slack message text to discord one
+
+    Plain text between tokens is copied by ``re.sub`` as is, so this is the same single pass as ``tokenize_mrkdwn``
+    without building the token list.
+
+    example:
+        Input:
+            "<@U123456>はー\n<#C123456|hoge-ch>ひー\nふー\n<https://example.com>へー\n<https://example.com|https://example.com>"
+        Output:
+            "`@ U123456`はー\n`#hoge-ch`ひー\nふー\n https://example.com へー\n [https://example.com](https://example.com) "
+    """
+    return _MRKDWN_PATTERN.sub(_replace_discord, text)
+
+
+def convert_text_slack2plain(text: str) -> str:
+    return _MRKDWN_PATTERN.sub(_replace_plain, text)
+
+
+def _replace_discord(match: "re.Match[str]") -> str:
+    # html entities are the most frequent tokens: skip building a token for them
+    if (entity := match.group(2)) is not None:
+        return _HTML_ENTITIES[entity]
+    return render_token_discord(_to_token(match))
+
+
+def _replace_plain(match: "re.Match[str]") -> str:
+    if (entity := match.group(2)) is not None:
+        return _HTML_ENTITIES[entity]
+    return render_token_plain(_to_token(match))
+
+
+def extract_slack_urls_regex(text: str) -> List[str]:
+    """
+    extract urls from slack message text (regex reference implementation of ``extract_slack_urls``)
+
     example:
         Input: "へー\n<https://example.com>\n<https://example.com|https://example.com>"
         Output: ["https://example.com", "https://example.com"]
@@ -53,9 +274,9 @@ def extract_slack_urls(text: str) -> List[str]:
     return urls
 
 
-def convert_text_slack2discord(text: str) -> str:
+def convert_text_slack2discord_regex(text: str) -> str:
     """
-    extract urls from slack message text
+    convert slack message text to discord one (regex reference implementation of ``convert_text_slack2discord``)
 
     example:
         Input:
@@ -84,11 +305,39 @@ def convert_text_slack2discord(text: str) -> str:
     return text
 
 
-def get_channels(app: App) -> List[ChannelModel]:
-    channels: List[ChannelModel] = []
-    cursor = None
+def auth_test(client: WebClient) -> Dict[str, Any]:
+    """<https://api.slack.com/methods/auth.test>, called once per token"""
+    token: str = client.token or ""
+    with _auth_test_lock:
+        if (result := auth_test_results.get(token)) is not None:
+            return result
+    response: SlackResponse = client.auth_test()
+    with _auth_test_lock:
+        return auth_test_results.setdefault(token, cast(Dict[str, Any], response.data))
+
+
+def auth_test_all(clients: Iterable[WebClient], max_workers: int = 8) -> None:
+    """``auth_test`` every distinct token at once. It verifies the tokens: the first error is raised."""
+    clients_by_token: Dict[str, WebClient] = {
+        client.token or "": client for client in clients if (client.token or "") not in auth_test_results
+    }
+    if not clients_by_token:
+        return
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(clients_by_token)), thread_name_prefix="auth-test"
+    ) as executor:
+        for _ in executor.map(auth_test, clients_by_token.values()):
+            pass
+
+
+def iter_conversations(
+    list_method: Callable[..., SlackResponse], page_size: int = 200, **params: Any
+) -> Iterator[ChannelModel]:
+    """Channels of every page of ``list_method`` (``client.conversations_list`` / ``client.users_conversations``),
+    requested one page of ``page_size`` channels at a time"""
+    cursor: Optional[str] = None
     while True:
-        conversations_response: SlackResponse = app.client.conversations_list(cursor=cursor)
+        conversations_response: SlackResponse = list_method(cursor=cursor, limit=page_size, **params)
         conversations: ConversationsModel = ConversationsModel(
             **{
                 key: conversations_response.get(key)  # type: ignore # Call to untyped function "get" in typed context
@@ -98,85 +347,113 @@ def get_channels(app: App) -> List[ChannelModel]:
         )
         if not conversations.ok:
             logger.warning(f"Failed to get conversations: {conversations=}")
-            break
-        channels += conversations.channels
-        logger.debug(f"{channels=}")
+            return
+        logger.debug(f"{len(conversations.channels)} channels, {cursor=}")
+        yield from conversations.channels
         cursor = conversations.response_metadata.next_cursor
         if cursor == "":
-            break
-    return channels
+            return
 
 
-def get_joined_channels(app: App) -> List[ChannelModel]:
-    channels: List[ChannelModel] = []
-    cursor = None
-    while True:
-        conversations_response: SlackResponse = app.client.users_conversations(cursor=cursor)
-        conversations: ConversationsModel = ConversationsModel(
-            **{
-                key: conversations_response.get(key)  # type: ignore # Call to untyped function "get" in typed context
-                for key in ["ok", "channels", "response_metadata"]
-                if key in conversations_response
-            },
-        )
-        if not conversations.ok:
-            logger.warning(f"Failed to get conversations: {conversations=}")
-            break
-        channels += conversations.channels
-        logger.debug(f"{channels=}")
-        cursor = conversations.response_metadata.next_cursor
-        if cursor == "":
-            break
-    return channels
+def iter_channels(app: App, page_size: int = 200, use_cache: bool = True) -> Iterator[ChannelModel]:
+    """Every channel visible from conversations.list
 
+    Args:
+        use_cache (bool): store the channels in ``channel_cache`` on the way, so later lookups
+            (``get_channel_from_channel_id``) need no conversations.info
+    """
+    for channel in iter_conversations(app.client.conversations_list, page_size=page_size):
+        if use_cache:
+            channel_cache.set(channel.id, channel)
+        yield channel
 
-def invite_existing_channels(app: App) -> None:
 
-    channel: ChannelModel
+def iter_joined_channels(app: App, page_size: int = 200) -> Iterator[ChannelModel]:
+    """The channels the bot is a member of (users.conversations)"""
+    return iter_conversations(app.client.users_conversations, page_size=page_size)
 
-    joined_channel_ids: Set[str] = set(channel.id for channel in get_joined_channels(app))
 
-    for channel in get_channels(app):
-        if channel.id in joined_channel_ids:
-            continue
-        if channel.is_archived:
-            logger.info(f"{channel.id=}, {channel.name=} is archived.")
-            continue
-        logger.info(f"{channel.id=}, {channel.name=}")
+def get_channels(app: App, page_size: int = 200) -> List[ChannelModel]:
+    return list(iter_channels(app, page_size=page_size))
+
+
+def get_joined_channels(app: App, page_size: int = 200) -> List[ChannelModel]:
+    return list(iter_joined_channels(app, page_size=page_size))
+
+
+def join_channel(client: WebClient, channel: ChannelModel, bucket: TokenBucket, max_retries: int = 3) -> None:
+    """conversations.join at the pace of ``bucket``. A 429 pauses the bucket and is retried."""
+    attempt: int = 0
+    while True:
+        bucket.acquire()
         try:
-            app.client.conversations_join(channel=channel.id)
+            client.conversations_join(channel=channel.id)
         except Exception as e:
-            logger.info(f"Failed to join to a channel: {channel.name}", exc_info=True)
-            raise e
+            if (retry_after := get_retry_after(e)) is None or attempt >= max_retries:
+                raise
+            bucket.penalize(retry_after)
+            attempt += 1
+            continue
+        channel_cache.set(channel.id, channel.copy(update={"is_member": True}))
+        return
 
 
-def convert_slack_ts_to_datetime(timestamp: Union[float, str]) -> datetime.datetime:
-    return datetime.datetime.fromtimestamp(int(float(timestamp)))
+def invite_existing_channels(
+    app: App,
+    page_size: int = 200,
+    max_workers: int = 4,
+    rate: float = 50 / 60,
+    burst: int = 5,
+    max_retries: int = 3,
+) -> JoinReportModel:
+    """Join every channel which is not archived and which the bot is not a member of
 
-
-def get_user_data_from_user_id(app: App, user_id: Optional[str]) -> UserModel:
-    """<https://api.slack.com/methods/users.info>
+    The channels are joined while conversations.list is still paged, by ``max_workers`` threads sharing a token bucket
+    (conversations.join is a tier 3 method: about 50 calls per minute). A channel which cannot be joined is reported
+    and the others are joined anyway.
 
     Args:
-        app (App): _description_
-        user_id (Optional[str]): _description_
+        rate (float): joins per second
+        burst (int): joins at once after an idle period
+    """
+    report: JoinReportModel = JoinReportModel()
+    bucket = TokenBucket(rate=rate, capacity=burst)
+    joined_channel_ids: Optional[Set[str]] = None
+    futures: Dict[str, "Future[None]"] = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="join") as executor:
+        for channel in iter_channels(app, page_size=page_size):
+            if channel.is_archived:
+                report.archived += 1
+                continue
+            is_member: Optional[bool] = channel.is_member
+            if is_member is None:
+                # conversations.list did not say: ask users.conversations (once)
+                if joined_channel_ids is None:
+                    joined_channel_ids = set(joined.id for joined in iter_joined_channels(app, page_size=page_size))
+                is_member = channel.id in joined_channel_ids
+            if is_member:
+                report.already_joined += 1
+                continue
+            logger.info(f"joining: {channel.id=}, {channel.name=}")
+            futures[channel.id] = executor.submit(join_channel, app.client, channel, bucket, max_retries)
+        for channel_id, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                logger.warning(f"Failed to join a channel: {channel_id=}, {e=}")
+                report.failed[channel_id] = f"{e.response.get('error')}" if isinstance(e, SlackApiError) else f"{e}"
+            else:
+                report.joined.append(channel_id)
+    logger.info(f"{report=}")
+    return report
 
-    Raises:
-        RuntimeError: _description_
-        RuntimeError: _description_
 
-    Returns:
-        UserModel: _description_
-    """
-    if user_id is None:
-        raise RuntimeError("user_id is None")
+def convert_slack_ts_to_datetime(timestamp: Union[float, str]) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(int(float(timestamp)))
 
-    user_info: SlackResponse = app.client.users_info(user=user_id)
-    user_data: Dict[str, Any] = user_info.get("user")  # type: ignore # Call to untyped function "get" in typed context
-    if user_data is None:
-        raise RuntimeError("user_data is None")
-    logger.debug(f"{user_data=}")
 
+def parse_user_data(user_id: str, user_data: Dict[str, Any]) -> UserModel:
+    """Build a UserModel from the ``user`` object of users.info"""
     image_tag_names: List[str] = [
         "image_48",  # most common
         "image_24",
@@ -199,19 +476,11 @@ def get_user_data_from_user_id(app: App, user_id: Optional[str]) -> UserModel:
         is_bot=False,
         icon_url=user_icon_url,
     )
-    logger.debug(f"{user=}")
     return user
 
 
-def get_bot_data_from_bot_id(app: App, bot_id: Optional[str]) -> UserModel:
-    if bot_id is None:
-        raise RuntimeError("bot_id is None")
-
-    bot_info: SlackResponse = app.client.bots_info(bot=bot_id)
-    bot_data: Dict[str, Any] = bot_info.get("bot")  # type: ignore # Call to untyped function "get" in typed context
-    if bot_data is None:
-        raise RuntimeError("bot_data is None")
-
+def parse_bot_data(bot_id: str, bot_data: Dict[str, Any]) -> UserModel:
+    """Build a UserModel from the ``bot`` object of bots.info"""
     image_tag_names: List[str] = [
         "image_48",  # most common
         "image_24",
@@ -235,22 +504,150 @@ def get_bot_data_from_bot_id(app: App, bot_id: Optional[str]) -> UserModel:
         is_bot=True,
         icon_url=icon_url,
     )
+    return bot
+
+
+def get_user_data_from_user_id(app: App, user_id: Optional[str], use_cache: bool = True) -> UserModel:
+    """<https://api.slack.com/methods/users.info>
+
+    Args:
+        app (App): _description_
+        user_id (Optional[str]): _description_
+        use_cache (bool): look up ``user_cache`` first and store the result in it
+
+    Raises:
+        RuntimeError: _description_
+        RuntimeError: _description_
+
+    Returns:
+        UserModel: _description_
+    """
+    if user_id is None:
+        raise RuntimeError("user_id is None")
+    if use_cache and (cached_user := user_cache.get(user_id)) is not None:
+        return cached_user
+
+    user_info: SlackResponse = app.client.users_info(user=user_id)
+    user_data: Dict[str, Any] = user_info.get("user")  # type: ignore # Call to untyped function "get" in typed context
+    if user_data is None:
+        raise RuntimeError("user_data is None")
+    logger.debug(f"{user_data=}")
+
+    user: UserModel = parse_user_data(user_id, user_data)
+    logger.debug(f"{user=}")
+    if use_cache:
+        user_cache.set(user_id, user)
+    return user
+
+
+def get_bot_data_from_bot_id(app: App, bot_id: Optional[str], use_cache: bool = True) -> UserModel:
+    if bot_id is None:
+        raise RuntimeError("bot_id is None")
+    if use_cache and (cached_bot := user_cache.get(bot_id)) is not None:
+        return cached_bot
+
+    bot_info: SlackResponse = app.client.bots_info(bot=bot_id)
+    bot_data: Dict[str, Any] = bot_info.get("bot")  # type: ignore # Call to untyped function "get" in typed context
+    if bot_data is None:
+        raise RuntimeError("bot_data is None")
+
+    bot: UserModel = parse_bot_data(bot_id, bot_data)
     logger.debug(f"{bot=}")
+    if use_cache:
+        user_cache.set(bot_id, bot)
     return bot
 
 
-def get_channel_from_channel_id(app: App, channel_id: Optional[str]) -> ChannelModel:
+def invalidate_user_cache(user_data: Dict[str, Any]) -> None:
+    """Drop a user (and the bot it belongs to) from ``user_cache``.
+
+    Args:
+        user_data (Dict[str, Any]): ``user`` object of a ``user_change`` event
+    """
+    if (user_id := user_data.get("id")) is not None:
+        user_cache.invalidate(user_id)
+    if (bot_id := (user_data.get("profile") or {}).get("bot_id")) is not None:
+        user_cache.invalidate(bot_id)
+    logger.debug(f"{user_cache=}")
+
+
+def get_channel_from_channel_id(app: App, channel_id: Optional[str], use_cache: bool = True) -> ChannelModel:
     # get channel info
     if not channel_id:
         raise RuntimeError("channel_id is not found")
+    if use_cache and (cached_channel := channel_cache.get(channel_id)) is not None:
+        return cached_channel
     channel_info: SlackResponse = app.client.conversations_info(channel=channel_id)
     channel: ChannelModel = ChannelModel(
         **channel_info.get("channel")  # type: ignore # Call to untyped function "get" in typed context
     )
     logger.info(f"{channel=}")
+    if use_cache:
+        channel_cache.set(channel_id, channel)
     return channel
 
 
+def prefill_channel_cache(app: App, page_size: int = 200) -> int:
+    """Fill ``channel_cache`` with every channel visible from conversations.list
+
+    Returns:
+        int: number of cached channels
+    """
+    count: int = sum(1 for _ in iter_channels(app, page_size=page_size))
+    logger.info(f"{count} channels are cached: {channel_cache=}")
+    return count
+
+
+def update_channel_cache(event: Dict[str, Any]) -> None:
+    """Keep ``channel_cache`` in sync with channel_rename / channel_archive / channel_unarchive / channel_deleted events
+
+    <https://api.slack.com/events/channel_rename>
+    <https://api.slack.com/events/channel_archive>
+    """
+    event_type: str = event["type"]
+    if event_type == "channel_rename":
+        channel_data: Dict[str, Any] = event["channel"]
+        cached_channel: Optional[ChannelModel] = channel_cache.get(channel_data["id"])
+        channel_cache.set(
+            channel_data["id"],
+            cached_channel.copy(update={"name": channel_data["name"]})
+            if cached_channel is not None
+            else ChannelModel(id=channel_data["id"], name=channel_data["name"]),
+        )
+    elif event_type in ("channel_archive", "channel_unarchive"):
+        channel_id: str = event["channel"]
+        if (cached_channel := channel_cache.get(channel_id)) is not None:
+            channel_cache.set(channel_id, cached_channel.copy(update={"is_archived": event_type == "channel_archive"}))
+    elif event_type == "channel_deleted":
+        channel_cache.invalidate(event["channel"])
+    logger.debug(f"{channel_cache=}")
+
+
+def cache_message(channel_id: str, message: Dict[str, Any]) -> None:
+    """Keep a snapshot of ``message`` for ``get_a_conversation``"""
+    if (ts := message.get("ts")) is not None:
+        message_cache.set((channel_id, ts), message)
+
+
+def update_message_cache(event: Dict[str, Any]) -> None:
+    """Keep the snapshots of ``message_cache`` in sync with message_changed / message_deleted events
+
+    Only messages which are already cached are updated.
+
+    <https://api.slack.com/events/message/message_changed>
+    <https://api.slack.com/events/message/message_deleted>
+    """
+    if (channel_id := event.get("channel")) is None:
+        return
+    subtype: Optional[str] = event.get("subtype")
+    if subtype == "message_changed":
+        message: Dict[str, Any] = event["message"]
+        if (ts := message.get("ts")) is not None and (channel_id, ts) in message_cache:
+            cache_message(channel_id, message)
+    elif subtype == "message_deleted" and (deleted_ts := event.get("deleted_ts")) is not None:
+        message_cache.invalidate((channel_id, deleted_ts))
+
+
 def get_chat_permanent_link(app: App, channel_id: str, message_ts: str) -> str:
     # get message's permanent link
     permanent_link_info: SlackResponse = app.client.chat_getPermalink(channel=channel_id, message_ts=message_ts)
@@ -263,7 +660,16 @@ def get_chat_permanent_link(app: App, channel_id: str, message_ts: str) -> str:
     return permanent_link
 
 
-def get_a_conversation(app: App, channel_id: str, ts: Optional[str] = None, is_reply: bool = False) -> Dict[str, Any]:
+def get_a_conversation(
+    app: App, channel_id: str, ts: Optional[str] = None, is_reply: bool = False, use_cache: bool = True
+) -> Dict[str, Any]:
+    """The message posted at ``ts`` in ``channel_id``
+
+    Args:
+        use_cache (bool): look up ``message_cache`` first and store the result in it
+    """
+    if use_cache and ts is not None and (cached_message := message_cache.get((channel_id, ts))) is not None:
+        return cached_message
     # get conversation
     response: SlackResponse
     if not is_reply:
@@ -286,4 +692,34 @@ def get_a_conversation(app: App, channel_id: str, ts: Optional[str] = None, is_r
     if response is None or len(response["messages"]) == 0:
         raise RuntimeError(f"conversation_res is empty: {response=}")
     logger.debug(f"{response.data=}")
-    return response.data["messages"][0]  # type: ignore
+    message: Dict[str, Any] = response.data["messages"][0]  # type: ignore
+    if use_cache:
+        cache_message(channel_id, message)
+    return message
+
+
+def iter_conversations_history(
+    app: App, channel_id: str, oldest: str = "0", latest: Optional[str] = None, page_size: int = 200
+) -> Iterator[List[Dict[str, Any]]]:
+    """Pages of the messages posted in ``channel_id`` after ``oldest`` (excluded) up to ``latest`` (included), oldest
+    first (the replies in threads are not part of the history)
+
+    Only one page is held at a time. The pages are requested with ``oldest`` alone, which makes
+    conversations.history return the messages which follow it, and the next page starts after the last message of
+    the previous one: unlike a ``cursor`` (which walks from the newest message back), the ts of the last message
+    handled is enough to resume.
+    """
+    while True:
+        response: SlackResponse = app.client.conversations_history(
+            channel=channel_id, oldest=oldest, inclusive=False, limit=page_size
+        )
+        page: List[Dict[str, Any]] = sorted(response.get("messages") or [], key=lambda message: float(message["ts"]))
+        messages: List[Dict[str, Any]] = [
+            message for message in page if latest is None or float(message["ts"]) <= float(latest)
+        ]
+        if messages:
+            yield messages
+            oldest = messages[-1]["ts"]
+        # the end: no more pages, or a page which reaches past ``latest``
+        if not response.get("has_more") or not messages or len(messages) < len(page):
+            return
@@ -0,0 +1,133 @@
+"""asyncio counterparts of the Web API helpers in ``pollenjp_times.utils.slack``
+
+They share the caches of the sync helpers, so both runtimes see the same users / channels.
+"""
+# Standard Library
+import asyncio
+from logging import NullHandler
+from logging import getLogger
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import cast
+
+# Third Party Library
+from slack_bolt.async_app import AsyncApp
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.web.async_slack_response import AsyncSlackResponse
+
+# First Party Library
+from pollenjp_times.types import ChannelModel
+from pollenjp_times.types import UserModel
+from pollenjp_times.utils.slack import auth_test_results
+from pollenjp_times.utils.slack import cache_message
+from pollenjp_times.utils.slack import channel_cache
+from pollenjp_times.utils.slack import message_cache
+from pollenjp_times.utils.slack import parse_bot_data
+from pollenjp_times.utils.slack import parse_user_data
+from pollenjp_times.utils.slack import user_cache
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# auth.test requests in flight, so that concurrent callers of one token share a request
+_auth_test_tasks: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+
+async def auth_test(client: AsyncWebClient) -> Dict[str, Any]:
+    """<https://api.slack.com/methods/auth.test>, called once per token"""
+    token: str = client.token or ""
+    if (result := auth_test_results.get(token)) is not None:
+        return result
+    if (task := _auth_test_tasks.get(token)) is None:
+
+        async def request() -> Dict[str, Any]:
+            response: AsyncSlackResponse = await client.auth_test()
+            return auth_test_results.setdefault(token, cast(Dict[str, Any], response.data))
+
+        task = _auth_test_tasks[token] = asyncio.ensure_future(request())
+        task.add_done_callback(lambda _: _auth_test_tasks.pop(token, None))
+    return await task
+
+
+async def get_user_data_from_user_id(app: AsyncApp, user_id: Optional[str], use_cache: bool = True) -> UserModel:
+    """<https://api.slack.com/methods/users.info>"""
+    if user_id is None:
+        raise RuntimeError("user_id is None")
+    if use_cache and (cached_user := user_cache.get(user_id)) is not None:
+        return cached_user
+
+    user_info: AsyncSlackResponse = await app.client.users_info(user=user_id)
+    user_data: Optional[Dict[str, Any]] = user_info.get("user")
+    if user_data is None:
+        raise RuntimeError("user_data is None")
+    logger.debug(f"{user_data=}")
+
+    user: UserModel = parse_user_data(user_id, user_data)
+    logger.debug(f"{user=}")
+    if use_cache:
+        user_cache.set(user_id, user)
+    return user
+
+
+async def get_bot_data_from_bot_id(app: AsyncApp, bot_id: Optional[str], use_cache: bool = True) -> UserModel:
+    if bot_id is None:
+        raise RuntimeError("bot_id is None")
+    if use_cache and (cached_bot := user_cache.get(bot_id)) is not None:
+        return cached_bot
+
+    bot_info: AsyncSlackResponse = await app.client.bots_info(bot=bot_id)
+    bot_data: Optional[Dict[str, Any]] = bot_info.get("bot")
+    if bot_data is None:
+        raise RuntimeError("bot_data is None")
+
+    bot: UserModel = parse_bot_data(bot_id, bot_data)
+    logger.debug(f"{bot=}")
+    if use_cache:
+        user_cache.set(bot_id, bot)
+    return bot
+
+
+async def get_channel_from_channel_id(app: AsyncApp, channel_id: Optional[str], use_cache: bool = True) -> ChannelModel:
+    if not channel_id:
+        raise RuntimeError("channel_id is not found")
+    if use_cache and (cached_channel := channel_cache.get(channel_id)) is not None:
+        return cached_channel
+    channel_info: AsyncSlackResponse = await app.client.conversations_info(channel=channel_id)
+    channel: ChannelModel = ChannelModel(**channel_info["channel"])
+    logger.info(f"{channel=}")
+    if use_cache:
+        channel_cache.set(channel_id, channel)
+    return channel
+
+
+async def get_a_conversation(
+    app: AsyncApp, channel_id: str, ts: Optional[str] = None, is_reply: bool = False, use_cache: bool = True
+) -> Dict[str, Any]:
+    if use_cache and ts is not None and (cached_message := message_cache.get((channel_id, ts))) is not None:
+        return cached_message
+    response: AsyncSlackResponse
+    if not is_reply:
+        response = await app.client.conversations_history(
+            channel=channel_id,
+            inclusive=True,
+            oldest=ts,
+            limit=1,
+        )
+    else:
+        if ts is None:
+            raise RuntimeError("ts is None")
+        response = await app.client.conversations_replies(
+            channel=channel_id,
+            ts=ts,
+            inclusive=True,
+            oldest=ts,
+            limit=1,
+        )
+    if response is None or len(response["messages"]) == 0:
+        raise RuntimeError(f"conversation_res is empty: {response=}")
+    logger.debug(f"{response.data=}")
+    message: Dict[str, Any] = response.data["messages"][0]  # type: ignore
+    if use_cache:
+        cache_message(channel_id, message)
+    return message
@@ -0,0 +1,198 @@
+"""Per-event tracing: one span tree from the receipt of a Slack event to its last delivery
+
+``tracer.trace(name)`` starts the root span of a sampled event, ``tracer.span(name)`` a child of the current span.
+The current span is a context variable, so child spans follow the event into coroutines and into the threads of
+``FanoutExecutor`` (which copies the context). Outside of a sampled trace ``span`` does nothing.
+
+A trace is exported when its root span ends, as one JSON line. Spans which end later (e.g. a delivery which
+outlived the fanout timeout) are exported on their own line with the same ``trace_id``.
+"""
+# Standard Library
+import abc
+import contextlib
+import contextvars
+import importlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from logging import NullHandler
+from logging import getLogger
+from logging.handlers import RotatingFileHandler
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start", "duration", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.trace: Trace = trace
+        self.name: str = name
+        self.span_id: str = os.urandom(8).hex()
+        self.parent_id: Optional[str] = parent_id
+        self.start: float = time.time()
+        self.duration: Optional[float] = None  # seconds
+        self.attributes: Dict[str, Any] = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    def __init__(self) -> None:
+        self.trace_id: str = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.exported: bool = False
+        self._lock: threading.Lock = threading.Lock()
+
+    def to_dict(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"trace_id": self.trace_id, "spans": [span.to_dict() for span in spans]}
+
+
+class Exporter(abc.ABC):
+    """Receives every finished trace (``Trace.to_dict``). Called from the thread which ended the root span."""
+
+    @abc.abstractmethod
+    def export(self, trace: Dict[str, Any]) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlExporter(Exporter):
+    """One JSON line per trace in ``path``, rotated at ``max_bytes`` (``backup_count`` old files are kept)"""
+
+    def __init__(self, path: str = "traces.jsonl", max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3) -> None:
+        self._handler: RotatingFileHandler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        line: str = json.dumps(trace, ensure_ascii=False, default=str)
+        self._handler.emit(logging.makeLogRecord({"msg": line, "levelno": logging.INFO, "levelname": "INFO"}))
+
+    def close(self) -> None:
+        self._handler.close()
+
+
+def load_exporter(spec: str, **kwargs: Any) -> Exporter:
+    """``"jsonl"`` or ``"package.module:ClassName"`` of an ``Exporter``, built with ``kwargs``"""
+    if spec == "jsonl":
+        return JsonlExporter(**kwargs)
+    module_name, _, class_name = spec.partition(":")
+    exporter: Any = getattr(importlib.import_module(module_name), class_name)(**kwargs)
+    if not isinstance(exporter, Exporter):
+        raise TypeError(f"{spec} is not an Exporter")
+    return exporter
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("_current_span", default=None)
+
+
+class Tracer:
+    """Starts the spans and samples the traces
+
+    Args:
+        exporter (Optional[Exporter]): receives the traces. ``None``: tracing is disabled
+        sample_rate (float): ratio of the root spans which are traced
+        sample_rates (Optional[Dict[str, float]]): ``sample_rate`` per root span name (e.g. ``event_message``)
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[Exporter] = None,
+        sample_rate: float = 0.0,
+        sample_rates: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.exporter: Optional[Exporter] = exporter
+        self.sample_rate: float = sample_rate
+        self.sample_rates: Dict[str, float] = dict(sample_rates or {})
+
+    def configure(
+        self, exporter: Optional[Exporter], sample_rate: float, sample_rates: Optional[Dict[str, float]] = None
+    ) -> None:
+        if self.exporter is not None and self.exporter is not exporter:
+            self.exporter.close()
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.sample_rates = dict(sample_rates or {})
+
+    @contextlib.contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Root span of an incoming event, if the event is sampled"""
+        if self.exporter is None or random.random() >= self.sample_rates.get(name, self.sample_rate):
+            yield None
+            return
+        with self._span(Trace(), name, None, attributes) as span:
+            yield span
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Child of the current span (nothing if the event is not traced)"""
+        if (parent := _current_span.get()) is None:
+            yield None
+            return
+        with self._span(parent.trace, name, parent.span_id, attributes) as span:
+            yield span
+
+    @contextlib.contextmanager
+    def _span(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> Iterator[Span]:
+        span = Span(trace, name, parent_id, attributes)
+        token = _current_span.set(span)
+        started_at: float = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{e!r}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - started_at
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        trace: Trace = span.trace
+        with trace._lock:
+            if trace.exported:
+                late: Optional[List[Span]] = [span]
+            else:
+                trace.spans.append(span)
+                late = None
+                if span.parent_id is None:
+                    trace.exported = True
+        if (exporter := self.exporter) is None:
+            return
+        spans: List[Span] = late if late is not None else trace.spans if span.parent_id is None else []
+        if not spans:
+            return
+        try:
+            exporter.export(trace.to_dict(spans))
+        except Exception:
+            logger.warning("Failed to export a trace", exc_info=True)
+
+
+# shared by every module: configured by main
+tracer: Tracer = Tracer()
@@ -0,0 +1,38 @@
+# Standard Library
+import sys
+from pathlib import Path
+from typing import Iterator
+
+# Third Party Library
+import pytest
+
+sys.path.insert(0, f"{Path(__file__).parents[1] / 'benchmarks'}")
+
+# Third Party Library
+from standin import StandinServer  # noqa: E402
+from standin import mount_discord  # noqa: E402
+
+# First Party Library
+from pollenjp_times.media import MediaCache  # noqa: E402
+from pollenjp_times.media import MediaForwarder  # noqa: E402
+from pollenjp_times.utils.http import connection_pool  # noqa: E402
+
+
+@pytest.fixture()
+def server() -> Iterator[StandinServer]:
+    server: StandinServer = StandinServer().start()
+    # the requests to discord.com go to the stand-in of the test (mounted again by every test)
+    mount_discord(connection_pool.session, server)
+    try:
+        yield server
+    finally:
+        server.stop()
+
+
+@pytest.fixture()
+def media(tmp_path: Path) -> Iterator[MediaForwarder]:
+    media: MediaForwarder = MediaForwarder(MediaCache(tmp_path / "media"))
+    try:
+        yield media
+    finally:
+        media.close()
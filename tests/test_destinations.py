@@ -0,0 +1,58 @@
+# Standard Library
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+
+# Third Party Library
+from standin import StandinServer
+
+# First Party Library
+from pollenjp_times.destinations import DiscordWebhookDestination
+from pollenjp_times.media import MediaForwarder
+from pollenjp_times.utils.http import connection_pool
+
+
+def _destination() -> DiscordWebhookDestination:
+    return DiscordWebhookDestination(
+        connection_pool.get_discord_webhook(f"https://discord.com/api/webhooks/{10**17}/{'token':x<64}")
+    )
+
+
+def _unfurled(server: StandinServer, media: MediaForwarder) -> Dict[str, Any]:
+    """payload of a message whose embed image is uploaded with it"""
+    embeds: List[Dict[str, Any]] = [{"type": "rich", "image": {"url": f"{server.url}/files/pic.png?size=5000"}}]
+    images = media.rehost_embed_images(embeds)
+    (payload,) = media.attach([{"content": "https://example.com", "embeds": embeds}], [], images)
+    return payload
+
+
+def test_edit_uploads_the_embed_image(server: StandinServer, media: MediaForwarder) -> None:
+    destination: DiscordWebhookDestination = _destination()
+    (message_id,) = destination.sync_all([], [{"content": "https://example.com"}])
+    server.reset()
+
+    payload: Dict[str, Any] = _unfurled(server, media)
+    assert destination.sync_all([message_id], [payload]) == [message_id]
+
+    (filename,) = [file["filename"] for file in payload["files"]]
+    assert server.uploads == [(filename, 5000)]
+    (edit,) = server.edits
+    assert edit["attachments"] == [{"id": 0, "filename": filename}]
+    assert edit["embeds"][0]["image"]["url"] == f"attachment://{filename}"
+    assert server.arrivals == []  # edited in place, not posted again
+
+
+def test_edit_shows_an_evicted_embed_image_from_its_url(server: StandinServer, media: MediaForwarder) -> None:
+    destination: DiscordWebhookDestination = _destination()
+    (message_id,) = destination.sync_all([], [{"content": "https://example.com"}])
+    payload: Dict[str, Any] = _unfurled(server, media)
+    Path(payload["files"][0]["path"]).unlink()
+    server.reset()
+
+    destination.sync_all([message_id], [payload])
+
+    assert server.uploads == []
+    (edit,) = server.edits
+    assert edit["attachments"] == []
+    assert edit["embeds"][0]["image"]["url"] == f"{server.url}/files/pic.png?size=5000"
@@ -0,0 +1,24 @@
+# First Party Library
+from pollenjp_times.message_index import MessageIndex
+from pollenjp_times.message_index import is_stale
+
+
+def test_is_stale() -> None:
+    assert not is_stale("1700000000.000001", None)
+    assert not is_stale("1700000000.000001", "1700000000.000001")
+    assert is_stale("1700000000.000001", "1700000000.000002")
+    assert not is_stale("1700000010.000000", "999999999.999999")
+
+
+def test_version_outlives_the_posts() -> None:
+    index: MessageIndex = MessageIndex()
+    index.set("C1:1.0", "discord:1", ["10", "11"], "1.5")
+    assert (index.get("C1:1.0", "discord:1"), index.version("C1:1.0", "discord:1")) == (["10", "11"], "1.5")
+    # deleted: an older sync arriving later must still be dropped
+    index.set("C1:1.0", "discord:1", [], "2.0")
+    assert (index.get("C1:1.0", "discord:1"), index.version("C1:1.0", "discord:1")) == ([], "2.0")
+    # no version: the one of the posts is kept
+    index.set("C1:1.0", "discord:1", ["12"])
+    assert index.version("C1:1.0", "discord:1") == "2.0"
+    assert index.version("C1:1.0", "slack:x:C2") is None
+    index.close()